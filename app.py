@@ -6,16 +6,56 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import time
 import logging
+from contextlib import asynccontextmanager
+import config
+from compression import CompressioneMiddleware
 from utils import contatori
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Operazioni eseguite all'avvio (una volta per worker)"""
+    # Schema OpenAPI costruito (o letto dallo snapshot) prima della prima richiesta
+    if config.OPENAPI_PRECALCOLATO:
+        app.state.schema_openapi.prepara()
+
+    # Collezione Postman (e schema OpenAPI) pronta prima della prima richiesta;
+    # eventuali errori nel file vengono segnalati subito nei log
+    if config.POSTMAN_PRECARICA or config.POSTMAN_SORGENTE == "file":
+        app.state.collezione_postman.verifica_avvio()
+
+    # Dati sintetici per prove di carico e memoria su scala reale
+    if config.SEED:
+        from seed import leggi_quantita, semina
+        await semina(leggi_quantita(config.SEED), config.SEED_SEME)
+
+    # Pool per rendering, serializzazione e validazione pesanti
+    app.state.esecutore.avvia()
+
+    # Ritardo dell'event loop: rivela gli handler che lo bloccano
+    monitor = None
+    if config.MONITOR_LOOP_ABILITATO:
+        from loop_monitor import MonitorLoop
+        monitor = MonitorLoop(
+            intervallo=config.MONITOR_LOOP_INTERVALLO_MS / 1000,
+            soglia=config.MONITOR_LOOP_SOGLIA_MS / 1000,
+            debug=config.MONITOR_LOOP_DEBUG,
+        )
+        monitor.avvia()
+        app.state.monitor_loop = monitor
+    yield
+    app.state.esecutore.ferma()
+    if monitor is not None:
+        await monitor.ferma()
+
 def create_app() -> FastAPI:
     """Crea e configura l'applicazione FastAPI"""
     
     app = FastAPI(
+        lifespan=lifespan,
         title="HTTP Explorer - Laboratorio Didattico",
         description="""
         ## Server educativo per esplorare il protocollo HTTP
@@ -35,7 +75,11 @@ def create_app() -> FastAPI:
         contact={
             "name": "HTTP Explorer",
             "email": "info@httpexplorer.com"
-        }
+        },
+        # Documentazione servita dallo schema precalcolato (vedi schema_openapi.py)
+        openapi_url=None,
+        docs_url=None,
+        redoc_url=None
     )
 
     # Configurazione CORS per permettere richieste da qualsiasi origine
@@ -47,6 +91,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Compressione negoziata (gzip/brotli/zstd) per le risposte più grandi
+    if config.COMPRESSIONE_ABILITATA:
+        app.add_middleware(
+            CompressioneMiddleware,
+            soglia=config.COMPRESSIONE_SOGLIA_BYTES,
+            voci_cache=config.COMPRESSIONE_CACHE_VOCI,
+            soglia_thread=config.COMPRESSIONE_SOGLIA_THREAD_BYTES,
+        )
+
     # Middleware per logging dettagliato
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
@@ -74,8 +127,37 @@ def create_app() -> FastAPI:
         
         return response
 
+    # Profilazione su richiesta (X-Profile): il più esterno, misura anche gli altri middleware
+    if config.PROFILAZIONE_ABILITATA:
+        from profiling import ProfilazioneMiddleware
+        app.add_middleware(
+            ProfilazioneMiddleware,
+            token=config.PROFILAZIONE_TOKEN,
+            cartella=config.PROFILAZIONE_CARTELLA,
+        )
+
+    # Pool per il lavoro CPU pesante, avviato nel lifespan (fino ad allora tutto resta nel loop)
+    from executor import Esecutore
+    app.state.esecutore = Esecutore(
+        modalita=config.ESECUTORE,
+        worker=config.ESECUTORE_WORKER,
+        in_volo=config.ESECUTORE_IN_VOLO,
+        coda_massima=config.ESECUTORE_CODA,
+        soglia=config.ESECUTORE_SOGLIA_ELEMENTI,
+    )
+
     # Registra gli endpoint
     from endpoints import register_routes
     register_routes(app)
+
+    # Schema OpenAPI precalcolato e pagine di documentazione
+    from schema_openapi import SchemaOpenAPI, registra_documentazione
+    app.state.schema_openapi = SchemaOpenAPI(app, config.OPENAPI_SNAPSHOT)
+    if config.DOCS_ABILITATE:
+        registra_documentazione(app, app.state.schema_openapi)
+
+    # Sorgente della collezione Postman (generata dalle rotte o letta da file)
+    from postman import crea_sorgente_collezione
+    app.state.collezione_postman = crea_sorgente_collezione(app, config.POSTMAN_SORGENTE)
     
     return app
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+BENCH_AVVIO - Tempo di avvio: dall'import alla prima risposta
+
+Per ogni configurazione lancia un processo Python nuovo e misura:
+- import dei moduli, create_app() e lifespan (in-process, TestClient)
+- prima risposta su un socket reale: uvicorn avviato come in produzione
+  (app:create_app --factory) fino al primo 200 su / e su /openapi.json
+
+Uso (richiede httpx: pip install -r requirements-dev.txt):
+    python bench/bench_avvio.py --ripetizioni 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Secondi concessi a uvicorn per rispondere alla prima richiesta
+TIMEOUT_AVVIO = 30.0
+
+CONFIGURAZIONI = {
+    "schema pigro": {"HTTP_EXPLORER_OPENAPI_PRECALCOLATO": "0"},
+    "schema precalcolato": {"HTTP_EXPLORER_OPENAPI_PRECALCOLATO": "1"},
+    "produzione (no docs)": {"HTTP_EXPLORER_AMBIENTE": "produzione"},
+}
+
+# Script eseguito nel processo figlio: stampa le durate delle fasi in JSON
+_FASI = """
+import json, time
+t0 = time.perf_counter()
+import logging; logging.disable(logging.INFO)
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    t3 = time.perf_counter()
+    client.get("/")
+    t4 = time.perf_counter()
+    client.get("/openapi.json")
+    t5 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "lifespan": t3 - t2,
+                  "prima_risposta": t4 - t3, "primo_openapi": t5 - t4}))
+"""
+
+def _porta_libera() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _fasi(env) -> dict:
+    uscita = subprocess.run([sys.executable, "-c", _FASI], cwd=RADICE, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(uscita.stdout.strip().splitlines()[-1])
+
+def _socket(env) -> dict:
+    porta = _porta_libera()
+    inizio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:create_app", "--factory",
+         "--port", str(porta), "--log-level", "warning"],
+        cwd=RADICE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    scadenza = time.monotonic() + TIMEOUT_AVVIO
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{porta}/", timeout=1)
+                break
+            except httpx.TransportError:
+                if processo.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminato durante l'avvio (codice {processo.returncode})")
+                if time.monotonic() > scadenza:
+                    raise RuntimeError(f"uvicorn non ha risposto entro {TIMEOUT_AVVIO:.0f} s")
+                time.sleep(0.01)
+        prima = time.perf_counter() - inizio
+        inizio_openapi = time.perf_counter()
+        httpx.get(f"http://127.0.0.1:{porta}/openapi.json", timeout=5)
+        return {"socket_prima_risposta": prima, "socket_primo_openapi": time.perf_counter() - inizio_openapi}
+    finally:
+        processo.terminate()
+        processo.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    args = parser.parse_args()
+
+    for nome, variabili in CONFIGURAZIONI.items():
+        env = {**os.environ, **variabili}
+        misure = []
+        for _ in range(args.ripetizioni):
+            misure.append({**_fasi(env), **_socket(env)})
+        print(f"\n{nome}")
+        for fase in misure[0]:
+            valori = [m[fase] * 1000 for m in misure]
+            print(f"  {fase:<24} mediana {statistics.median(valori):8.1f} ms   min {min(valori):8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+BENCH_CARICO - Generatore di carico asincrono per gli endpoint dell'API
+
+Riproduce mix di traffico realistici:
+- iot: tempesta di letture dai sensori (POST /temperature come lo sketch
+  nodemcu_send_temperatura.ino) con qualche lettura filtrata
+- catalogo: navigazione del catalogo con filtri, ordinamenti, ricerca e dettagli
+- html: browser che chiedono le pagine HTML (Accept da browser, gzip)
+- lenti: client lenti su /test/delay mescolati a richieste veloci, per vedere
+  se le richieste veloci restano veloci
+
+Ogni scenario gira per --durata secondi con --concorrenza client paralleli:
+- in-process, con httpx.ASGITransport (nessun socket: costo dell'app)
+- su socket reale, con uvicorn avviato come in produzione (app:create_app --factory)
+
+Richiede httpx (pip install -r requirements-dev.txt).
+
+Riporta richieste/s, p50 e p99 e confronta con una baseline JSON:
+    python bench/bench_carico.py --salva-baseline bench/baseline_carico.json
+    python bench/bench_carico.py --baseline bench/baseline_carico.json --tolleranza 0.25
+Esce con codice 1 se un risultato peggiora oltre la tolleranza.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Secondi concessi a uvicorn per rispondere alla prima richiesta
+TIMEOUT_AVVIO = 30.0
+sys.path.insert(0, RADICE)
+
+ACCEPT_BROWSER = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+
+class Richiesta(NamedTuple):
+    """Una richiesta del mix: gruppo serve a separare le latenze nel report"""
+    metodo: str
+    url: str
+    gruppo: str
+    json: Optional[dict] = None
+    headers: Optional[dict] = None
+
+# ================================
+# SCENARI
+# ================================
+
+SENSORI = [f"ESP8266_{i:02d}" for i in range(1, 41)]
+POSIZIONI = ["Aula A", "Aula B", "Aula C", "Laboratorio", "Biblioteca", "Palestra", "Corridoio"]
+CATEGORIE = ["elettronica", "computer", "audio"]
+RICERCHE = ["cuffie", "laptop gaming", "smartphone 5g", "wireless", "audio qualità"]
+
+def scenario_iot(rnd: random.Random) -> Richiesta:
+    if rnd.random() < 0.9:
+        return Richiesta("POST", "/temperature", "invio", json={
+            "valore": round(rnd.uniform(15, 30), 2),
+            "sensore": rnd.choice(SENSORI),
+            "posizione": rnd.choice(POSIZIONI),
+        })
+    if rnd.random() < 0.5:
+        return Richiesta("GET", f"/temperature?sensore={rnd.choice(SENSORI)}&limite=20", "lettura")
+    # Sensori presenti nei dati iniziali: la risposta non è mai un 404
+    return Richiesta("GET", f"/temperature/sensore/{rnd.choice(['SENSOR_01', 'SENSOR_02', 'SENSOR_03'])}", "lettura")
+
+def scenario_catalogo(rnd: random.Random) -> Richiesta:
+    scelta = rnd.random()
+    if scelta < 0.4:
+        parametri = [f"pagina={rnd.randint(1, 3)}", f"ordina={rnd.choice(['id', 'prezzo', '-prezzo', 'nome'])}"]
+        if rnd.random() < 0.5:
+            parametri.append(f"categoria={rnd.choice(CATEGORIE)}")
+        if rnd.random() < 0.3:
+            parametri.append(f"prezzo_max={rnd.choice([200, 500, 1000])}")
+        if rnd.random() < 0.2:
+            parametri.append("facets=true")
+        return Richiesta("GET", "/prodotti?" + "&".join(parametri), "lista")
+    if scelta < 0.6:
+        return Richiesta("GET", f"/prodotti/cerca?q={rnd.choice(RICERCHE)}", "ricerca")
+    if scelta < 0.9:
+        return Richiesta("GET", f"/prodotti/{rnd.randint(1, 3)}", "dettaglio")
+    return Richiesta("GET", "/prodotti/export?formato=ndjson", "export")
+
+def scenario_html(rnd: random.Random) -> Richiesta:
+    url = rnd.choice(["/", "/prodotti", "/prodotti?categoria=audio", "/prodotti/1", "/prodotti/2", "/risorse"])
+    return Richiesta("GET", url, "pagina", headers={"Accept": ACCEPT_BROWSER, "Accept-Encoding": "gzip, deflate, br"})
+
+def scenario_lenti(rnd: random.Random) -> Richiesta:
+    if rnd.random() < 0.2:
+        return Richiesta("GET", f"/test/delay/{rnd.choice([0.5, 1, 2])}", "lenta")
+    return Richiesta("GET", rnd.choice(["/prodotti", "/temperature", "/statistiche"]), "veloce")
+
+SCENARI: Dict[str, Callable[[random.Random], Richiesta]] = {
+    "iot": scenario_iot,
+    "catalogo": scenario_catalogo,
+    "html": scenario_html,
+    "lenti": scenario_lenti,
+}
+
+# ================================
+# ESECUZIONE
+# ================================
+
+async def _client(client: httpx.AsyncClient, genera, rnd: random.Random, scadenza: float,
+                  latenze: Dict[str, List[float]], errori: List[str]):
+    while time.perf_counter() < scadenza:
+        richiesta = genera(rnd)
+        inizio = time.perf_counter()
+        try:
+            risposta = await client.request(richiesta.metodo, richiesta.url, json=richiesta.json, headers=richiesta.headers)
+            await risposta.aread()
+            if risposta.status_code >= 400:
+                errori.append(f"{risposta.status_code} {richiesta.metodo} {richiesta.url}")
+        except httpx.HTTPError as e:
+            errori.append(f"{type(e).__name__} {richiesta.metodo} {richiesta.url}")
+        latenze[richiesta.gruppo].append(time.perf_counter() - inizio)
+
+async def esegui_scenario(client: httpx.AsyncClient, nome: str, durata: float, concorrenza: int, seme: int) -> dict:
+    """Esegue uno scenario e restituisce le metriche (totali e per gruppo)"""
+    latenze: Dict[str, List[float]] = defaultdict(list)
+    errori: List[str] = []
+    inizio = time.perf_counter()
+    scadenza = inizio + durata
+    await asyncio.gather(*(
+        _client(client, SCENARI[nome], random.Random(seme + i), scadenza, latenze, errori)
+        for i in range(concorrenza)
+    ))
+    trascorso = time.perf_counter() - inizio
+
+    def metriche(valori: List[float]) -> dict:
+        percentili = statistics.quantiles(valori, n=100) if len(valori) > 1 else valori * 99
+        return {
+            "richieste": len(valori),
+            "rps": round(len(valori) / trascorso, 1),
+            "p50_ms": round(statistics.median(valori) * 1000, 2),
+            "p99_ms": round(percentili[98] * 1000, 2),
+        }
+
+    tutte = [v for valori in latenze.values() for v in valori]
+    return {
+        **metriche(tutte),
+        "errori": len(errori),
+        "esempi_errori": sorted(set(errori))[:3],
+        "gruppi": {gruppo: metriche(valori) for gruppo, valori in sorted(latenze.items())},
+    }
+
+async def in_process(scenari: List[str], durata: float, concorrenza: int, seme: int) -> Dict[str, dict]:
+    """Scenari contro l'app ASGI nello stesso processo (lifespan incluso)"""
+    logging.disable(logging.INFO)
+    from app import create_app
+
+    app = create_app()
+    risultati = {}
+    async with app.router.lifespan_context(app):
+        trasporto = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=trasporto, base_url="http://bench") as client:
+            for nome in scenari:
+                risultati[nome] = await esegui_scenario(client, nome, durata, concorrenza, seme)
+    return risultati
+
+def _porta_libera() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def su_socket(scenari: List[str], durata: float, concorrenza: int, seme: int) -> Dict[str, dict]:
+    """Scenari contro uvicorn avviato in un processo separato"""
+    porta = _porta_libera()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:create_app", "--factory",
+         "--port", str(porta), "--log-level", "warning"],
+        cwd=RADICE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{porta}"
+    scadenza = time.monotonic() + TIMEOUT_AVVIO
+    try:
+        while True:
+            try:
+                httpx.get(f"{base}/", timeout=1)
+                break
+            except httpx.TransportError:
+                if processo.poll() is not None:
+                    raise RuntimeError("uvicorn non si è avviato")
+                if time.monotonic() > scadenza:
+                    raise RuntimeError(f"uvicorn non ha risposto entro {TIMEOUT_AVVIO:.0f} s")
+                time.sleep(0.05)
+
+        limiti = httpx.Limits(max_connections=concorrenza, max_keepalive_connections=concorrenza)
+        risultati = {}
+        async with httpx.AsyncClient(base_url=base, limits=limiti, timeout=30) as client:
+            for nome in scenari:
+                risultati[nome] = await esegui_scenario(client, nome, durata, concorrenza, seme)
+        return risultati
+    finally:
+        processo.terminate()
+        processo.wait()
+
+# ================================
+# REPORT E BASELINE
+# ================================
+
+def stampa(trasporto: str, risultati: Dict[str, dict]):
+    print(f"\n[{trasporto}]")
+    print(f"  {'scenario':<22} {'richieste':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errori':>7}")
+    for nome, m in risultati.items():
+        print(f"  {nome:<22} {m['richieste']:>9} {m['rps']:>9.1f} {m['p50_ms']:>9.2f} {m['p99_ms']:>9.2f} {m['errori']:>7}")
+        for gruppo, g in m["gruppi"].items():
+            print(f"    {gruppo:<20} {g['richieste']:>9} {g['rps']:>9.1f} {g['p50_ms']:>9.2f} {g['p99_ms']:>9.2f}")
+        for esempio in m["esempi_errori"]:
+            print(f"    errore: {esempio}")
+
+def confronta(risultati: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolleranza: float) -> List[str]:
+    """
+    Regressioni rispetto alla baseline: meno req/s o p99 più alto oltre la tolleranza
+    Controlla anche i singoli gruppi (es. le richieste veloci dello scenario lenti)
+    """
+    regressioni = []
+
+    def controlla(etichetta: str, m: dict, base: Optional[dict]):
+        if base is None:
+            return
+        if m["rps"] < base["rps"] * (1 - tolleranza):
+            regressioni.append(f"{etichetta}: req/s {m['rps']:.1f} (baseline {base['rps']:.1f})")
+        if m["p99_ms"] > base["p99_ms"] * (1 + tolleranza):
+            regressioni.append(f"{etichetta}: p99 {m['p99_ms']:.2f} ms (baseline {base['p99_ms']:.2f} ms)")
+
+    for trasporto, scenari in risultati.items():
+        for nome, m in scenari.items():
+            base = baseline.get(trasporto, {}).get(nome)
+            controlla(f"{trasporto}/{nome}", m, base)
+            for gruppo, g in m["gruppi"].items():
+                controlla(f"{trasporto}/{nome}/{gruppo}", g, (base or {}).get("gruppi", {}).get(gruppo))
+    return regressioni
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenari", nargs="+", choices=list(SCENARI), default=list(SCENARI))
+    parser.add_argument("--trasporto", choices=["asgi", "uvicorn", "entrambi"], default="entrambi")
+    parser.add_argument("--durata", type=float, default=5.0, help="Secondi per scenario")
+    parser.add_argument("--concorrenza", type=int, default=32, help="Client paralleli")
+    parser.add_argument("--seme", type=int, default=1, help="Seme del mix di richieste (riproducibile)")
+    parser.add_argument("--baseline", help="JSON con cui confrontare i risultati")
+    parser.add_argument("--tolleranza", type=float, default=0.2, help="Peggioramento accettato (0.2 = 20%%)")
+    parser.add_argument("--salva-baseline", help="Salva i risultati come nuova baseline")
+    args = parser.parse_args()
+
+    risultati = {}
+    if args.trasporto in ("asgi", "entrambi"):
+        risultati["asgi"] = asyncio.run(in_process(args.scenari, args.durata, args.concorrenza, args.seme))
+        stampa("asgi (in-process)", risultati["asgi"])
+    if args.trasporto in ("uvicorn", "entrambi"):
+        risultati["uvicorn"] = asyncio.run(su_socket(args.scenari, args.durata, args.concorrenza, args.seme))
+        stampa("uvicorn (socket)", risultati["uvicorn"])
+
+    if args.salva_baseline:
+        with open(args.salva_baseline, "w", encoding="utf-8") as file:
+            json.dump(risultati, file, indent=2)
+        print(f"\nBaseline salvata in {args.salva_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressioni = confronta(risultati, json.load(file), args.tolleranza)
+        if regressioni:
+            print(f"\nRegressioni oltre il {args.tolleranza:.0%}:")
+            for regressione in regressioni:
+                print(f"  {regressione}")
+            sys.exit(1)
+        print(f"\nNessuna regressione oltre il {args.tolleranza:.0%} rispetto a {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+BENCH_DOWNLOAD - Throughput di /download su file di grandi dimensioni
+
+Avvia uvicorn su una porta locale con la cartella indicata (o un file
+temporaneo generato) e misura MB/s per download completi e a intervalli,
+confrontando FileDownload con lo StaticFiles di Starlette.
+
+Uso:
+    python bench/bench_download.py --dimensione-mb 300 --ripetizioni 3
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from static_files import FileDownload  # noqa: E402
+
+def _porta_libera() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _avvia_server(app) -> Tuple[uvicorn.Server, int]:
+    porta = _porta_libera()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, porta
+
+def _scarica(url: str, headers=None) -> int:
+    totale = 0
+    with httpx.stream("GET", url, headers=headers or {}, timeout=None) as risposta:
+        for chunk in risposta.iter_raw(1024 * 1024):
+            totale += len(chunk)
+    return totale
+
+def _misura(nome: str, url: str, ripetizioni: int, headers=None):
+    migliore = None
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        byte = _scarica(url, headers)
+        durata = time.perf_counter() - inizio
+        migliore = durata if migliore is None else min(migliore, durata)
+    print(f"{nome:<40} {byte / (1024 * 1024):>8.1f} MB  {byte / (1024 * 1024) / migliore:>9.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dimensione-mb", type=int, default=300, help="Dimensione del file generato")
+    parser.add_argument("--ripetizioni", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cartella:
+        nome = "materiale.bin"
+        with open(os.path.join(cartella, nome), "wb") as file:
+            blocco = os.urandom(1024 * 1024)
+            for _ in range(args.dimensione_mb):
+                file.write(blocco)
+
+        app = FastAPI()
+        app.mount("/download", FileDownload(directory=cartella), name="download")
+        app.mount("/starlette", StaticFiles(directory=cartella), name="starlette")
+        server, porta = _avvia_server(app)
+        base = f"http://127.0.0.1:{porta}"
+
+        meta = args.dimensione_mb * 1024 * 1024 // 2
+        _misura("StaticFiles (starlette)", f"{base}/starlette/{nome}", args.ripetizioni)
+        _misura("FileDownload completo", f"{base}/download/{nome}", args.ripetizioni)
+        _misura("FileDownload Range (seconda metà)", f"{base}/download/{nome}", args.ripetizioni,
+                {"Range": f"bytes={meta}-"})
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+BENCH_IMPORT - Profilo dei tempi di import e cold start per worker
+
+Esegue più volte, in processi nuovi, lo stesso lavoro che uvicorn fa in ogni
+worker con factory=True (import di app + create_app) sotto `python -X importtime`,
+e riporta:
+- tempo totale di cold start (mediana) confrontato con un obiettivo
+- i moduli più costosi (tempo proprio e cumulativo)
+- il peso dei moduli del progetto rispetto alle dipendenze
+
+Uso:
+    python bench/bench_import.py --ripetizioni 5 --obiettivo-ms 750
+Esce con codice 1 se la mediana supera l'obiettivo.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULI_PROGETTO = {
+    os.path.splitext(nome)[0] for nome in os.listdir(RADICE)
+    if nome.endswith(".py")
+}
+
+_RIGA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_COLD_START = """
+import time
+inizio = time.perf_counter()
+import app
+app.create_app()
+print(f"COLD_START {time.perf_counter() - inizio}")
+"""
+
+def _esegui():
+    uscita = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _COLD_START],
+        cwd=RADICE, capture_output=True, text=True, check=True,
+    )
+    moduli = {}
+    for riga in uscita.stderr.splitlines():
+        corrispondenza = _RIGA.match(riga)
+        if corrispondenza:
+            proprio, cumulativo, rientro, nome = corrispondenza.groups()
+            moduli[nome] = (int(proprio), int(cumulativo), len(rientro) // 2)
+    cold_start = float(uscita.stdout.split("COLD_START")[-1])
+    return cold_start, moduli
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--obiettivo-ms", type=float, default=750.0,
+                        help="Cold start massimo accettato per worker (import + create_app)")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    tempi = []
+    proprio = defaultdict(list)
+    cumulativo = defaultdict(list)
+    for _ in range(args.ripetizioni):
+        cold_start, moduli = _esegui()
+        tempi.append(cold_start * 1000)
+        for nome, (p, c, _) in moduli.items():
+            proprio[nome].append(p / 1000)
+            cumulativo[nome].append(c / 1000)
+
+    print(f"Moduli più costosi (tempo proprio, mediana su {args.ripetizioni} avvii):")
+    for nome in sorted(proprio, key=lambda n: statistics.median(proprio[n]), reverse=True)[:args.top]:
+        print(f"  {nome:<45} {statistics.median(proprio[nome]):8.1f} ms   cumulativo {statistics.median(cumulativo[nome]):8.1f} ms")
+
+    print("\nModuli del progetto:")
+    totale_progetto = 0.0
+    for nome in sorted(MODULI_PROGETTO & set(proprio), key=lambda n: statistics.median(proprio[n]), reverse=True):
+        totale_progetto += statistics.median(proprio[nome])
+        print(f"  {nome:<45} {statistics.median(proprio[nome]):8.1f} ms")
+    print(f"  {'totale (tempo proprio)':<45} {totale_progetto:8.1f} ms")
+
+    terze_parti = defaultdict(float)
+    for nome in proprio:
+        radice = nome.split(".")[0]
+        if radice not in MODULI_PROGETTO:
+            terze_parti[radice] += statistics.median(proprio[nome])
+    print("\nDipendenze (tempo proprio per pacchetto):")
+    for radice in sorted(terze_parti, key=terze_parti.get, reverse=True)[:8]:
+        print(f"  {radice:<45} {terze_parti[radice]:8.1f} ms")
+
+    risultato = statistics.median(tempi)
+    esito = "OK" if risultato <= args.obiettivo_ms else "OLTRE L'OBIETTIVO"
+    print(f"\nCold start per worker (import + create_app): mediana {risultato:.1f} ms, "
+          f"min {min(tempi):.1f} ms, obiettivo {args.obiettivo_ms:.0f} ms -> {esito}")
+    sys.exit(0 if risultato <= args.obiettivo_ms else 1)
+
+if __name__ == "__main__":
+    main()
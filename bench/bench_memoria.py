@@ -0,0 +1,89 @@
+"""
+BENCH_MEMORIA - Memoria per lettura di temperatura nello store
+
+Riempie una Collezione con N letture (default 1 milione) salvate come:
+- modelli Pydantic Temperatura (come prima dei record compatti)
+- RecordTemperatura (NamedTuple con sensore e posizione internati, il formato attuale)
+e misura con tracemalloc i bytes allocati per lettura: record, snapshot e
+gli indici per sensore e posizione registrati come in models.py.
+
+Le stringhe (sensore, posizione, timestamp) vengono create per ogni lettura,
+come succede quando arrivano dal JSON di una richiesta.
+
+Uso:
+    python bench/bench_memoria.py --letture 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indexes import IndiceValori
+from models import RecordTemperatura, Temperatura
+from store import Collezione
+
+def _dati_lettura(i: int) -> dict:
+    """Campi di una lettura sintetica (stringhe nuove per ogni lettura)"""
+    return {
+        "id": i,
+        "valore": 18.0 + (i % 100) / 10,
+        "sensore": f"SENSOR_{i % 50:02d}",
+        "timestamp": f"2024-01-15T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}.{i % 1000000:06d}",
+        "unita": "C",
+        "posizione": f"Aula {i % 20}",
+    }
+
+def _crea_pydantic(i: int):
+    return Temperatura(**_dati_lettura(i))
+
+def _crea_record(i: int):
+    return RecordTemperatura.crea(**_dati_lettura(i))
+
+# Variante -> (costruttore, campi indicizzati come in models.py)
+VARIANTI = {
+    "Pydantic (Temperatura)": (_crea_pydantic, ("sensore", "posizione")),
+    "Record (RecordTemperatura)": (_crea_record, ("sensore_id", "posizione_id")),
+}
+
+def misura(crea, campi_indici, letture: int):
+    """Bytes per lettura (dati, indici) e tempo di inserimento per una variante"""
+    gc.collect()
+    tracemalloc.start()
+    inizio = time.perf_counter()
+    collezione = Collezione("temperature", {i: crea(i) for i in range(1, letture + 1)})
+    collezione.snapshot()
+    dati, _ = tracemalloc.get_traced_memory()
+    for campo in campi_indici:
+        collezione.registra_indice(IndiceValori(campo))
+    durata = time.perf_counter() - inizio
+    allocati, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del collezione
+    gc.collect()
+    return dati / letture, (allocati - dati) / letture, durata
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--letture", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    risultati = {}
+    print(f"{'':<28} {'dati':>8} {'indici':>8} {'totale':>8} bytes/lettura")
+    for nome, (crea, campi_indici) in VARIANTI.items():
+        dati, indici, durata = misura(crea, campi_indici, args.letture)
+        per_lettura = dati + indici
+        risultati[nome] = per_lettura
+        totale_mb = per_lettura * args.letture / (1024 * 1024)
+        print(f"{nome:<28} {dati:8.1f} {indici:8.1f} {per_lettura:8.1f}   {totale_mb:8.1f} MB totali   {durata:6.2f} s")
+
+    base, compatto = risultati.values()
+    print(f"\nRisparmio: {base - compatto:.1f} bytes/lettura ({(1 - compatto / base) * 100:.0f}%) "
+          f"su {args.letture:,} letture")
+
+if __name__ == "__main__":
+    main()
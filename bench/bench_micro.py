@@ -0,0 +1,175 @@
+"""
+BENCH_MICRO - Microbenchmark delle funzioni chiamate a ogni richiesta
+
+Misura il costo per chiamata di:
+- preferisce_html con header Accept reali (browser, curl, client API)
+- crea_risposta con pagine di prodotti di varie dimensioni
+- genera_html_prodotti con cataloghi da 10 a 100.000 prodotti
+- scansiona_cartella_download con cartelle da 0 a 10.000 file
+
+Ogni caso è parametrizzato ("funzione[parametro]"): il numero di chiamate
+per misura viene calibrato con timeit (almeno 0,2 s) e si tiene il tempo
+migliore su --ripetizioni misure, come fanno pyperf e pytest-benchmark.
+
+Gate di regressione:
+    python bench/bench_micro.py --salva-baseline bench/baseline_micro.json
+    python bench/bench_micro.py --baseline bench/baseline_micro.json --soglia 0.20
+Esce con codice 1 se un caso rallenta più della soglia rispetto alla baseline.
+Con --rapido salta i cataloghi e le cartelle più grandi.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterator, List, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import RecordProdotto  # noqa: E402
+from utils import crea_risposta, genera_html_prodotti, preferisce_html, scansiona_cartella_download  # noqa: E402
+
+ACCEPT = {
+    "chrome": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,"
+              "image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "firefox": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "safari": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "curl": "*/*",
+    "httpie": "application/json, */*;q=0.5",
+    "fetch-json": "application/json",
+    "assente": None,
+}
+
+DIMENSIONI_CATALOGO = [10, 100, 1_000, 10_000, 100_000]
+DIMENSIONI_CARTELLA = [0, 10, 100, 1_000, 10_000]
+MASSIMO_RAPIDO = 1_000
+
+CATEGORIE = ["elettronica", "computer", "audio", "casa", "sport"]
+TAGS = ["wireless", "gaming", "5g", "bluetooth", "portatile", "offerta", "nuovo", "usato"]
+ESTENSIONI = ["pdf", "zip", "py", "ino", "pptx", "md"]
+
+class Caso(NamedTuple):
+    """Un caso del benchmark: chiamata senza argomenti da misurare"""
+    funzione: str
+    parametro: str
+    chiamata: Callable[[], object]
+
+    @property
+    def nome(self) -> str:
+        return f"{self.funzione}[{self.parametro}]"
+
+# ================================
+# DATI SINTETICI
+# ================================
+
+def catalogo(n: int, seme: int = 42) -> List[RecordProdotto]:
+    """Catalogo deterministico di n prodotti"""
+    rnd = random.Random(seme)
+    return [
+        RecordProdotto(
+            i, f"Prodotto {i} {rnd.choice(TAGS).title()}", f"Descrizione del prodotto numero {i}",
+            round(rnd.uniform(5, 2500), 2), rnd.choice(CATEGORIE), rnd.random() < 0.8,
+            tuple(rnd.sample(TAGS, rnd.randint(0, 3)))
+        )
+        for i in range(1, n + 1)
+    ]
+
+def riempi_cartella(cartella: str, n: int):
+    """n file piccoli con nomi come quelli delle risorse del corso"""
+    for i in range(n):
+        nome = f"lezione_{i:05d}_http-{'esempio' if i % 2 else 'slide'}.{ESTENSIONI[i % len(ESTENSIONI)]}"
+        with open(os.path.join(cartella, nome), "wb") as file:
+            file.write(b"x" * (i % 4096))
+
+# ================================
+# CASI
+# ================================
+
+def casi(pila: ExitStack, rapido: bool) -> Iterator[Caso]:
+    for nome, accept in ACCEPT.items():
+        yield Caso("preferisce_html", nome, lambda accept=accept: preferisce_html(accept))
+
+    for n in DIMENSIONI_CATALOGO:
+        if rapido and n > MASSIMO_RAPIDO:
+            continue
+        record = catalogo(n)
+        modelli = [r.a_modello() for r in record]
+        yield Caso("crea_risposta", f"{n}", lambda modelli=modelli: crea_risposta(True, "ok", modelli, "/prodotti"))
+        yield Caso("genera_html_prodotti", f"{n}", lambda record=record: genera_html_prodotti(record))
+
+    for n in DIMENSIONI_CARTELLA:
+        if rapido and n > MASSIMO_RAPIDO:
+            continue
+        cartella = pila.enter_context(tempfile.TemporaryDirectory())
+        riempi_cartella(cartella, n)
+        yield Caso("scansiona_cartella_download", f"{n}", lambda cartella=cartella: scansiona_cartella_download(cartella))
+
+# ================================
+# MISURA
+# ================================
+
+def misura(chiamata: Callable[[], object], ripetizioni: int) -> float:
+    """Secondi per chiamata: il migliore su più misure calibrate"""
+    timer = timeit.Timer(chiamata)
+    numero, _ = timer.autorange()
+    return min(timer.repeat(repeat=ripetizioni, number=numero)) / numero
+
+def _formatta_tempo(secondi: float) -> str:
+    if secondi < 1e-3:
+        return f"{secondi * 1e6:.2f} µs"
+    if secondi < 1:
+        return f"{secondi * 1e3:.2f} ms"
+    return f"{secondi:.2f} s"
+
+def confronta(risultati: Dict[str, float], baseline: Dict[str, float], soglia: float) -> List[str]:
+    """Casi più lenti della baseline oltre la soglia (es. 0.20 = +20%)"""
+    regressioni = []
+    for nome, secondi in risultati.items():
+        base = baseline.get(nome)
+        if base and secondi > base * (1 + soglia):
+            regressioni.append(
+                f"{nome}: {_formatta_tempo(secondi)} (baseline {_formatta_tempo(base)}, +{secondi / base - 1:.0%})"
+            )
+    return regressioni
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filtro", default="", help="Esegue solo i casi il cui nome contiene questo testo")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--rapido", action="store_true", help=f"Solo cataloghi e cartelle fino a {MASSIMO_RAPIDO}")
+    parser.add_argument("--baseline", help="JSON con i tempi di riferimento")
+    parser.add_argument("--soglia", type=float, default=0.20, help="Rallentamento massimo tollerato")
+    parser.add_argument("--salva-baseline", help="Salva i tempi misurati in questo JSON")
+    args = parser.parse_args()
+
+    risultati: Dict[str, float] = {}
+    with ExitStack() as pila:
+        print(f"{'caso':<42} {'per chiamata':>14} {'chiamate/s':>14}")
+        for caso in casi(pila, args.rapido):
+            if args.filtro not in caso.nome:
+                continue
+            secondi = misura(caso.chiamata, args.ripetizioni)
+            risultati[caso.nome] = secondi
+            print(f"{caso.nome:<42} {_formatta_tempo(secondi):>14} {1 / secondi:>14,.0f}")
+
+    if args.salva_baseline:
+        with open(args.salva_baseline, "w", encoding="utf-8") as file:
+            json.dump(risultati, file, indent=2)
+        print(f"\nBaseline salvata in {args.salva_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressioni = confronta(risultati, json.load(file), args.soglia)
+        if regressioni:
+            print(f"\nRegressioni oltre il {args.soglia:.0%}:")
+            for riga in regressioni:
+                print(f"  {riga}")
+            sys.exit(1)
+        print(f"\nNessuna regressione oltre il {args.soglia:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+BULK - Lettura e validazione degli elementi per le operazioni in blocco
+
+Il body può essere un array JSON oppure NDJSON (un oggetto per riga,
+Content-Type application/x-ndjson). L'NDJSON viene letto in streaming,
+riga per riga, senza tenere in memoria il body completo.
+
+Ogni elemento viene validato singolarmente: gli elementi non validi
+finiscono nei risultati con il loro errore, quelli validi vengono poi
+applicati tutti insieme con un'unica operazione atomica sullo store.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from negotiation import FORMATI
+
+def _errore_elemento(indice: int, stato: int, errori: Any) -> Dict[str, Any]:
+    return {"indice": indice, "stato": stato, "errori": errori}
+
+def _troppi(massimo: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Troppi elementi: massimo {massimo} per richiesta")
+
+async def _righe_ndjson(request: Request) -> AsyncIterator[bytes]:
+    """Righe non vuote del body, lette a blocchi dallo stream"""
+    resto = b""
+    async for blocco in request.stream():
+        righe = (resto + blocco).split(b"\n")
+        resto = righe.pop()
+        for riga in righe:
+            if riga.strip():
+                yield riga
+    if resto.strip():
+        yield resto
+
+async def leggi_elementi(request: Request, massimo: int) -> List[Tuple[int, Any]]:
+    """
+    Elementi del body come (indice, valore)
+    Le righe NDJSON non valide diventano valori ValueError (errore per elemento)
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in FORMATI["ndjson"]:
+        elementi = []
+        async for riga in _righe_ndjson(request):
+            if len(elementi) >= massimo:
+                raise _troppi(massimo)
+            try:
+                elementi.append((len(elementi), json.loads(riga)))
+            except ValueError as e:
+                elementi.append((len(elementi), ValueError(f"JSON non valido: {e}")))
+        return elementi
+
+    if content_type not in ("application/json", ""):
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type non supportato: usa application/json (array) o application/x-ndjson"
+        )
+    try:
+        valori = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"JSON non valido: {e}")
+    if not isinstance(valori, list):
+        raise HTTPException(status_code=400, detail="Il body deve essere un array JSON di elementi")
+    if len(valori) > massimo:
+        raise _troppi(massimo)
+    return list(enumerate(valori))
+
+def valida_elementi(
+    elementi: List[Tuple[int, Any]],
+    modello: Type[BaseModel]
+) -> Tuple[List[Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    """Separa gli elementi validi (indice, modello) dagli errori per elemento"""
+    validi = []
+    errori = []
+    for indice, valore in elementi:
+        if isinstance(valore, ValueError):
+            errori.append(_errore_elemento(indice, 400, str(valore)))
+            continue
+        try:
+            validi.append((indice, modello.model_validate(valore)))
+        except ValidationError as e:
+            errori.append(_errore_elemento(indice, 422, e.errors(include_url=False, include_context=False)))
+    return validi, errori
+
+def schema_body_bulk(schema_elemento: Dict[str, Any]) -> Dict[str, Any]:
+    """openapi_extra per documentare il body (array JSON o NDJSON) letto a mano"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": schema_elemento}},
+                "application/x-ndjson": {"schema": {"type": "string", "description": "Un elemento JSON per riga"}},
+            },
+        }
+    }
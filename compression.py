@@ -0,0 +1,369 @@
+"""
+COMPRESSION - Compressione negoziata delle risposte (gzip/brotli/zstd)
+
+Middleware ASGI che legge l'header Accept-Encoding, sceglie la codifica migliore
+tra quelle disponibili e comprime il body della risposta:
+- i body piccoli (sotto soglia) vengono inviati così come sono
+- le risposte in streaming vengono compresse chunk per chunk
+- i body grandi vengono compressi in un thread, senza bloccare l'event loop
+- i body con ETag forte vengono tenuti in cache già compressi: la cache è
+  indicizzata anche dall'hash del body, così un body che cambia a ogni
+  richiesta (es. il timestamp di crea_risposta) non viene mai servito vecchio
+
+L'ETag della variante compressa ha il suffisso della codifica ("x" -> "x-gzip"):
+resta forte, e utils.etag_corrisponde/etag_corrisponde_forte lo riportano a
+quello originale, così If-None-Match e If-Match funzionano anche con gzip.
+
+Le risposte di tipo comprimibile hanno sempre Vary: Accept-Encoding, anche
+quando non vengono compresse, e una HEAD riceve gli stessi header della GET.
+"""
+
+import gzip
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+from utils import contatori, etag_con_codifica
+
+try:
+    import brotli
+except ImportError:  # dipendenza opzionale
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # dipendenza opzionale
+    zstandard = None
+
+# Codifiche supportate in ordine di preferenza del server
+CODIFICHE_DISPONIBILI = tuple(
+    nome for nome, modulo in (("zstd", zstandard), ("br", brotli), ("gzip", gzip))
+    if modulo is not None
+)
+
+# Content-Type che vale la pena comprimere
+TIPI_COMPRIMIBILI = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+LIVELLO_GZIP = 6
+QUALITA_BROTLI = 5
+LIVELLO_ZSTD = 3
+
+contatori["compressione"] = {
+    "risposte_compresse": 0,
+    "risposte_da_cache": 0,
+    "compressioni_in_thread": 0,
+    "byte_originali": 0,
+    "byte_inviati": 0,
+    "byte_risparmiati": 0,
+    "tempo_cpu_ms": 0.0,
+    "per_codifica": {codifica: 0 for codifica in CODIFICHE_DISPONIBILI},
+}
+
+@lru_cache(maxsize=64)
+def _qualita_codifiche(accept_encoding: str) -> Dict[str, float]:
+    """Scompone l'header Accept-Encoding in {codifica: q}"""
+    qualita: Dict[str, float] = {}
+    for parte in accept_encoding.lower().split(","):
+        token, _, parametri = parte.strip().partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        q = 1.0
+        parametri = parametri.strip()
+        if parametri.startswith("q="):
+            try:
+                q = float(parametri[2:])
+            except ValueError:
+                q = 0.0
+        qualita[token] = q
+    return qualita
+
+@lru_cache(maxsize=64)
+def negozia_codifica(accept_encoding: Optional[str],
+                     disponibili: Tuple[str, ...] = CODIFICHE_DISPONIBILI) -> Optional[str]:
+    """
+    Sceglie la codifica da usare in base all'header Accept-Encoding (RFC 9110 §12.5.3)
+    Restituisce None se il client non accetta nessuna delle codifiche disponibili
+    """
+    if not accept_encoding:
+        return None
+
+    qualita = _qualita_codifiche(accept_encoding)
+    migliore, q_migliore = None, 0.0
+    for codifica in disponibili:
+        q = qualita.get(codifica, qualita.get("*", 0.0))
+        if q > q_migliore:
+            migliore, q_migliore = codifica, q
+    return migliore
+
+def comprimi(dati: bytes, codifica: str) -> bytes:
+    """Comprime un body completo con la codifica indicata"""
+    if codifica == "gzip":
+        return gzip.compress(dati, compresslevel=LIVELLO_GZIP, mtime=0)
+    if codifica == "br":
+        return brotli.compress(dati, quality=QUALITA_BROTLI)
+    if codifica == "zstd":
+        return zstandard.ZstdCompressor(level=LIVELLO_ZSTD).compress(dati)
+    raise ValueError(f"Codifica non supportata: {codifica}")
+
+class _CompressoreStreaming:
+    """Compressore incrementale: ogni chunk viene emesso subito (flush)"""
+
+    def __init__(self, codifica: str):
+        self.codifica = codifica
+        if codifica == "gzip":
+            self._c = zlib.compressobj(LIVELLO_GZIP, zlib.DEFLATED, 31)
+        elif codifica == "br":
+            self._c = brotli.Compressor(quality=QUALITA_BROTLI)
+        elif codifica == "zstd":
+            self._c = zstandard.ZstdCompressor(level=LIVELLO_ZSTD).compressobj()
+        else:
+            raise ValueError(f"Codifica non supportata: {codifica}")
+
+    def comprimi(self, dati: bytes) -> bytes:
+        if self.codifica == "gzip":
+            return self._c.compress(dati) + self._c.flush(zlib.Z_SYNC_FLUSH)
+        if self.codifica == "br":
+            return self._c.process(dati) + self._c.flush()
+        return self._c.compress(dati) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def termina(self) -> bytes:
+        if self.codifica == "br":
+            return self._c.finish()
+        return self._c.flush()
+
+    def chunk(self, dati: bytes, ultimo: bool) -> bytes:
+        """Comprime un chunk, chiudendo lo stream se è l'ultimo"""
+        compresso = self.comprimi(dati) if dati else b""
+        if ultimo:
+            compresso += self.termina()
+        return compresso
+
+def _misura_cpu(funzione: Callable[..., bytes], *args) -> Tuple[bytes, float]:
+    """Risultato di funzione(*args) e tempo CPU del thread che l'ha eseguita"""
+    inizio = time.thread_time()
+    risultato = funzione(*args)
+    return risultato, time.thread_time() - inizio
+
+def _registra(codifica: str, originali: int, inviati: int, cpu: float,
+              nuova_risposta: bool = True, da_cache: bool = False):
+    """Aggiorna le metriche di compressione esposte su /statistiche"""
+    stat = contatori["compressione"]
+    if nuova_risposta:
+        stat["risposte_compresse"] += 1
+        stat["per_codifica"][codifica] += 1
+    stat["byte_originali"] += originali
+    stat["byte_inviati"] += inviati
+    stat["byte_risparmiati"] += originali - inviati
+    stat["tempo_cpu_ms"] = round(stat["tempo_cpu_ms"] + cpu * 1000, 3)
+    if da_cache:
+        stat["risposte_da_cache"] += 1
+
+class CompressioneMiddleware:
+    """Middleware ASGI per la compressione negoziata delle risposte"""
+
+    def __init__(self, app, soglia: int = 1024, voci_cache: int = 128, soglia_thread: int = 64 * 1024):
+        self.app = app
+        self.soglia = soglia
+        self.voci_cache = voci_cache
+        self.soglia_thread = soglia_thread
+        # (path, etag, codifica) -> (sha256 del body originale, body compresso)
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[bytes, bytes]]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for nome, valore in scope["headers"]:
+            if nome == b"accept-encoding":
+                accept_encoding = valore.decode("latin-1")
+                break
+
+        # Anche senza codifica accettata la risposta passa dal wrapper, per Vary
+        codifica = negozia_codifica(accept_encoding)
+        risposta = _RispostaCompressa(self, scope["path"], scope["method"] == "HEAD", codifica, send)
+        await self.app(scope, receive, risposta.send)
+
+    def _da_cache(self, chiave, impronta: bytes) -> Optional[bytes]:
+        """Body compresso in cache, solo se l'originale è identico byte per byte"""
+        voce = self._cache.get(chiave)
+        if voce is None or voce[0] != impronta:
+            return None
+        self._cache.move_to_end(chiave)
+        return voce[1]
+
+    def _in_cache(self, chiave, impronta: bytes, compresso: bytes):
+        self._cache[chiave] = (impronta, compresso)
+        self._cache.move_to_end(chiave)
+        if len(self._cache) > self.voci_cache:
+            self._cache.popitem(last=False)
+
+class _RispostaCompressa:
+    """Intercetta i messaggi di una singola risposta e decide se comprimerla"""
+
+    def __init__(self, middleware: CompressioneMiddleware, path: str, head: bool, codifica: Optional[str], send):
+        self.middleware = middleware
+        self.path = path
+        self.head = head
+        self.codifica = codifica
+        self._send = send
+        self._start = None
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._passthrough = False
+        self._compressore: Optional[_CompressoreStreaming] = None
+        self._cpu = 0.0
+
+    def _header(self, nome: bytes) -> Optional[bytes]:
+        for chiave, valore in self._headers:
+            if chiave == nome:
+                return valore
+        return None
+
+    def _negoziabile(self) -> bool:
+        """La risposta potrebbe essere compressa (a seconda di Accept-Encoding)?"""
+        if self._start["status"] in (204, 206, 304) or self._start["status"] < 200:
+            return False
+        if self._header(b"content-encoding") is not None:
+            return False
+        tipo = (self._header(b"content-type") or b"").decode("latin-1").lower()
+        return tipo.startswith(TIPI_COMPRIMIBILI) or tipo.split(";")[0].endswith(("+json", "+xml"))
+
+    def _headers_con_vary(self) -> List[Tuple[bytes, bytes]]:
+        """Header originali con Accept-Encoding aggiunto a Vary"""
+        headers = []
+        vary = None
+        for chiave, valore in self._headers:
+            if chiave == b"vary":
+                vary = valore
+            else:
+                headers.append((chiave, valore))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif vary.strip() != b"*" and b"accept-encoding" not in vary.lower():
+            vary += b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        return headers
+
+    def _headers_compressi(self, lunghezza: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = []
+        for chiave, valore in self._headers_con_vary():
+            # I Range si riferiscono al body originale, non a quello compresso
+            if chiave in (b"content-length", b"accept-ranges"):
+                continue
+            if chiave == b"etag":
+                # La rappresentazione compressa non è identica byte per byte:
+                # ETag distinto per codifica, forte come l'originale (If-Match)
+                valore = etag_con_codifica(valore.decode("latin-1"), self.codifica).encode("latin-1")
+            headers.append((chiave, valore))
+        headers.append((b"content-encoding", self.codifica.encode("latin-1")))
+        if lunghezza is not None:
+            headers.append((b"content-length", str(lunghezza).encode("latin-1")))
+        return headers
+
+    async def _comprimi(self, funzione: Callable[..., bytes], dati: bytes, *args) -> bytes:
+        """Comprime nel loop i body piccoli, in un thread quelli grandi"""
+        if len(dati) >= self.middleware.soglia_thread:
+            contatori["compressione"]["compressioni_in_thread"] += 1
+            compresso, cpu = await anyio.to_thread.run_sync(_misura_cpu, funzione, dati, *args)
+        else:
+            compresso, cpu = _misura_cpu(funzione, dati, *args)
+        self._cpu = cpu
+        return compresso
+
+    async def _invia_non_compressa(self, message=None):
+        self._passthrough = True
+        await self._send({**self._start, "headers": self._headers_con_vary()})
+        if message is not None:
+            await self._send(message)
+
+    async def send(self, message):
+        tipo = message["type"]
+
+        if tipo == "http.response.start":
+            self._start = message
+            self._headers = list(message.get("headers", []))
+            if not self._negoziabile():
+                self._passthrough = True
+                await self._send(message)
+                return
+            lunghezza = self._header(b"content-length")
+            if self.codifica is None or (lunghezza is not None and int(lunghezza) < self.middleware.soglia):
+                await self._invia_non_compressa()
+            return
+
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if tipo != "http.response.body":
+            # Estensioni (zerocopy, pathsend...): inoltra senza comprimere
+            await self._invia_non_compressa(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressore is not None:
+            dati = await self._comprimi(self._compressore.chunk, body, not more_body)
+            _registra(self.codifica, len(body), len(dati), self._cpu, nuova_risposta=False)
+            await self._send({"type": "http.response.body", "body": dati, "more_body": more_body})
+            return
+
+        if not more_body:
+            if self.head and not body:
+                # HEAD senza body (es. file): stessi header della GET, lunghezza non nota
+                if self._header(b"content-length") is None:
+                    await self._invia_non_compressa(message)
+                else:
+                    self._passthrough = True
+                    await self._send({**self._start, "headers": self._headers_compressi(None)})
+                    await self._send(message)
+                return
+
+            # Body completo in un solo messaggio
+            if len(body) < self.middleware.soglia:
+                await self._invia_non_compressa(message)
+                return
+
+            etag = self._header(b"etag")
+            chiave = impronta = None
+            if etag is not None and not etag.startswith(b"W/"):
+                chiave = (self.path, etag.decode("latin-1"), self.codifica)
+                impronta = hashlib.sha256(body).digest()
+                compresso = self.middleware._da_cache(chiave, impronta)
+                if compresso is not None:
+                    _registra(self.codifica, len(body), len(compresso), 0.0, da_cache=True)
+                    await self._invia_completo(compresso)
+                    return
+
+            compresso = await self._comprimi(comprimi, body, self.codifica)
+            _registra(self.codifica, len(body), len(compresso), self._cpu)
+            if chiave is not None:
+                self.middleware._in_cache(chiave, impronta, compresso)
+            await self._invia_completo(compresso)
+            return
+
+        # Risposta in streaming: comprime ogni chunk man mano che arriva
+        self._compressore = _CompressoreStreaming(self.codifica)
+        await self._send({**self._start, "headers": self._headers_compressi(None)})
+        dati = await self._comprimi(self._compressore.chunk, body, False)
+        _registra(self.codifica, len(body), len(dati), self._cpu)
+        await self._send({"type": "http.response.body", "body": dati, "more_body": True})
+
+    async def _invia_completo(self, compresso: bytes):
+        await self._send({**self._start, "headers": self._headers_compressi(len(compresso))})
+        await self._send({"type": "http.response.body", "body": compresso, "more_body": False})
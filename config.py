@@ -0,0 +1,76 @@
+"""
+CONFIG - Parametri di configurazione del server
+
+Tutti i valori possono essere sovrascritti con variabili d'ambiente
+(prefisso HTTP_EXPLORER_), così funzionano anche con uvicorn in modalità factory.
+"""
+
+import os
+
+def _env_int(nome: str, default: int) -> int:
+    """Legge un intero da variabile d'ambiente"""
+    valore = os.environ.get(f"HTTP_EXPLORER_{nome}")
+    return int(valore) if valore else default
+
+def _env_bool(nome: str, default: bool) -> bool:
+    """Legge un booleano da variabile d'ambiente (1/true/si)"""
+    valore = os.environ.get(f"HTTP_EXPLORER_{nome}")
+    if not valore:
+        return default
+    return valore.strip().lower() in ("1", "true", "si", "yes", "on")
+
+# Ambiente di esecuzione: "sviluppo" oppure "produzione"
+AMBIENTE = os.environ.get("HTTP_EXPLORER_AMBIENTE", "sviluppo")
+
+# Documentazione interattiva (/docs, /redoc, /openapi.json), spenta di default in produzione
+DOCS_ABILITATE = _env_bool("DOCS", AMBIENTE != "produzione")
+# Schema OpenAPI costruito all'avvio invece che alla prima richiesta (solo se la
+# documentazione è servita: altrimenti nessuno lo chiederebbe)
+OPENAPI_PRECALCOLATO = _env_bool("OPENAPI_PRECALCOLATO", DOCS_ABILITATE)
+# Snapshot dello schema generato in fase di build (python schema_openapi.py openapi.json)
+OPENAPI_SNAPSHOT = os.environ.get("HTTP_EXPLORER_OPENAPI_SNAPSHOT")
+
+# Compressione delle risposte
+COMPRESSIONE_ABILITATA = _env_bool("COMPRESSIONE", True)
+COMPRESSIONE_SOGLIA_BYTES = _env_int("COMPRESSIONE_SOGLIA", 1024)
+COMPRESSIONE_CACHE_VOCI = _env_int("COMPRESSIONE_CACHE_VOCI", 128)
+# Body più grandi di così vengono compressi in un thread invece che nell'event loop
+COMPRESSIONE_SOGLIA_THREAD_BYTES = _env_int("COMPRESSIONE_SOGLIA_THREAD", 64 * 1024)
+
+# Collezione Postman: "generata" dalle rotte oppure letta da "file"
+POSTMAN_SORGENTE = os.environ.get("HTTP_EXPLORER_POSTMAN_SORGENTE", "generata")
+# Generazione della collezione all'avvio (in produzione viene creata alla prima richiesta)
+POSTMAN_PRECARICA = _env_bool("POSTMAN_PRECARICA", AMBIENTE != "produzione")
+
+# Numero massimo di elementi per richiesta nelle operazioni in blocco (/prodotti/bulk)
+BULK_MAX_ELEMENTI = _env_int("BULK_MAX_ELEMENTI", 100_000)
+
+# Dati sintetici caricati all'avvio (vedi seed.py), es. "prodotti=100000,temperature=1000000"
+SEED = os.environ.get("HTTP_EXPLORER_SEED", "")
+SEED_SEME = _env_int("SEED_SEME", 42)
+# Token per gli endpoint /admin (senza token gli endpoint non vengono registrati)
+ADMIN_TOKEN = os.environ.get("HTTP_EXPLORER_ADMIN_TOKEN")
+
+# Profilazione delle richieste con l'header X-Profile (vedi profiling.py): spenta
+# di default, da spenta il middleware non viene registrato
+PROFILAZIONE_ABILITATA = _env_bool("PROFILAZIONE", False)
+# Se impostato, serve anche l'header X-Profile-Token con questo valore
+PROFILAZIONE_TOKEN = os.environ.get("HTTP_EXPLORER_PROFILAZIONE_TOKEN")
+# Cartella dei profili salvati con X-Profile: salva
+PROFILAZIONE_CARTELLA = os.environ.get("HTTP_EXPLORER_PROFILAZIONE_CARTELLA", "profili")
+
+# Monitor del ritardo dell'event loop (vedi loop_monitor.py), mostrato su /statistiche
+MONITOR_LOOP_ABILITATO = _env_bool("MONITOR_LOOP", True)
+MONITOR_LOOP_INTERVALLO_MS = _env_int("MONITOR_LOOP_INTERVALLO_MS", 50)
+MONITOR_LOOP_SOGLIA_MS = _env_int("MONITOR_LOOP_SOGLIA_MS", 100)
+# Cattura dello stack dei blocchi con un thread watchdog
+MONITOR_LOOP_DEBUG = _env_bool("MONITOR_LOOP_DEBUG", False)
+
+# Pool per il lavoro CPU pesante (vedi executor.py): "thread", "processo" o "nessuno"
+ESECUTORE = os.environ.get("HTTP_EXPLORER_ESECUTORE", "thread")
+ESECUTORE_WORKER = _env_int("ESECUTORE_WORKER", min(4, os.cpu_count() or 1))
+# Lavori contemporanei nel pool e in attesa (oltre: 503 con Retry-After)
+ESECUTORE_IN_VOLO = _env_int("ESECUTORE_IN_VOLO", 2 * ESECUTORE_WORKER)
+ESECUTORE_CODA = _env_int("ESECUTORE_CODA", 64)
+# Numero di elementi (prodotti di una pagina, elementi di un bulk) oltre cui usare il pool
+ESECUTORE_SOGLIA_ELEMENTI = _env_int("ESECUTORE_SOGLIA_ELEMENTI", 1000)
@@ -5,29 +5,58 @@ ENDPOINTS - Tutti gli endpoint dell'API
 import os
 import json
 import asyncio
+import heapq
+import secrets
 from datetime import datetime
+from functools import partial
 from typing import Optional, List, Dict, Any
 
 from fastapi import FastAPI, HTTPException, Request, Response, Header, Query, Path
-from fastapi.responses import JSONResponse, PlainTextResponse, HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, HTMLResponse, FileResponse, StreamingResponse
+from pydantic import ValidationError
+
+import config
 
 from models import (
-    Prodotto, AggiornaProdotto, Utente, RispostaHTTP, Temperatura, CreaTemperatura,
-    prodotti_db, utenti_db, temperature_db
+    Prodotto, AggiornaProdotto, AggiornaProdottoBulk, RiferimentoProdotto, Utente, RispostaHTTP, Temperatura, CreaTemperatura,
+    RichiestaSeed,
+    RecordProdotto, RecordUtente, RecordTemperatura, a_modelli,
+    prodotti_db, utenti_db, temperature_db, indice_sensori, indice_testuale, posizioni,
+    indice_valori_temperature, indice_letture_recenti
 )
 from utils import (
     crea_risposta, preferisce_html, genera_html_prodotti,
     genera_html_singolo_prodotto, genera_html_homepage,
-    leggi_collezione_postman, scansiona_cartella_download, contatori
+    contatori, etag_corrisponde, etag_corrisponde_forte,
+    filtra_prodotti, cerca_temperature, blocchi_temperature,
+    ids_prodotti, pagina_prodotti, facette_prodotti, json_letture_sensore
 )
+from resources import CatalogoRisorse
+from static_files import FileDownload
+from compression import negozia_codifica
+from negotiation import FORMATI, negozia_formato, scegli_formato
+from export import RIGHE_PER_CHUNK, a_blocchi, esporta, media_type_export
+from bulk import leggi_elementi, valida_elementi, schema_body_bulk
+from patch import MERGE_PATCH, JSON_PATCH, ErrorePatch, applica_merge_patch, applica_json_patch
+from store import campi_modificati
+from executor import serializza_json
+
+CAMPI_EXPORT_PRODOTTI = ("id", "nome", "descrizione", "prezzo", "categoria", "disponibile", "tags")
+CAMPI_EXPORT_TEMPERATURE = ("id", "valore", "sensore", "timestamp", "unita", "posizione")
 
 def register_routes(app: FastAPI):
     """Registra tutti gli endpoint nell'app FastAPI"""
     
-    # Monta la cartella download per servire file statici
+    # Pool per risposte e validazioni grandi (vedi executor.py)
+    esecutore = app.state.esecutore
+
+    # Catalogo delle risorse del corso (aggiornato quando cambia la cartella)
+    catalogo_risorse = CatalogoRisorse("download")
+
+    # Monta la cartella download per servire file statici (Range, ETag, varianti .gz/.br)
     if os.path.exists("download"):
-        app.mount("/download", StaticFiles(directory="download"), name="download")
+        app.mount("/download", FileDownload(directory="download"), name="download")
     
     # ================================
     # ENDPOINT INFORMATIVI E DIAGNOSTICI
@@ -79,10 +108,11 @@ def register_routes(app: FastAPI):
     @app.get("/statistiche", response_model=RispostaHTTP, summary="Statistiche del server")
     async def ottieni_statistiche():
         """Mostra statistiche di utilizzo del server"""
+        monitor = getattr(app.state, "monitor_loop", None)
         return crea_risposta(
             success=True,
             message="Statistiche aggiornate del server",
-            data=contatori,
+            data={**contatori, "event_loop": monitor.statistiche()} if monitor else contatori,
             endpoint="/statistiche"
         )
 
@@ -139,92 +169,28 @@ def register_routes(app: FastAPI):
     # ================================
 
     @app.get("/risorse", summary="Risorse del corso")
-    async def pagina_risorse(request: Request, accept: str = Header(None)):
+    async def pagina_risorse(request: Request, accept: str = Header(None), if_none_match: str = Header(None)):
         """
         Pagina con tutte le risorse del corso scaricabili
+
+        Il catalogo viene ricalcolato solo quando cambia la cartella download;
+        HTML e JSON sono già pronti in memoria e validabili con ETag.
         """
-        risorse = scansiona_cartella_download()
-        
-        if preferisce_html(accept):
-            html_content = f"""
-            <!DOCTYPE html>
-            <html lang="it">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Risorse del Corso - HTTP Explorer</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                    .container {{ background: white; padding: 30px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); max-width: 900px; margin: 0 auto; }}
-                    h1 {{ color: #2c3e50; text-align: center; border-bottom: 3px solid #3498db; padding-bottom: 15px; }}
-                    .intro {{ background: #e8f4fd; border-left: 4px solid #3498db; padding: 20px; margin: 20px 0; border-radius: 5px; }}
-                    .resources-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; margin-top: 30px; }}
-                    .resource-card {{ background: #f8f9fa; border: 1px solid #dee2e6; border-radius: 8px; padding: 20px; transition: transform 0.2s; }}
-                    .resource-card:hover {{ transform: translateY(-2px); box-shadow: 0 4px 8px rgba(0,0,0,0.1); }}
-                    .resource-type {{ display: inline-block; background: #6c757d; color: white; padding: 4px 8px; border-radius: 4px; font-size: 0.8em; margin-bottom: 10px; }}
-                    .resource-type.pdf {{ background: #dc3545; }}
-                    .resource-type.txt {{ background: #28a745; }}
-                    .resource-type.zip {{ background: #ffc107; color: #212529; }}
-                    .resource-type.json {{ background: #17a2b8; }}
-                    .download-btn {{ display: inline-block; background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin-top: 10px; }}
-                    .download-btn:hover {{ background: #0056b3; }}
-                    .no-resources {{ text-align: center; color: #6c757d; font-style: italic; padding: 40px; }}
-                    .back-link {{ text-align: center; margin-top: 30px; }}
-                    .btn {{ display: inline-block; padding: 10px 20px; margin: 5px; background: #6c757d; color: white; text-decoration: none; border-radius: 5px; }}
-                    .btn:hover {{ background: #545b62; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>Risorse del Corso</h1>
-                    
-                    <div class="intro">
-                        <h3>Materiali Didattici</h3>
-                        <p>In questa sezione trovi tutti i materiali del corso "Didattica per il laboratorio di telecomunicazioni" che puoi scaricare e utilizzare per le tue lezioni.</p>
-                        <p><strong>Suggerimento:</strong> Fai clic destro sui link di download e seleziona "Salva link con nome" per scaricare i file.</p>
-                    </div>
-            """
-            
-            if not risorse:
-                html_content += """
-                    <div class="no-resources">
-                        <h3>Nessuna risorsa disponibile</h3>
-                        <p>Al momento non ci sono risorse nella cartella download.</p>
-                        <p>Il docente può aggiungere file nella cartella 'download' del progetto.</p>
-                    </div>
-                """
-            else:
-                html_content += '<div class="resources-grid">'
-                for risorsa in risorse:
-                    html_content += f"""
-                    <div class="resource-card">
-                        <span class="resource-type {risorsa.tipo}">{risorsa.tipo.upper()}</span>
-                        <h3>{risorsa.nome}</h3>
-                        <p>{risorsa.descrizione}</p>
-                        <p><strong>Dimensione:</strong> {risorsa.dimensione}</p>
-                        <a href="{risorsa.url_download}" class="download-btn" download>Scarica</a>
-                    </div>
-                    """
-                html_content += '</div>'
-            
-            html_content += """
-                    <div class="back-link">
-                        <a href="/" class="btn">Torna alla Homepage</a>
-                        <a href="/docs" class="btn">Documentazione API</a>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            return HTMLResponse(content=html_content)
-        
+        formato = "html" if preferisce_html(accept) else "json"
+        # ETag e body dalla stessa versione del catalogo
+        catalogo = await catalogo_risorse.corrente()
+        etag = catalogo.etag(formato)
+        headers = {"ETag": etag, "Vary": "Accept", "Cache-Control": "no-cache"}
+
+        # Conditional request: il catalogo non è cambiato
+        if etag_corrisponde(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        if formato == "html":
+            return Response(content=catalogo.html(), media_type="text/html; charset=utf-8", headers=headers)
+
         # Risposta JSON per API client
-        return crea_risposta(
-            success=True,
-            message=f"Trovate {len(risorse)} risorse del corso",
-            data=risorse,
-            endpoint="/risorse"
-        )
+        return Response(content=catalogo.json(), media_type="application/json", headers=headers)
 
     # ================================
     # API PRODOTTI (E-COMMERCE SIMULATO)
@@ -238,6 +204,10 @@ def register_routes(app: FastAPI):
         disponibile: Optional[bool] = Query(None, description="Filtra per disponibilità"),
         prezzo_min: Optional[float] = Query(None, ge=0, description="Prezzo minimo"),
         prezzo_max: Optional[float] = Query(None, ge=0, description="Prezzo massimo"),
+        tag: Optional[List[str]] = Query(None, description="Filtra per tag (ripetibile)"),
+        tag_modo: str = Query("any", pattern="^(any|all)$", description="'any': almeno un tag, 'all': tutti i tag"),
+        facets: bool = Query(False, description="Includi i conteggi per categoria, tag e disponibilità"),
+        ordina: str = Query("id", pattern="^-?(id|prezzo|nome)$", description="Ordinamento: id, prezzo, nome (prefisso '-' per decrescente)"),
         limite: int = Query(10, ge=1, le=100, description="Numero massimo di risultati"),
         pagina: int = Query(1, ge=1, description="Numero di pagina")
     ):
@@ -246,29 +216,19 @@ def register_routes(app: FastAPI):
         
         Dimostra:
         - Content Negotiation (HTML per browser, JSON per API)
-        - Query parameters per filtri
+        - Query parameters per filtri (anche ripetuti: ?tag=audio&tag=wireless)
         - Paginazione
         - Validazione parametri
+        - Facette: conteggi calcolati dagli indici, senza scorrere il catalogo
+        - Ordinamento (?ordina=-prezzo) servito da indici già ordinati
         """
-        prodotti_filtrati = list(prodotti_db.values())
-        
-        # Applicazione filtri
-        if categoria:
-            prodotti_filtrati = [p for p in prodotti_filtrati if p.categoria.lower() == categoria.lower()]
-        
-        if disponibile is not None:
-            prodotti_filtrati = [p for p in prodotti_filtrati if p.disponibile == disponibile]
-        
-        if prezzo_min is not None:
-            prodotti_filtrati = [p for p in prodotti_filtrati if p.prezzo >= prezzo_min]
-        
-        if prezzo_max is not None:
-            prodotti_filtrati = [p for p in prodotti_filtrati if p.prezzo <= prezzo_max]
+        # Filtri risolti sugli indici: posting set (categoria, disponibilità, tag)
+        # e intervallo di prezzo; None = nessun filtro
+        ids = ids_prodotti(categoria, disponibile, tag, tag_modo == "all", prezzo_min, prezzo_max)
+        totale_risultati = len(prodotti_db) if ids is None else len(ids)
         
-        # Paginazione
-        start_idx = (pagina - 1) * limite
-        end_idx = start_idx + limite
-        prodotti_paginati = prodotti_filtrati[start_idx:end_idx]
+        # Paginazione (con ordinamento servito dagli indici ordinati)
+        prodotti_paginati = pagina_prodotti(ids, ordina, (pagina - 1) * limite, limite)
         
         # Content Negotiation
         if preferisce_html(accept):
@@ -285,38 +245,225 @@ def register_routes(app: FastAPI):
                 if prezzo_max:
                     range_prezzo.append(f"max €{prezzo_max}")
                 titolo += f" - Prezzo: {', '.join(range_prezzo)}"
+            if tag:
+                from html import escape
+                titolo += f" - Tag: {escape(', '.join(tag))}"
             
             return HTMLResponse(content=genera_html_prodotti(prodotti_paginati, titolo))
         
         # Risposta JSON per API client
         return crea_risposta(
             success=True,
-            message=f"Trovati {len(prodotti_filtrati)} prodotti, mostrati {len(prodotti_paginati)}",
+            message=f"Trovati {totale_risultati} prodotti, mostrati {len(prodotti_paginati)}",
             data={
-                "prodotti": prodotti_paginati,
+                "prodotti": a_modelli(prodotti_paginati),
                 "paginazione": {
                     "pagina_corrente": pagina,
                     "limite_per_pagina": limite,
-                    "totale_risultati": len(prodotti_filtrati),
-                    "totale_pagine": (len(prodotti_filtrati) + limite - 1) // limite
+                    "totale_risultati": totale_risultati,
+                    "totale_pagine": (totale_risultati + limite - 1) // limite
                 },
                 "filtri_applicati": {
                     "categoria": categoria,
                     "disponibile": disponibile,
                     "prezzo_min": prezzo_min,
-                    "prezzo_max": prezzo_max
-                }
+                    "prezzo_max": prezzo_max,
+                    "tag": tag,
+                    "tag_modo": tag_modo
+                },
+                "ordinamento": ordina,
+                **({"facets": facette_prodotti(ids)} if facets else {})
             },
             endpoint="/prodotti"
         )
 
+    @app.get("/prodotti/export", summary="Esporta prodotti (CSV / NDJSON)")
+    async def esporta_prodotti(
+        accept: str = Header(None),
+        formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Forza formato: 'csv' o 'ndjson'"),
+        categoria: Optional[str] = Query(None, description="Filtra per categoria"),
+        disponibile: Optional[bool] = Query(None, description="Filtra per disponibilità"),
+        prezzo_min: Optional[float] = Query(None, ge=0, description="Prezzo minimo"),
+        prezzo_max: Optional[float] = Query(None, ge=0, description="Prezzo massimo"),
+        tag: Optional[List[str]] = Query(None, description="Filtra per tag (ripetibile)"),
+        tag_modo: str = Query("any", pattern="^(any|all)$", description="'any': almeno un tag, 'all': tutti i tag")
+    ):
+        """
+        Esporta tutto il catalogo in streaming, senza paginazione
+
+        Usa gli stessi filtri di /prodotti. Il formato si sceglie con ?formato=
+        oppure con l'header Accept (text/csv o application/x-ndjson).
+        """
+        formato = formato or scegli_formato(accept, ("csv", "ndjson"))
+        # Lo snapshot non cambia durante lo streaming: viene diviso in blocchi
+        # prima di filtrare, così il loop viene ceduto anche se il filtro scarta quasi tutto
+        blocchi = (
+            list(filtra_prodotti(blocco, categoria, disponibile, prezzo_min, prezzo_max, tag, tag_modo == "all"))
+            for blocco in a_blocchi(prodotti_db.snapshot())
+        )
+
+        return StreamingResponse(
+            esporta(blocchi, CAMPI_EXPORT_PRODOTTI, formato),
+            media_type=media_type_export(formato),
+            headers={"Content-Disposition": f"attachment; filename=prodotti.{formato}"}
+        )
+
+    @app.get("/prodotti/cerca", summary="Ricerca testuale prodotti")
+    async def cerca_prodotti(
+        request: Request,
+        accept: str = Header(None),
+        q: str = Query(..., min_length=1, max_length=200, description="Testo da cercare in nome, descrizione e tags"),
+        limite: int = Query(10, ge=1, le=100, description="Numero massimo di risultati"),
+        pagina: int = Query(1, ge=1, description="Numero di pagina")
+    ):
+        """
+        Cerca prodotti per testo libero
+
+        Usa un indice invertito (aggiornato a ogni modifica del catalogo):
+        maiuscole, accenti e desinenze non contano ("cuffia" trova "Cuffie").
+        I risultati sono ordinati per rilevanza (BM25).
+        """
+        totale, risultati = indice_testuale.cerca(q, limite=limite, scarta=(pagina - 1) * limite)
+        prodotti = [prodotti_db[id] for id, _ in risultati]
+
+        if preferisce_html(accept):
+            from html import escape
+            return HTMLResponse(content=genera_html_prodotti(prodotti, f"Ricerca: {escape(q)}"))
+
+        return crea_risposta(
+            success=True,
+            message=f"Trovati {totale} prodotti per '{q}', mostrati {len(prodotti)}",
+            data={
+                "risultati": [
+                    {"prodotto": prodotto.a_modello(), "punteggio": round(punteggio, 4)}
+                    for prodotto, (_, punteggio) in zip(prodotti, risultati)
+                ],
+                "paginazione": {
+                    "pagina_corrente": pagina,
+                    "limite_per_pagina": limite,
+                    "totale_risultati": totale,
+                    "totale_pagine": (totale + limite - 1) // limite
+                },
+                "query": q
+            },
+            endpoint="/prodotti/cerca"
+        )
+
+    # Operazioni in blocco: registrate prima di /prodotti/{prodotto_id}
+
+    async def _risposta_bulk(risultati: List[Dict[str, Any]], messaggio: str):
+        risultati.sort(key=lambda r: r["indice"])
+        riusciti = sum(1 for r in risultati if r["stato"] < 400)
+        risposta = crea_risposta(
+            success=riusciti == len(risultati),
+            message=f"{messaggio}: {riusciti} riusciti, {len(risultati) - riusciti} con errori",
+            data={
+                "risultati": risultati,
+                "riepilogo": {"totale": len(risultati), "riusciti": riusciti, "errori": len(risultati) - riusciti},
+                "versione_catalogo": prodotti_db.versione
+            },
+            endpoint="/prodotti/bulk"
+        )
+        # Molti risultati: JSON serializzato nel pool invece che nel loop
+        if esecutore.grande(len(risultati)):
+            return Response(content=await esecutore.esegui(serializza_json, risposta), media_type="application/json")
+        return risposta
+
+    @app.post(
+        "/prodotti/bulk", response_model=RispostaHTTP, summary="Crea prodotti in blocco",
+        openapi_extra=schema_body_bulk({"$ref": "#/components/schemas/Prodotto"})
+    )
+    async def crea_prodotti_bulk(request: Request):
+        """
+        Crea più prodotti con una sola richiesta (array JSON o NDJSON)
+
+        Ogni elemento viene validato: quelli validi sono inseriti tutti insieme
+        (una sola modifica del catalogo), quelli non validi sono riportati
+        nei risultati con indice ed errori. Gli ID vengono sempre assegnati dal server.
+        """
+        elementi = await leggi_elementi(request, config.BULK_MAX_ELEMENTI)
+        validi, risultati = await esecutore.esegui_se_grande(len(elementi), valida_elementi, elementi, Prodotto)
+
+        creati = await prodotti_db.inserisci_molti(
+            (lambda nuovo_id, prodotto=prodotto: RecordProdotto.da_modello(prodotto, nuovo_id))
+            for _, prodotto in validi
+        )
+        risultati.extend(
+            {"indice": indice, "stato": 201, "id": record.id}
+            for (indice, _), record in zip(validi, creati)
+        )
+        return await _risposta_bulk(risultati, "Prodotti creati")
+
+    @app.patch(
+        "/prodotti/bulk", response_model=RispostaHTTP, summary="Aggiorna prodotti in blocco",
+        openapi_extra=schema_body_bulk({"$ref": "#/components/schemas/AggiornaProdottoBulk"})
+    )
+    async def aggiorna_prodotti_bulk(request: Request):
+        """
+        Aggiornamento parziale di più prodotti (array JSON o NDJSON)
+
+        Ogni elemento contiene l'id del prodotto e i soli campi da modificare.
+        """
+        elementi = await leggi_elementi(request, config.BULK_MAX_ELEMENTI)
+        validi, risultati = await esecutore.esegui_se_grande(len(elementi), valida_elementi, elementi, AggiornaProdottoBulk)
+
+        def aggiorna_e_valida(record: RecordProdotto, campi: dict) -> RecordProdotto:
+            # Il prodotto risultante deve essere valido (es. "nome": null non lo è):
+            # altrimenti ValidationError e l'elemento viene scartato dallo store
+            return RecordProdotto.da_modello(Prodotto.model_validate({**record._asdict(), **campi}))
+
+        aggiornati = await prodotti_db.aggiorna_molti(
+            (aggiornamento.id, partial(aggiorna_e_valida, campi=aggiornamento.model_dump(exclude_unset=True, exclude={"id"})))
+            for _, aggiornamento in validi
+        )
+        for (indice, aggiornamento), record in zip(validi, aggiornati):
+            if record is None:
+                risultati.append({"indice": indice, "stato": 404, "id": aggiornamento.id, "errori": "Prodotto non trovato"})
+            elif isinstance(record, ValidationError):
+                risultati.append({
+                    "indice": indice, "stato": 422, "id": aggiornamento.id,
+                    "errori": record.errors(include_url=False, include_context=False)
+                })
+            else:
+                risultati.append({"indice": indice, "stato": 200, "id": record.id})
+        return await _risposta_bulk(risultati, "Prodotti aggiornati")
+
+    @app.delete(
+        "/prodotti/bulk", response_model=RispostaHTTP, summary="Elimina prodotti in blocco",
+        openapi_extra=schema_body_bulk({"oneOf": [{"type": "integer"}, {"$ref": "#/components/schemas/RiferimentoProdotto"}]})
+    )
+    async def elimina_prodotti_bulk(request: Request):
+        """Elimina più prodotti: array (o NDJSON) di ID oppure di oggetti {"id": ...}"""
+        elementi = await leggi_elementi(request, config.BULK_MAX_ELEMENTI)
+        elementi = [(indice, {"id": valore} if isinstance(valore, int) else valore) for indice, valore in elementi]
+        validi, risultati = await esecutore.esegui_se_grande(len(elementi), valida_elementi, elementi, RiferimentoProdotto)
+
+        eliminati = await prodotti_db.elimina_molti(riferimento.id for _, riferimento in validi)
+        for (indice, riferimento), record in zip(validi, eliminati):
+            if record is None:
+                risultati.append({"indice": indice, "stato": 404, "id": riferimento.id, "errori": "Prodotto non trovato"})
+            else:
+                risultati.append({"indice": indice, "stato": 200, "id": record.id})
+        return await _risposta_bulk(risultati, "Prodotti eliminati")
+
+    def _etag_prodotto(prodotto_id: int, formato: str = "json") -> str:
+        """ETag di un prodotto: cambia solo quando cambia la sua revisione"""
+        suffisso = "" if formato == "json" else f"-{formato}"
+        return f'"prodotto-{prodotto_id}-r{prodotti_db.revisione(prodotto_id)}{suffisso}"'
+
     @app.get("/prodotti/{prodotto_id}", summary="Dettagli prodotto")
     async def ottieni_prodotto(
         request: Request,
+        response: Response,
         accept: str = Header(None),
         prodotto_id: int = Path(..., ge=1, description="ID del prodotto")
     ):
-        """Ottieni dettagli di un prodotto specifico"""
+        """
+        Ottieni dettagli di un prodotto specifico
+
+        L'ETag segue la revisione del prodotto: con If-None-Match
+        si riceve 304 finché il prodotto non viene modificato.
+        """
         if prodotto_id not in prodotti_db:
             raise HTTPException(
                 status_code=404,
@@ -324,28 +471,30 @@ def register_routes(app: FastAPI):
             )
         
         prodotto = prodotti_db[prodotto_id]
+        html = preferisce_html(accept)
+        headers = {"ETag": _etag_prodotto(prodotto_id, "html" if html else "json"), "Vary": "Accept"}
+        if etag_corrisponde(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
         
         # Content Negotiation
-        if preferisce_html(accept):
-            return HTMLResponse(content=genera_html_singolo_prodotto(prodotto))
+        if html:
+            return HTMLResponse(content=genera_html_singolo_prodotto(prodotto), headers=headers)
         
         # Risposta JSON per API client
+        response.headers.update(headers)
         return crea_risposta(
             success=True,
             message="Prodotto trovato",
-            data=prodotto,
+            data=prodotto.a_modello(),
             endpoint=f"/prodotti/{prodotto_id}"
         )
 
     @app.post("/prodotti", response_model=RispostaHTTP, status_code=201, summary="Crea nuovo prodotto")
     async def crea_prodotto(prodotto: Prodotto):
         """Crea un nuovo prodotto"""
-        # Genera nuovo ID
-        nuovo_id = max(prodotti_db.keys()) + 1 if prodotti_db else 1
-        prodotto.id = nuovo_id
-        
-        # Salva nel database
-        prodotti_db[nuovo_id] = prodotto
+        # Genera nuovo ID e salva nel database (operazione atomica)
+        record = await prodotti_db.inserisci(lambda nuovo_id: RecordProdotto.da_modello(prodotto, nuovo_id))
+        nuovo_id = record.id
         
         # Crea risposta con header Location
         response = JSONResponse(
@@ -353,7 +502,7 @@ def register_routes(app: FastAPI):
             content=crea_risposta(
                 success=True,
                 message="Prodotto creato con successo",
-                data=prodotto,
+                data=record.a_modello(),
                 endpoint="/prodotti"
             ).dict(),
             headers={"Location": f"/prodotti/{nuovo_id}"}
@@ -363,58 +512,118 @@ def register_routes(app: FastAPI):
 
     @app.put("/prodotti/{prodotto_id}", response_model=RispostaHTTP, summary="Aggiorna prodotto (completo)")
     async def aggiorna_prodotto_completo(
+        response: Response,
         prodotto_id: int = Path(..., ge=1),
         prodotto: Prodotto = None
     ):
         """Aggiornamento completo di un prodotto (PUT)"""
-        if prodotto_id not in prodotti_db:
+        try:
+            record = await prodotti_db.sostituisci(prodotto_id, RecordProdotto.da_modello(prodotto, prodotto_id))
+        except KeyError:
             raise HTTPException(status_code=404, detail="Prodotto non trovato")
         
-        prodotto.id = prodotto_id
-        prodotti_db[prodotto_id] = prodotto
-        
+        response.headers["ETag"] = _etag_prodotto(prodotto_id)
         return crea_risposta(
             success=True,
             message="Prodotto aggiornato completamente",
-            data=prodotto,
+            data=record.a_modello(),
             endpoint=f"/prodotti/{prodotto_id}"
         )
 
-    @app.patch("/prodotti/{prodotto_id}", response_model=RispostaHTTP, summary="Aggiorna prodotto (parziale)")
+    @app.patch(
+        "/prodotti/{prodotto_id}", response_model=RispostaHTTP, summary="Aggiorna prodotto (parziale)",
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    "application/json": {"schema": {"$ref": "#/components/schemas/AggiornaProdotto"}},
+                    MERGE_PATCH: {"schema": {"type": "object", "description": "JSON Merge Patch (RFC 7396)"}},
+                    JSON_PATCH: {"schema": {"type": "array", "items": {"type": "object"}, "description": "JSON Patch (RFC 6902)"}},
+                },
+            }
+        }
+    )
     async def aggiorna_prodotto_parziale(
+        request: Request,
+        response: Response,
         prodotto_id: int = Path(..., ge=1),
-        aggiornamenti: AggiornaProdotto = None
+        if_match: Optional[str] = Header(None)
     ):
-        """Aggiornamento parziale di un prodotto (PATCH)"""
-        if prodotto_id not in prodotti_db:
+        """
+        Aggiornamento parziale di un prodotto (PATCH)
+
+        Il formato dipende dal Content-Type:
+        - application/json: campi da modificare (AggiornaProdotto)
+        - application/merge-patch+json: JSON Merge Patch, null rimuove il campo
+        - application/json-patch+json: JSON Patch, es. {"op": "add", "path": "/tags/-", "value": "nuovo"}
+
+        Il risultato viene validato come Prodotto; solo gli indici dei campi
+        effettivamente cambiati vengono aggiornati. Con If-Match la modifica
+        avviene solo se l'ETag corrisponde ancora (altrimenti 412).
+        """
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        try:
+            corpo = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"JSON non valido: {e}")
+
+        if content_type == MERGE_PATCH:
+            applica = lambda documento: applica_merge_patch(documento, corpo)
+        elif content_type == JSON_PATCH:
+            applica = lambda documento: applica_json_patch(documento, corpo)
+        elif content_type in ("application/json", ""):
+            try:
+                aggiornamenti = AggiornaProdotto.model_validate(corpo).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                raise RequestValidationError([{**errore, "loc": ("body", *errore["loc"])} for errore in e.errors()])
+            applica = lambda documento: {**documento, **aggiornamenti}
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail=f"Content-Type non supportato: usa application/json, {MERGE_PATCH} o {JSON_PATCH}"
+            )
+
+        campi_cambiati = []
+
+        def modifica(record: RecordProdotto) -> RecordProdotto:
+            # Eseguita dentro il lock: ETag e patch vedono la stessa revisione
+            if if_match and not etag_corrisponde_forte(if_match, _etag_prodotto(prodotto_id)):
+                raise HTTPException(status_code=412, detail="Il prodotto è stato modificato (ETag diverso da If-Match)")
+            documento = record.a_modello().model_dump(exclude={"id"})
+            try:
+                nuovo = RecordProdotto.da_modello(Prodotto.model_validate(applica(documento)), prodotto_id)
+            except ErrorePatch as e:
+                raise HTTPException(status_code=e.stato, detail=str(e))
+            except ValidationError as e:
+                raise RequestValidationError([{**errore, "loc": ("body", *errore["loc"])} for errore in e.errors()])
+            campi_cambiati.extend(sorted(campi_modificati(record, nuovo)))
+            return nuovo
+
+        try:
+            prodotto_esistente = await prodotti_db.aggiorna(prodotto_id, modifica)
+        except KeyError:
             raise HTTPException(status_code=404, detail="Prodotto non trovato")
         
-        prodotto_esistente = prodotti_db[prodotto_id]
-        
-        # Applica solo i campi forniti
-        dati_aggiornamento = aggiornamenti.dict(exclude_unset=True)
-        for campo, valore in dati_aggiornamento.items():
-            setattr(prodotto_esistente, campo, valore)
-        
+        response.headers["ETag"] = _etag_prodotto(prodotto_id)
         return crea_risposta(
             success=True,
-            message=f"Prodotto aggiornato parzialmente. Campi modificati: {list(dati_aggiornamento.keys())}",
-            data=prodotto_esistente,
+            message=f"Prodotto aggiornato parzialmente. Campi modificati: {campi_cambiati}",
+            data=prodotto_esistente.a_modello(),
             endpoint=f"/prodotti/{prodotto_id}"
         )
 
     @app.delete("/prodotti/{prodotto_id}", response_model=RispostaHTTP, summary="Elimina prodotto")
     async def elimina_prodotto(prodotto_id: int = Path(..., ge=1)):
         """Elimina un prodotto"""
-        if prodotto_id not in prodotti_db:
+        try:
+            prodotto_eliminato = await prodotti_db.elimina(prodotto_id)
+        except KeyError:
             raise HTTPException(status_code=404, detail="Prodotto non trovato")
         
-        prodotto_eliminato = prodotti_db.pop(prodotto_id)
-        
         return crea_risposta(
             success=True,
             message="Prodotto eliminato con successo",
-            data={"prodotto_eliminato": prodotto_eliminato},
+            data={"prodotto_eliminato": prodotto_eliminato.a_modello()},
             endpoint=f"/prodotti/{prodotto_id}"
         )
 
@@ -428,21 +637,19 @@ def register_routes(app: FastAPI):
         return crea_risposta(
             success=True,
             message="Lista utenti ottenuta",
-            data=list(utenti_db.values()),
+            data=a_modelli(utenti_db.snapshot()),
             endpoint="/utenti"
         )
 
     @app.post("/utenti", response_model=RispostaHTTP, status_code=201, summary="Crea utente")
     async def crea_utente(utente: Utente):
         """Crea un nuovo utente"""
-        nuovo_id = max(utenti_db.keys()) + 1 if utenti_db else 1
-        utente.id = nuovo_id
-        utenti_db[nuovo_id] = utente
+        record = await utenti_db.inserisci(lambda nuovo_id: RecordUtente.da_modello(utente, nuovo_id))
         
         return crea_risposta(
             success=True,
             message="Utente creato con successo",
-            data=utente,
+            data=record.a_modello(),
             endpoint="/utenti"
         )
 
@@ -461,30 +668,25 @@ def register_routes(app: FastAPI):
         
         Utile per simulare sensori IoT che inviano dati
         """
-        temperature_filtrate = list(temperature_db.values())
-        
-        # Applica filtri
-        if sensore:
-            temperature_filtrate = [t for t in temperature_filtrate if t.sensore.lower() == sensore.lower()]
-        
-        if posizione:
-            temperature_filtrate = [t for t in temperature_filtrate if t.posizione and posizione.lower() in t.posizione.lower()]
-        
-        # Ordina per timestamp (più recenti prima)
-        temperature_filtrate.sort(key=lambda x: x.timestamp or "", reverse=True)
-        
-        # Applica limite
-        temperature_filtrate = temperature_filtrate[:limite]
+        # Le più recenti prima, con limite: senza filtri arrivano già dall'indice;
+        # con sensore/posizione top-k sulle sole righe indicizzate
+        if sensore or posizione:
+            temperature_filtrate = heapq.nlargest(
+                limite, cerca_temperature(sensore, posizione), key=lambda x: x.timestamp or ""
+            )
+        else:
+            temperature_filtrate = [temperature_db[id] for id in indice_letture_recenti.ultimi(limite)]
+        media = indice_valori_temperature.media()
         
         return crea_risposta(
             success=True,
             message=f"Trovate {len(temperature_filtrate)} letture di temperatura",
             data={
-                "temperature": temperature_filtrate,
+                "temperature": a_modelli(temperature_filtrate),
                 "statistiche": {
                     "totale_letture": len(temperature_db),
-                    "sensori_attivi": len(set(t.sensore for t in temperature_db.values())),
-                    "temperatura_media": round(sum(t.valore for t in temperature_db.values()) / len(temperature_db), 2)
+                    "sensori_attivi": len(indice_sensori),
+                    "temperatura_media": round(media, 2) if media is not None else None
                 },
                 "filtri_applicati": {
                     "sensore": sensore,
@@ -495,6 +697,29 @@ def register_routes(app: FastAPI):
             endpoint="/temperature"
         )
 
+    @app.get("/temperature/export", summary="Esporta temperature (CSV / NDJSON)")
+    async def esporta_temperature(
+        accept: str = Header(None),
+        formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Forza formato: 'csv' o 'ndjson'"),
+        sensore: Optional[str] = Query(None, description="Filtra per sensore"),
+        posizione: Optional[str] = Query(None, description="Filtra per posizione")
+    ):
+        """
+        Esporta tutte le letture in streaming, senza il limite di 100 righe
+
+        Le letture vengono scritte in ordine di arrivo (ID crescente),
+        così l'export non deve ordinare l'intero storico in memoria.
+        Con i filtri si scorrono solo le letture trovate dagli indici.
+        """
+        formato = formato or scegli_formato(accept, ("csv", "ndjson"))
+        blocchi = blocchi_temperature(sensore, posizione, RIGHE_PER_CHUNK)
+
+        return StreamingResponse(
+            esporta(blocchi, CAMPI_EXPORT_TEMPERATURE, formato),
+            media_type=media_type_export(formato),
+            headers={"Content-Disposition": f"attachment; filename=temperature.{formato}"}
+        )
+
     @app.post("/temperature", response_model=RispostaHTTP, status_code=201, summary="Invia temperatura")
     async def invia_temperatura(temperatura: CreaTemperatura):
         """
@@ -502,28 +727,20 @@ def register_routes(app: FastAPI):
         
         Simula un sensore IoT che invia dati al server
         """
-        from datetime import datetime
-        
-        # Genera nuovo ID
-        nuovo_id = max(temperature_db.keys()) + 1 if temperature_db else 1
-        
-        # Crea la temperatura con timestamp automatico
-        nuova_temperatura = Temperatura(
+        # Crea la temperatura con nuovo ID e timestamp automatico, e la salva
+        nuova_temperatura = await temperature_db.inserisci(lambda nuovo_id: RecordTemperatura.crea(
             id=nuovo_id,
             valore=temperatura.valore,
             sensore=temperatura.sensore,
             timestamp=datetime.now().isoformat(),
             unita=temperatura.unita,
             posizione=temperatura.posizione
-        )
-        
-        # Salva nel database
-        temperature_db[nuovo_id] = nuova_temperatura
+        ))
         
         return crea_risposta(
             success=True,
             message="Temperatura registrata con successo",
-            data=nuova_temperatura,
+            data=nuova_temperatura.a_modello(),
             endpoint="/temperature"
         )
 
@@ -541,29 +758,29 @@ def register_routes(app: FastAPI):
         return crea_risposta(
             success=True,
             message="Lettura temperatura trovata",
-            data=temperatura,
+            data=temperatura.a_modello(),
             endpoint=f"/temperature/{temperatura_id}"
         )
 
     @app.delete("/temperature/{temperatura_id}", response_model=RispostaHTTP, summary="Elimina temperatura")
     async def elimina_temperatura(temperatura_id: int = Path(..., ge=1)):
         """Elimina una lettura di temperatura"""
-        if temperatura_id not in temperature_db:
+        try:
+            temperatura_eliminata = await temperature_db.elimina(temperatura_id)
+        except KeyError:
             raise HTTPException(status_code=404, detail="Lettura temperatura non trovata")
         
-        temperatura_eliminata = temperature_db.pop(temperatura_id)
-        
         return crea_risposta(
             success=True,
             message="Lettura temperatura eliminata con successo",
-            data={"temperatura_eliminata": temperatura_eliminata},
+            data={"temperatura_eliminata": temperatura_eliminata.a_modello()},
             endpoint=f"/temperature/{temperatura_id}"
         )
 
     @app.get("/temperature/sensore/{nome_sensore}", response_model=RispostaHTTP, summary="Temperature per sensore")
     async def temperature_per_sensore(nome_sensore: str = Path(..., description="Nome del sensore")):
         """Ottieni tutte le letture di un sensore specifico"""
-        letture_sensore = [t for t in temperature_db.values() if t.sensore.lower() == nome_sensore.lower()]
+        letture_sensore = cerca_temperature(sensore=nome_sensore)
         
         if not letture_sensore:
             raise HTTPException(
@@ -571,29 +788,14 @@ def register_routes(app: FastAPI):
                 detail=f"Nessuna lettura trovata per il sensore {nome_sensore}"
             )
         
-        # Ordina per timestamp
-        letture_sensore.sort(key=lambda x: x.timestamp or "", reverse=True)
-        
-        # Calcola statistiche
-        valori = [t.valore for t in letture_sensore]
-        statistiche = {
-            "numero_letture": len(letture_sensore),
-            "temperatura_minima": min(valori),
-            "temperatura_massima": max(valori),
-            "temperatura_media": round(sum(valori) / len(valori), 2),
-            "ultima_lettura": letture_sensore[0].timestamp if letture_sensore else None
-        }
-        
-        return crea_risposta(
-            success=True,
-            message=f"Letture del sensore {nome_sensore}",
-            data={
-                "sensore": nome_sensore,
-                "letture": letture_sensore,
-                "statistiche": statistiche
-            },
-            endpoint=f"/temperature/sensore/{nome_sensore}"
+        # Risposta senza limite (tutte le letture): ordinamento, statistiche e
+        # serializzazione nel pool quando le letture sono molte
+        nomi_posizioni = {id: posizioni.nome_di(id) for id in {t.posizione_id for t in letture_sensore}}
+        corpo = await esecutore.esegui_se_grande(
+            len(letture_sensore), json_letture_sensore,
+            nome_sensore, letture_sensore[0].sensore, letture_sensore, nomi_posizioni
         )
+        return Response(content=corpo, media_type="application/json")
 
     # ================================
     # ENDPOINT PER TESTING HTTP
@@ -699,7 +901,11 @@ def register_routes(app: FastAPI):
                 "forzare_html": "/test/content-negotiation?formato=html"
             },
             "header_ricevuto": accept or "Nessun header Accept",
-            "decisione": "HTML" if deve_restituire_html else "JSON"
+            "decisione": "HTML" if deve_restituire_html else "JSON",
+            "negoziazione_completa": {
+                "formati_server": list(FORMATI),
+                "formato_scelto": negozia_formato(accept, tuple(FORMATI))
+            }
         }
         
         if deve_restituire_html:
@@ -782,21 +988,35 @@ def register_routes(app: FastAPI):
         )
 
     @app.get("/postman-collection", summary="Download Collezione Postman")
-    async def download_postman_collection():
+    async def download_postman_collection(
+        request: Request,
+        accept_encoding: str = Header(None),
+        if_none_match: str = Header(None)
+    ):
         """Scarica la collezione Postman per testare tutti gli endpoint"""
         
-        # Genera la collezione dinamicamente
-        collezione_json = leggi_collezione_postman()
+        # Collezione già pronta dall'avvio (ricostruita solo se cambiano rotte o file)
+        collezione = request.app.state.collezione_postman.corrente()
+        compressa = negozia_codifica(accept_encoding, ("gzip",)) == "gzip"
+        etag = collezione.etag_gzip if compressa else collezione.etag
         
         # Headers per il download del file
         headers = {
             "Content-Disposition": "attachment; filename=HTTP-Explorer-Collection.postman_collection.json",
-            "Content-Type": "application/json",
-            "Cache-Control": "no-cache"
+            "Cache-Control": "public, max-age=300",
+            "ETag": etag,
+            "Vary": "Accept-Encoding"
         }
         
+        if etag_corrisponde(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        if compressa:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=collezione.gzip, headers=headers, media_type="application/json")
+        
         return Response(
-            content=collezione_json,
+            content=collezione.contenuto,
             headers=headers,
             media_type="application/json"
         )
@@ -872,4 +1092,34 @@ Disallow: /test/
 
 # HTTP Explorer - Server didattico
 # Crawl-delay: 1
-"""
\ No newline at end of file
+"""
+    # ================================
+    # ENDPOINT DI AMMINISTRAZIONE
+    # ================================
+
+    # Registrati solo se è configurato un token (HTTP_EXPLORER_ADMIN_TOKEN)
+    if config.ADMIN_TOKEN:
+        def _verifica_admin(token: Optional[str]):
+            if token is None or not secrets.compare_digest(token, config.ADMIN_TOKEN):
+                raise HTTPException(status_code=403, detail="Token di amministrazione non valido")
+
+        @app.post("/admin/seed", response_model=RispostaHTTP, summary="Carica dati sintetici")
+        async def carica_dati_sintetici(
+            richiesta: RichiestaSeed,
+            x_admin_token: Optional[str] = Header(None, description="Token di amministrazione")
+        ):
+            """
+            Aggiunge prodotti, utenti e letture sintetiche (deterministiche dato il seme)
+
+            Utile per misurare memoria e latenza con collezioni di dimensioni reali.
+            I record vengono inseriti a blocchi: le altre richieste continuano a essere servite.
+            """
+            _verifica_admin(x_admin_token)
+            from seed import semina
+            risultati = await semina(richiesta.model_dump(exclude={"seme"}), richiesta.seme)
+            return crea_risposta(
+                success=True,
+                message="Dati sintetici caricati",
+                data=risultati,
+                endpoint="/admin/seed"
+            )
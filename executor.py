@@ -0,0 +1,113 @@
+"""
+EXECUTOR - Lavoro CPU pesante fuori dall'event loop
+
+Le risposte JSON senza limite di dimensione (tutte le letture di un sensore,
+i risultati di un bulk) e la validazione degli import in blocco sono Python
+puro: eseguiti dentro un handler async bloccano tutti gli altri client per
+tutta la loro durata. Le pagine HTML restano nel loop: sono paginate (al
+massimo 100 prodotti, circa 0,2 ms con bench/bench_micro.py) e il passaggio
+al pool costerebbe quanto il rendering.
+
+Sopra una soglia di elementi il lavoro va in un pool:
+
+- "thread": il loop resta reattivo perché il GIL passa di mano ogni pochi
+  millisecondi (sys.getswitchinterval); nessun costo di serializzazione
+- "processo": parallelismo reale, ma argomenti e risultati vengono copiati
+  con pickle (conviene solo se il calcolo costa più della copia)
+- "nessuno": tutto come prima, nell'event loop
+
+Backpressure: al massimo `in_volo` lavori nel pool e `coda_massima` in attesa;
+oltre si risponde 503 con Retry-After invece di accumulare memoria e latenza.
+Sotto soglia il lavoro resta nel loop: per le risposte piccole il passaggio
+al pool costerebbe più del lavoro stesso.
+"""
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from utils import contatori
+
+MODALITA = ("thread", "processo", "nessuno")
+
+class Esecutore:
+    """Pool configurabile con limite ai lavori in corso e in attesa"""
+
+    def __init__(self, modalita: str = "thread", worker: int = 4, in_volo: Optional[int] = None,
+                 coda_massima: int = 64, soglia: int = 1000):
+        if modalita not in MODALITA:
+            raise ValueError(f"Esecutore '{modalita}' non valido: usa {', '.join(MODALITA)}")
+        self.modalita = modalita
+        self.worker = worker
+        self.in_volo = in_volo or 2 * worker
+        self.coda_massima = coda_massima
+        self.soglia = soglia
+        self._pool: Optional[Executor] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._in_attesa = 0
+        self._stat = contatori.setdefault("esecutore", {})
+        self._stat.update({
+            "modalita": modalita, "worker": worker, "soglia_elementi": soglia,
+            "nel_pool": 0, "nel_loop": 0, "rifiutati": 0, "in_attesa": 0,
+        })
+
+    def avvia(self):
+        """Crea il pool (all'avvio di ogni worker, dopo l'eventuale fork di uvicorn)"""
+        if self.modalita == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.worker, thread_name_prefix="esecutore")
+        elif self.modalita == "processo":
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.worker, mp_context=multiprocessing.get_context("spawn"))
+        self._semaforo = asyncio.Semaphore(self.in_volo)
+
+    def ferma(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def grande(self, elementi: int) -> bool:
+        """Vale la pena usare il pool per questo numero di elementi?"""
+        return self._pool is not None and elementi >= self.soglia
+
+    async def esegui(self, funzione: Callable, *args, **kwargs) -> Any:
+        """Esegue funzione nel pool (nel loop se il pool non è attivo)"""
+        if self._pool is None:
+            self._stat["nel_loop"] += 1
+            return funzione(*args, **kwargs)
+
+        if self._in_attesa >= self.coda_massima:
+            self._stat["rifiutati"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server occupato: troppe elaborazioni in corso, riprova tra poco",
+                headers={"Retry-After": "1"}
+            )
+        self._in_attesa += 1
+        self._stat["in_attesa"] = self._in_attesa
+        try:
+            await self._semaforo.acquire()
+        finally:
+            self._in_attesa -= 1
+            self._stat["in_attesa"] = self._in_attesa
+        try:
+            self._stat["nel_pool"] += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(funzione, *args, **kwargs))
+        finally:
+            self._semaforo.release()
+
+    async def esegui_se_grande(self, elementi: int, funzione: Callable, *args, **kwargs) -> Any:
+        """Nel pool sopra soglia, altrimenti subito nel loop"""
+        if self.grande(elementi):
+            return await self.esegui(funzione, *args, **kwargs)
+        self._stat["nel_loop"] += 1
+        return funzione(*args, **kwargs)
+
+def serializza_json(modello: BaseModel) -> bytes:
+    """JSON di un modello (funzione di modulo: deve poter andare in un processo)"""
+    return modello.__pydantic_serializer__.to_json(modello)
@@ -0,0 +1,85 @@
+"""
+EXPORT - Esportazione in streaming (CSV / NDJSON)
+
+Le righe arrivano a blocchi e vengono scritte tramite un generatore
+asincrono, senza costruire in memoria né la lista completa dei risultati
+né il documento di output. Ogni blocco corrisponde a un numero limitato di
+righe *esaminate* (non scritte): tra un blocco e l'altro l'event loop viene
+ceduto anche quando un filtro selettivo scarta quasi tutte le righe.
+"""
+
+import asyncio
+import csv
+import io
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List, Sequence
+
+from negotiation import MEDIA_TYPE
+
+# Righe esaminate per blocco (al massimo altrettante scritte in un chunk della risposta)
+RIGHE_PER_CHUNK = 1000
+
+def _valore(riga, campo: str):
+    """Legge un campo dalla riga (modello Pydantic o record con attributi)"""
+    return getattr(riga, campo)
+
+def a_blocchi(righe: Iterable, righe_per_blocco: int = RIGHE_PER_CHUNK) -> Iterator[List]:
+    """Divide le righe in liste di al più righe_per_blocco elementi"""
+    iteratore = iter(righe)
+    while True:
+        blocco = list(islice(iteratore, righe_per_blocco))
+        if not blocco:
+            return
+        yield blocco
+
+async def esporta_csv(blocchi: Iterable[List], campi: Sequence[str]) -> AsyncIterator[str]:
+    """Genera il CSV a blocchi: intestazione + una riga per elemento"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(campi)
+
+    for blocco in blocchi:
+        for riga in blocco:
+            valori = []
+            for campo in campi:
+                valore = _valore(riga, campo)
+                if isinstance(valore, (list, tuple)):
+                    valore = "|".join(valore)
+                valori.append("" if valore is None else valore)
+            writer.writerow(valori)
+
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Lascia spazio alle altre richieste tra un blocco e l'altro
+        await asyncio.sleep(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def esporta_ndjson(blocchi: Iterable[List], campi: Sequence[str]) -> AsyncIterator[str]:
+    """Genera NDJSON a blocchi: un oggetto JSON per riga"""
+    for blocco in blocchi:
+        chunk = []
+        for riga in blocco:
+            oggetto = {}
+            for campo in campi:
+                valore = _valore(riga, campo)
+                oggetto[campo] = list(valore) if isinstance(valore, tuple) else valore
+            chunk.append(json.dumps(oggetto, ensure_ascii=False, separators=(",", ":")))
+
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+        await asyncio.sleep(0)
+
+def esporta(blocchi: Iterable[List], campi: Sequence[str], formato: str) -> AsyncIterator[str]:
+    """Seleziona il generatore in base al formato (csv o ndjson); blocchi: liste di righe"""
+    if formato == "ndjson":
+        return esporta_ndjson(blocchi, campi)
+    return esporta_csv(blocchi, campi)
+
+def media_type_export(formato: str) -> str:
+    """Content-Type della risposta di export"""
+    return f"{MEDIA_TYPE[formato]}; charset=utf-8"
@@ -0,0 +1,386 @@
+"""
+INDEXES - Indici secondari delle collezioni in memoria
+
+Un indice si registra su una Collezione (store.Collezione.registra_indice)
+e viene aggiornato dentro il lock di scrittura a ogni inserimento,
+sostituzione ed eliminazione. Le letture lo interrogano senza lock:
+i metodi che restituiscono righe le copiano in una lista senza cedere
+il controllo all'event loop, quindi vedono sempre uno stato coerente.
+"""
+
+import heapq
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from symbols import NESSUNO, normalizza
+
+# Sotto questa dimensione un blocco viene applicato voce per voce
+SOGLIA_BLOCCO = 32
+
+class Indice(ABC):
+    """Interfaccia degli indici: aggiungi, rimuovi e svuota sono obbligatori"""
+
+    # Campi dei record da cui dipende l'indice: lo store lo aggiorna solo
+    # quando cambia uno di questi (None = qualsiasi modifica)
+    campi: Optional[FrozenSet[str]] = None
+
+    @abstractmethod
+    def aggiungi(self, record):
+        """Nuovo record"""
+
+    @abstractmethod
+    def rimuovi(self, record):
+        """Record eliminato"""
+
+    def sostituisci(self, vecchio, nuovo):
+        """Record aggiornato (stesso ID)"""
+        self.rimuovi(vecchio)
+        self.aggiungi(nuovo)
+
+    @abstractmethod
+    def svuota(self):
+        """Rimuove tutte le voci (prima di ricostruire l'indice dai dati)"""
+
+    def ricostruisci(self, record: Iterable):
+        """Popola l'indice vuoto con i record dati (alla registrazione o dopo svuota)"""
+        for r in record:
+            self.aggiungi(r)
+
+    # Operazioni in blocco: di default record per record, gli indici
+    # che possono fare di meglio (es. IndiceOrdinato) le ridefiniscono
+
+    def aggiungi_molti(self, record: List):
+        for r in record:
+            self.aggiungi(r)
+
+    def sostituisci_molti(self, coppie: List[Tuple[Any, Any]]):
+        for vecchio, nuovo in coppie:
+            self.sostituisci(vecchio, nuovo)
+
+    def rimuovi_molti(self, record: List):
+        for r in record:
+            self.rimuovi(r)
+
+class IndiceValori(Indice):
+    """
+    Valore di un campo → ID dei record con quel valore, in un array ordinato
+    Pensato per campi con pochi valori distinti e molte righe, come gli ID di
+    simboli delle letture: 8 byte per riga (array('q')) invece di una voce di
+    dict o di set. Gli ID crescono con l'inserimento, quindi di solito basta
+    un append; rimozioni e inserimenti fuori ordine usano bisect.
+    """
+
+    def __init__(self, campo: str):
+        self.campo = campo
+        self.campi = frozenset((campo,))
+        self._ids: Dict[Any, array] = {}
+
+    def __len__(self) -> int:
+        """Numero di valori distinti presenti"""
+        return len(self._ids)
+
+    def svuota(self):
+        self._ids.clear()
+
+    def aggiungi(self, record):
+        valore = getattr(record, self.campo)
+        ids = self._ids.get(valore)
+        if ids is None:
+            self._ids[valore] = array("q", (record.id,))
+        elif not ids or ids[-1] < record.id:
+            ids.append(record.id)
+        else:
+            i = bisect_left(ids, record.id)
+            if i == len(ids) or ids[i] != record.id:
+                ids.insert(i, record.id)
+
+    def rimuovi(self, record):
+        valore = getattr(record, self.campo)
+        ids = self._ids.get(valore)
+        if ids is None:
+            return
+        i = bisect_left(ids, record.id)
+        if i < len(ids) and ids[i] == record.id:
+            del ids[i]
+            if not ids:
+                del self._ids[valore]
+
+    def sostituisci(self, vecchio, nuovo):
+        if getattr(vecchio, self.campo) != getattr(nuovo, self.campo):
+            self.rimuovi(vecchio)
+            self.aggiungi(nuovo)
+
+    def rimuovi_molti(self, record: List):
+        if len(record) < SOGLIA_BLOCCO:
+            return super().rimuovi_molti(record)
+        # Un solo passaggio per valore invece di un memmove per record
+        rimossi: Dict[Any, Set[int]] = {}
+        for r in record:
+            rimossi.setdefault(getattr(r, self.campo), set()).add(r.id)
+        for valore, ids_rimossi in rimossi.items():
+            ids = self._ids.get(valore)
+            if ids is None:
+                continue
+            rimasti = array("q", (id for id in ids if id not in ids_rimossi))
+            if rimasti:
+                self._ids[valore] = rimasti
+            else:
+                del self._ids[valore]
+
+    def conta(self, valori: Iterable) -> int:
+        """Numero di record con uno dei valori dati"""
+        return sum(len(self._ids.get(v, ())) for v in valori)
+
+    def ids_ordinati(self, valori: Iterable) -> Iterator[int]:
+        """
+        ID crescenti dei record con uno dei valori dati, in modo lazy
+        Scorre una copia degli array (memcpy): le scritture successive non la toccano
+        """
+        return heapq.merge(*(array("q", self._ids[v]) for v in valori if v in self._ids))
+
+    def ids(self, valori: Iterable) -> List[int]:
+        """ID dei record con uno dei valori dati (crescenti per ogni valore)"""
+        risultato: List[int] = []
+        for v in valori:
+            ids = self._ids.get(v)
+            if ids:
+                risultato.extend(ids)
+        return risultato
+
+class IndiceFacetta(Indice):
+    """
+    Valore di un campo → insieme degli ID dei record (posting set)
+    Le stringhe sono confrontate senza maiuscole/minuscole; con multiplo=True
+    il campo è una sequenza (es. tags) e ogni elemento è un valore distinto.
+    """
+
+    def __init__(self, campo: str, multiplo: bool = False):
+        self.campo = campo
+        self.campi = frozenset((campo,))
+        self.multiplo = multiplo
+        self._ids: Dict[Any, Set[int]] = {}
+
+    def _valori(self, record) -> Iterable:
+        valore = getattr(record, self.campo)
+        if not self.multiplo:
+            valore = (valore,)
+        return {normalizza(v) if isinstance(v, str) else v for v in valore or ()}
+
+    def svuota(self):
+        self._ids.clear()
+
+    def aggiungi(self, record):
+        for valore in self._valori(record):
+            self._ids.setdefault(valore, set()).add(record.id)
+
+    def rimuovi(self, record):
+        for valore in self._valori(record):
+            ids = self._ids.get(valore)
+            if ids is not None:
+                ids.discard(record.id)
+                if not ids:
+                    del self._ids[valore]
+
+    def sostituisci(self, vecchio, nuovo):
+        if getattr(vecchio, self.campo) != getattr(nuovo, self.campo):
+            self.rimuovi(vecchio)
+            self.aggiungi(nuovo)
+
+    def ids(self, valore) -> Set[int]:
+        """ID dei record con il valore dato (insieme interno: da non modificare)"""
+        if isinstance(valore, str):
+            valore = normalizza(valore)
+        return self._ids.get(valore, NESSUNO)
+
+    def ids_qualsiasi(self, valori: Iterable) -> Set[int]:
+        """ID dei record con almeno uno dei valori"""
+        risultato: Set[int] = set()
+        for valore in valori:
+            risultato |= self.ids(valore)
+        return risultato
+
+    def ids_tutti(self, valori: Iterable) -> Set[int]:
+        """ID dei record con tutti i valori (intersezione dalla lista più corta)"""
+        liste = sorted((self.ids(valore) for valore in valori), key=len)
+        if not liste:
+            return set()
+        return set(liste[0]).intersection(*liste[1:])
+
+    def conteggi(self, filtro: Optional[Set[int]] = None) -> Dict[Any, int]:
+        """Numero di record per valore, limitato agli ID del filtro (None = tutti)"""
+        if filtro is None:
+            conteggi = {valore: len(ids) for valore, ids in self._ids.items()}
+        else:
+            conteggi = {valore: len(ids & filtro) for valore, ids in self._ids.items()}
+            conteggi = {valore: n for valore, n in conteggi.items() if n}
+        return dict(sorted(conteggi.items(), key=lambda voce: (-voce[1], str(voce[0]))))
+
+class IndiceOrdinato(Indice):
+    """
+    Record ordinati per un campo: lista di (chiave, id) mantenuta con bisect
+    Pagine ordinate e intervalli di valori senza ordinare la collezione
+    (inserimento e rimozione spostano solo riferimenti: memmove della lista)
+    """
+
+    def __init__(self, campo: str, chiave: Optional[Callable[[Any], Any]] = None):
+        self.campo = campo
+        self.campi = frozenset((campo,))
+        self.chiave = chiave
+        self._voci: List[Tuple[Any, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._voci)
+
+    def _voce(self, record) -> Tuple[Any, int]:
+        valore = getattr(record, self.campo)
+        return (self.chiave(valore) if self.chiave else valore, record.id)
+
+    def svuota(self):
+        self._voci = []
+
+    def aggiungi(self, record):
+        insort(self._voci, self._voce(record))
+
+    def rimuovi(self, record):
+        voce = self._voce(record)
+        i = bisect_left(self._voci, voce)
+        if i < len(self._voci) and self._voci[i] == voce:
+            del self._voci[i]
+
+    def sostituisci(self, vecchio, nuovo):
+        if self._voce(vecchio) != self._voce(nuovo):
+            self.rimuovi(vecchio)
+            self.aggiungi(nuovo)
+
+    def ricostruisci(self, record: Iterable):
+        self._voci.extend(self._voce(r) for r in record)
+        self._voci.sort()
+
+    def aggiungi_molti(self, record: List):
+        # Timsort fonde in tempo lineare la parte già ordinata e quella nuova
+        self.ricostruisci(record)
+
+    def sostituisci_molti(self, coppie: List[Tuple[Any, Any]]):
+        if len(coppie) < SOGLIA_BLOCCO:
+            return super().sostituisci_molti(coppie)
+        vecchie = {self._voce(vecchio) for vecchio, _ in coppie}
+        nuove = [self._voce(nuovo) for _, nuovo in coppie]
+        self._voci = [voce for voce in self._voci if voce not in vecchie]
+        self._voci.extend(nuove)
+        self._voci.sort()
+
+    def rimuovi_molti(self, record: List):
+        if len(record) < SOGLIA_BLOCCO:
+            return super().rimuovi_molti(record)
+        rimosse = {self._voce(r) for r in record}
+        self._voci = [voce for voce in self._voci if voce not in rimosse]
+
+    def pagina(self, inizio: int, limite: int, decrescente: bool = False) -> List[int]:
+        """ID della pagina richiesta, in ordine crescente o decrescente"""
+        if decrescente:
+            fine = max(len(self._voci) - inizio, 0)
+            voci = reversed(self._voci[max(fine - limite, 0):fine])
+        else:
+            voci = self._voci[inizio:inizio + limite]
+        return [id for _, id in voci]
+
+    def ids_intervallo(self, minimo=None, massimo=None) -> Set[int]:
+        """ID dei record con minimo <= valore <= massimo (estremi opzionali)"""
+        inizio = 0 if minimo is None else bisect_left(self._voci, (minimo,))
+        fine = len(self._voci) if massimo is None else bisect_right(self._voci, (massimo, float("inf")))
+        return {id for _, id in self._voci[inizio:fine]}
+
+class IndiceSomma(Indice):
+    """
+    Somma e numero dei valori di un campo numerico, aggiornati a ogni scrittura
+    Media e totale senza scorrere la collezione a ogni richiesta
+    """
+
+    def __init__(self, campo: str):
+        self.campo = campo
+        self.campi = frozenset((campo,))
+        self.somma = 0.0
+        self.numero = 0
+
+    def __len__(self) -> int:
+        return self.numero
+
+    def svuota(self):
+        self.somma = 0.0
+        self.numero = 0
+
+    def aggiungi(self, record):
+        self.somma += getattr(record, self.campo)
+        self.numero += 1
+
+    def rimuovi(self, record):
+        self.numero -= 1
+        # Collezione vuota: azzera anche l'errore di arrotondamento accumulato
+        self.somma = self.somma - getattr(record, self.campo) if self.numero else 0.0
+
+    def sostituisci(self, vecchio, nuovo):
+        self.somma += getattr(nuovo, self.campo) - getattr(vecchio, self.campo)
+
+    def media(self) -> Optional[float]:
+        """Media dei valori (None se la collezione è vuota)"""
+        return self.somma / self.numero if self.numero else None
+
+class IndiceRecenti(Indice):
+    """
+    I `quanti` record con il valore più alto di un campo (es. le letture più recenti)
+    Lista di (chiave, id) crescente: un inserimento costa O(log quanti). Se viene
+    rimosso uno dei record tenuti, il suo posto non è noto: la lista viene
+    ricalcolata da `dati` alla lettura successiva (i dati sono già aggiornati)
+    """
+
+    def __init__(self, campo: str, quanti: int, dati: Callable[[], Iterable],
+                 chiave: Optional[Callable[[Any], Any]] = None):
+        self.campo = campo
+        self.campi = frozenset((campo,))
+        self.quanti = quanti
+        self.chiave = chiave
+        self._dati = dati
+        self._voci: List[Tuple[Any, int]] = []
+        self._da_ricalcolare = False
+
+    def _voce(self, record) -> Tuple[Any, int]:
+        valore = getattr(record, self.campo)
+        return (self.chiave(valore) if self.chiave else valore, record.id)
+
+    def svuota(self):
+        self._voci = []
+        self._da_ricalcolare = False
+
+    def aggiungi(self, record):
+        voce = self._voce(record)
+        if len(self._voci) < self.quanti:
+            insort(self._voci, voce)
+        elif voce > self._voci[0]:
+            insort(self._voci, voce)
+            del self._voci[0]
+
+    def rimuovi(self, record):
+        voce = self._voce(record)
+        i = bisect_left(self._voci, voce)
+        if i < len(self._voci) and self._voci[i] == voce:
+            del self._voci[i]
+            self._da_ricalcolare = True
+
+    def sostituisci(self, vecchio, nuovo):
+        if self._voce(vecchio) != self._voce(nuovo):
+            self.rimuovi(vecchio)
+            self.aggiungi(nuovo)
+
+    def ricostruisci(self, record: Iterable):
+        voci = chain(self._voci, (self._voce(r) for r in record))
+        self._voci = heapq.nlargest(self.quanti, voci)[::-1]
+
+    def ultimi(self, limite: int) -> List[int]:
+        """ID dei `limite` record con il valore più alto, dal più alto (limite <= quanti)"""
+        if self._da_ricalcolare:
+            self.svuota()
+            self.ricostruisci(self._dati())
+        return [id for _, id in reversed(self._voci[-limite:])]
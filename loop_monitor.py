@@ -0,0 +1,157 @@
+"""
+LOOP_MONITOR - Ritardo dell'event loop e callback che lo bloccano
+
+Un task in background dorme per `intervallo` e misura quanto in ritardo
+viene risvegliato: il ritardo è il tempo in cui il loop era occupato a
+eseguire altro (es. genera_html_prodotti su un catalogo enorme) invece di
+servire timer, stream e le altre richieste. Gli ultimi campioni danno i
+percentili mostrati su /statistiche; i ritardi oltre la soglia vengono
+registrati come blocchi.
+
+In modalità debug un thread watchdog si accorge del blocco mentre è ancora
+in corso e cattura lo stack del thread dell'event loop (sys._current_frames):
+il blocco viene attribuito al codice del progetto in cima allo stack
+(es. "utils.py:250 genera_html_prodotti").
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RADICE = os.path.dirname(os.path.abspath(__file__))
+# Blocchi recenti riportati nelle statistiche
+ULTIMI_BLOCCHI = 20
+RIGHE_STACK = 15
+
+class MonitorLoop:
+    """Misura il ritardo di scheduling dell'event loop corrente"""
+
+    def __init__(self, intervallo: float = 0.05, soglia: float = 0.1,
+                 campioni: int = 1200, debug: bool = False):
+        self.intervallo = intervallo
+        self.soglia = soglia
+        self.debug = debug
+        self._ritardi: deque = deque(maxlen=campioni)
+        self._blocchi: deque = deque(maxlen=ULTIMI_BLOCCHI)
+        self._per_origine: Counter = Counter()
+        self.blocchi_totali = 0
+        self.ritardo_massimo = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # Stato condiviso con il watchdog (solo in debug)
+        self._battito = 0
+        self._ultimo_battito = time.monotonic()
+        self._stack_catturato: Optional[tuple] = None
+        self._thread_loop: Optional[int] = None
+        self._fermo = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def avvia(self):
+        self._task = asyncio.get_running_loop().create_task(self._misura(), name="monitor-loop")
+        if self.debug:
+            self._thread_loop = threading.get_ident()
+            self._fermo.clear()
+            self._watchdog = threading.Thread(target=self._sorveglia, name="monitor-loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def ferma(self):
+        self._fermo.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _misura(self):
+        while True:
+            self._ultimo_battito = time.monotonic()
+            atteso = time.perf_counter() + self.intervallo
+            await asyncio.sleep(self.intervallo)
+            ritardo = max(time.perf_counter() - atteso, 0.0)
+            self._ritardi.append(ritardo)
+            self.ritardo_massimo = max(self.ritardo_massimo, ritardo)
+            if ritardo >= self.soglia:
+                self._registra_blocco(ritardo)
+            self._battito += 1
+
+    def _registra_blocco(self, ritardo: float):
+        self.blocchi_totali += 1
+        blocco = {"quando": time.strftime("%Y-%m-%dT%H:%M:%S"), "ritardo_ms": round(ritardo * 1000, 1)}
+        catturato, self._stack_catturato = self._stack_catturato, None
+        if catturato is not None and catturato[0] == self._battito:
+            _, origine, stack = catturato
+            blocco["origine"] = origine
+            blocco["stack"] = stack
+            self._per_origine[origine] += 1
+            logger.warning(f"EVENT LOOP bloccato per {ritardo * 1000:.0f} ms da {origine}")
+        else:
+            logger.warning(f"EVENT LOOP bloccato per {ritardo * 1000:.0f} ms")
+        self._blocchi.append(blocco)
+
+    # ================================
+    # WATCHDOG (thread separato, solo in debug)
+    # ================================
+
+    def _sorveglia(self):
+        """Cattura lo stack del loop quando il battito tarda oltre la soglia"""
+        ultimo_catturato = -1
+        while not self._fermo.wait(self.soglia / 2):
+            battito = self._battito
+            fermo_da = time.monotonic() - self._ultimo_battito
+            if fermo_da < self.intervallo + self.soglia or battito == ultimo_catturato:
+                continue
+            frame = sys._current_frames().get(self._thread_loop)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self._stack_catturato = (battito, _origine(stack), traceback.format_list(stack[-RIGHE_STACK:]))
+            ultimo_catturato = battito
+
+    # ================================
+    # STATISTICHE
+    # ================================
+
+    def statistiche(self) -> Dict:
+        ritardi = list(self._ritardi)
+        if len(ritardi) >= 2:
+            percentili = statistics.quantiles(ritardi, n=100, method="inclusive")
+            p50, p90, p99 = percentili[49], percentili[89], percentili[98]
+        else:
+            p50 = p90 = p99 = ritardi[0] if ritardi else 0.0
+        return {
+            "intervallo_ms": self.intervallo * 1000,
+            "soglia_ms": self.soglia * 1000,
+            "campioni": len(ritardi),
+            "ritardo_ms": {
+                "p50": round(p50 * 1000, 2),
+                "p90": round(p90 * 1000, 2),
+                "p99": round(p99 * 1000, 2),
+                "massimo": round(self.ritardo_massimo * 1000, 2),
+            },
+            "blocchi_totali": self.blocchi_totali,
+            "blocchi_per_origine": dict(self._per_origine.most_common()),
+            "ultimi_blocchi": list(self._blocchi),
+        }
+
+def _origine(stack: List[traceback.FrameSummary]) -> str:
+    """Frame più interno che appartiene al progetto (non alle librerie)"""
+    for frame in reversed(stack):
+        percorso = os.path.abspath(frame.filename)
+        if percorso.startswith(RADICE + os.sep) and "site-packages" not in percorso \
+                and os.path.basename(percorso) != "loop_monitor.py":
+            return f"{os.path.relpath(percorso, RADICE)}:{frame.lineno} {frame.name}"
+    frame = stack[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
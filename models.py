@@ -1,10 +1,19 @@
 """
 MODELS - Modelli Pydantic per validazione dati
+
+I modelli Pydantic validano e serializzano i dati all'ingresso e all'uscita
+dell'API. Nelle collezioni in memoria invece vengono salvati record compatti
+(NamedTuple: niente __dict__ per istanza, immutabili come richiede il
+copy-on-write dello store), convertiti in modelli solo quando vanno in risposta.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, NamedTuple, Tuple
 from datetime import datetime
+from store import Collezione
+from symbols import TabellaSimboli, normalizza
+from indexes import IndiceFacetta, IndiceOrdinato, IndiceRecenti, IndiceSomma, IndiceValori
+from search import IndiceTestuale
 
 class Prodotto(BaseModel):
     """Modello per rappresentare un prodotto nell'e-commerce"""
@@ -25,6 +34,14 @@ class AggiornaProdotto(BaseModel):
     disponibile: Optional[bool] = None
     tags: Optional[List[str]] = None
 
+class AggiornaProdottoBulk(AggiornaProdotto):
+    """Elemento di PATCH /prodotti/bulk: ID del prodotto e campi da modificare"""
+    id: int = Field(..., ge=1)
+
+class RiferimentoProdotto(BaseModel):
+    """Elemento di DELETE /prodotti/bulk"""
+    id: int = Field(..., ge=1)
+
 class Utente(BaseModel):
     """Modello per rappresentare un utente"""
     id: Optional[int] = None
@@ -32,6 +49,13 @@ class Utente(BaseModel):
     email: str
     eta: Optional[int] = Field(None, ge=0, le=120)
 
+class RichiestaSeed(BaseModel):
+    """Quantità di record sintetici da aggiungere (POST /admin/seed)"""
+    prodotti: int = Field(0, ge=0, le=10_000_000)
+    utenti: int = Field(0, ge=0, le=10_000_000)
+    temperature: int = Field(0, ge=0, le=50_000_000)
+    seme: int = Field(42, description="Stesso seme → stessi dati")
+
 class RispostaHTTP(BaseModel):
     """Modello standard per le risposte dell'API"""
     success: bool
@@ -64,22 +88,140 @@ class CreaTemperatura(BaseModel):
     unita: str = Field("C", description="Unità di misura")
     posizione: Optional[str] = Field(None, description="Posizione del sensore")
 
-# Database simulato in memoria
-prodotti_db = {
-    1: Prodotto(id=1, nome="Smartphone Pro", descrizione="Ultimo modello con 5G", prezzo=899.99, categoria="elettronica", tags=["mobile", "5g"]),
-    2: Prodotto(id=2, nome="Laptop Gaming", descrizione="Potente laptop per gaming", prezzo=1299.99, categoria="computer", tags=["gaming", "performance"]),
-    3: Prodotto(id=3, nome="Cuffie Wireless", descrizione="Audio di alta qualità", prezzo=199.99, categoria="audio", disponibile=False, tags=["wireless", "audio"])
-}
+# ================================
+# RECORD DI MEMORIZZAZIONE
+# ================================
+
+# Nomi di sensori e posizioni, condivisi da tutte le letture
+sensori = TabellaSimboli("sensori")
+posizioni = TabellaSimboli("posizioni")
+
+class RecordProdotto(NamedTuple):
+    """Prodotto salvato nello store (tags come tupla immutabile)"""
+    id: int
+    nome: str
+    descrizione: Optional[str]
+    prezzo: float
+    categoria: str
+    disponibile: bool
+    tags: Optional[Tuple[str, ...]]
+
+    @classmethod
+    def da_modello(cls, prodotto: Prodotto, id: Optional[int] = None) -> "RecordProdotto":
+        """Record da un modello già validato (id opzionale per assegnarne uno nuovo)"""
+        return cls(
+            prodotto.id if id is None else id, prodotto.nome, prodotto.descrizione, prodotto.prezzo,
+            prodotto.categoria, prodotto.disponibile,
+            tuple(prodotto.tags) if prodotto.tags is not None else None
+        )
+
+    def aggiorna(self, campi: dict) -> "RecordProdotto":
+        """Nuovo record con i campi modificati (già validati)"""
+        if campi.get("tags") is not None:
+            campi = {**campi, "tags": tuple(campi["tags"])}
+        return self._replace(**campi)
+
+    def a_modello(self) -> Prodotto:
+        """Modello per la risposta, senza rivalidare i dati"""
+        return Prodotto.model_construct(
+            id=self.id, nome=self.nome, descrizione=self.descrizione, prezzo=self.prezzo,
+            categoria=self.categoria, disponibile=self.disponibile,
+            tags=list(self.tags) if self.tags is not None else None
+        )
+
+class RecordUtente(NamedTuple):
+    """Utente salvato nello store"""
+    id: int
+    nome: str
+    email: str
+    eta: Optional[int]
 
-utenti_db = {
-    1: Utente(id=1, nome="Mario Rossi", email="mario@email.com", eta=30),
-    2: Utente(id=2, nome="Giulia Bianchi", email="giulia@email.com", eta=25)
-}
+    @classmethod
+    def da_modello(cls, utente: Utente, id: Optional[int] = None) -> "RecordUtente":
+        return cls(utente.id if id is None else id, utente.nome, utente.email, utente.eta)
+
+    def a_modello(self) -> Utente:
+        return Utente.model_construct(**self._asdict())
+
+class RecordTemperatura(NamedTuple):
+    """
+    Lettura di temperatura salvata nello store
+    Sensore e posizione sono ID delle tabelle di simboli (vedi symbols.py)
+    """
+    id: int
+    valore: float
+    sensore_id: int
+    timestamp: Optional[str]
+    unita: str
+    posizione_id: Optional[int]
+
+    @classmethod
+    def crea(cls, id: int, valore: float, sensore: str, timestamp: Optional[str],
+             unita: str, posizione: Optional[str]) -> "RecordTemperatura":
+        """Nuovo record, internando i nomi di sensore e posizione"""
+        return cls(id, valore, sensori.interna(sensore), timestamp, unita, posizioni.interna(posizione))
+
+    @classmethod
+    def da_modello(cls, temperatura: Temperatura, id: Optional[int] = None) -> "RecordTemperatura":
+        return cls.crea(
+            temperatura.id if id is None else id, temperatura.valore, temperatura.sensore,
+            temperatura.timestamp, temperatura.unita, temperatura.posizione
+        )
+
+    @property
+    def sensore(self) -> str:
+        return sensori.nome_di(self.sensore_id)
+
+    @property
+    def posizione(self) -> Optional[str]:
+        return posizioni.nome_di(self.posizione_id)
+
+    def a_modello(self) -> Temperatura:
+        return Temperatura.model_construct(
+            id=self.id, valore=self.valore, sensore=self.sensore,
+            timestamp=self.timestamp, unita=self.unita, posizione=self.posizione
+        )
+
+def a_modelli(record) -> list:
+    """Converte una sequenza di record in modelli Pydantic (confine dell'API)"""
+    return [r.a_modello() for r in record]
+
+# Database simulato in memoria (vedi store.Collezione)
+prodotti_db = Collezione("prodotti", {p.id: RecordProdotto.da_modello(p) for p in (
+    Prodotto(id=1, nome="Smartphone Pro", descrizione="Ultimo modello con 5G", prezzo=899.99, categoria="elettronica", tags=["mobile", "5g"]),
+    Prodotto(id=2, nome="Laptop Gaming", descrizione="Potente laptop per gaming", prezzo=1299.99, categoria="computer", tags=["gaming", "performance"]),
+    Prodotto(id=3, nome="Cuffie Wireless", descrizione="Audio di alta qualità", prezzo=199.99, categoria="audio", disponibile=False, tags=["wireless", "audio"]),
+)})
+
+# Ricerca testuale sui prodotti (pesi: nome > tags > descrizione)
+indice_testuale = prodotti_db.registra_indice(IndiceTestuale({"nome": 3.0, "tags": 2.0, "descrizione": 1.0}))
+# Posting set per filtri e facette del catalogo
+indice_categorie = prodotti_db.registra_indice(IndiceFacetta("categoria"))
+indice_tag = prodotti_db.registra_indice(IndiceFacetta("tags", multiplo=True))
+indice_disponibili = prodotti_db.registra_indice(IndiceFacetta("disponibile"))
+# Ordinamenti e intervalli di prezzo
+indice_prezzi = prodotti_db.registra_indice(IndiceOrdinato("prezzo"))
+indice_nomi = prodotti_db.registra_indice(IndiceOrdinato("nome", chiave=normalizza))
+
+utenti_db = Collezione("utenti", {u.id: RecordUtente.da_modello(u) for u in (
+    Utente(id=1, nome="Mario Rossi", email="mario@email.com", eta=30),
+    Utente(id=2, nome="Giulia Bianchi", email="giulia@email.com", eta=25),
+)})
 
 # Database temperature simulate
-temperature_db = {
-    1: Temperatura(id=1, valore=22.5, sensore="SENSOR_01", timestamp="2024-01-15T10:30:00", posizione="Aula A"),
-    2: Temperatura(id=2, valore=19.8, sensore="SENSOR_02", timestamp="2024-01-15T10:31:00", posizione="Aula B"),
-    3: Temperatura(id=3, valore=24.1, sensore="SENSOR_01", timestamp="2024-01-15T10:32:00", posizione="Aula A"),
-    4: Temperatura(id=4, valore=21.3, sensore="SENSOR_03", timestamp="2024-01-15T10:33:00", posizione="Laboratorio"),
-}
\ No newline at end of file
+temperature_db = Collezione("temperature", {t.id: RecordTemperatura.da_modello(t) for t in (
+    Temperatura(id=1, valore=22.5, sensore="SENSOR_01", timestamp="2024-01-15T10:30:00", posizione="Aula A"),
+    Temperatura(id=2, valore=19.8, sensore="SENSOR_02", timestamp="2024-01-15T10:31:00", posizione="Aula B"),
+    Temperatura(id=3, valore=24.1, sensore="SENSOR_01", timestamp="2024-01-15T10:32:00", posizione="Aula A"),
+    Temperatura(id=4, valore=21.3, sensore="SENSOR_03", timestamp="2024-01-15T10:33:00", posizione="Laboratorio"),
+)})
+
+# Indici delle letture per sensore e per posizione (ID di simboli → letture)
+indice_sensori = temperature_db.registra_indice(IndiceValori("sensore_id"))
+indice_posizioni = temperature_db.registra_indice(IndiceValori("posizione_id"))
+# Statistiche e ultime letture di /temperature senza scorrere tutto lo storico
+# (100 = limite massimo della lista)
+indice_valori_temperature = temperature_db.registra_indice(IndiceSomma("valore"))
+indice_letture_recenti = temperature_db.registra_indice(
+    IndiceRecenti("timestamp", 100, temperature_db.values, chiave=lambda t: t or "")
+)
@@ -0,0 +1,120 @@
+"""
+NEGOTIATION - Parsing dell'header Accept e content negotiation (RFC 9110 §12.5.1)
+
+Gli header Accept inviati dai client reali sono pochi e sempre uguali
+(browser, curl, librerie HTTP), quindi i risultati vengono memorizzati
+in una cache LRU limitata indicizzata dalla stringa grezza dell'header.
+
+I parametri dei media-range (es. charset, version) non influenzano la scelta:
+i formati offerti non ne hanno. Se il client esclude tutti i formati offerti
+(q=0 o nessuna corrispondenza) la risposta è 406 Not Acceptable.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Formati che il server sa produrre -> media type corrispondenti
+FORMATI = {
+    "json": ("application/json",),
+    "html": ("text/html",),
+    "csv": ("text/csv",),
+    "ndjson": ("application/x-ndjson", "application/ndjson"),
+}
+
+# Media type canonico da usare nel Content-Type di ogni formato
+MEDIA_TYPE = {formato: tipi[0] for formato, tipi in FORMATI.items()}
+
+class IntervalloMedia(NamedTuple):
+    """Un media-range dell'header Accept, es. text/html;q=0.9 (parametri scartati)"""
+    tipo: str
+    sottotipo: str
+    q: float
+    posizione: int
+
+    @property
+    def specificita(self) -> int:
+        """*/* < tipo/* < tipo/sottotipo"""
+        if self.tipo == "*":
+            return 0
+        return 1 if self.sottotipo == "*" else 2
+
+    def corrisponde(self, media_type: str) -> bool:
+        """Verifica se il media-range include il media type indicato"""
+        tipo, _, sottotipo = media_type.partition("/")
+        if self.tipo != "*" and self.tipo != tipo:
+            return False
+        return self.sottotipo == "*" or self.sottotipo == sottotipo
+
+@lru_cache(maxsize=256)
+def analizza_accept(accept: str) -> Tuple[IntervalloMedia, ...]:
+    """Scompone l'header Accept nei suoi media-range (quelli malformati vengono ignorati)"""
+    intervalli = []
+    for posizione, parte in enumerate(accept.split(",")):
+        segmenti = parte.split(";")
+        media_range = segmenti[0].strip().lower()
+        tipo, separatore, sottotipo = media_range.partition("/")
+        if not separatore or not tipo or not sottotipo or (tipo == "*" and sottotipo != "*"):
+            continue
+
+        q = 1.0
+        for segmento in segmenti[1:]:
+            nome, _, valore = segmento.strip().partition("=")
+            if nome.strip().lower() == "q":
+                # Tutto ciò che segue q sono accept-ext, non parametri del media type
+                try:
+                    q = min(max(float(valore.strip().strip('"')), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+                break
+
+        intervalli.append(IntervalloMedia(tipo, sottotipo, q, posizione))
+    return tuple(intervalli)
+
+def _qualita(intervalli: Tuple[IntervalloMedia, ...], formato: str) -> Optional[Tuple[float, int, int]]:
+    """
+    Trova il media-range più specifico che include il formato
+    Restituisce (q, specificità, -posizione) oppure None se non accettato
+    """
+    migliore = None
+    for media_type in FORMATI[formato]:
+        for intervallo in intervalli:
+            if not intervallo.corrisponde(media_type):
+                continue
+            chiave = (intervallo.specificita, -intervallo.posizione)
+            if migliore is None or chiave > migliore[1:]:
+                migliore = (intervallo.q,) + chiave
+    return migliore
+
+@lru_cache(maxsize=256)
+def negozia_formato(accept: Optional[str], offerti: Tuple[str, ...] = ("json", "html")) -> Optional[str]:
+    """
+    Sceglie il formato di risposta tra quelli offerti dall'endpoint
+
+    A parità di q vince il media-range più specifico, poi quello che il client
+    ha elencato per primo, infine l'ordine di preferenza del server (offerti).
+    Senza header Accept (o con un header tutto malformato) si usa offerti[0];
+    None se il client non accetta nessuno dei formati offerti.
+    """
+    intervalli = analizza_accept(accept) if accept else ()
+    if not intervalli:
+        return offerti[0]
+
+    migliore, chiave_migliore = None, None
+    for ordine, formato in enumerate(offerti):
+        qualita = _qualita(intervalli, formato)
+        if qualita is None or qualita[0] <= 0:
+            continue
+        chiave = qualita + (-ordine,)
+        if chiave_migliore is None or chiave > chiave_migliore:
+            migliore, chiave_migliore = formato, chiave
+    return migliore
+
+def scegli_formato(accept: Optional[str], offerti: Tuple[str, ...] = ("json", "html")) -> str:
+    """Come negozia_formato, ma 406 se nessun formato offerto è accettabile"""
+    formato = negozia_formato(accept, offerti)
+    if formato is None:
+        disponibili = ", ".join(tipo for f in offerti for tipo in FORMATI[f])
+        raise HTTPException(status_code=406, detail=f"Nessun formato accettabile: disponibili {disponibili}")
+    return formato
@@ -0,0 +1,177 @@
+"""
+PATCH - JSON Merge Patch (RFC 7396) e JSON Patch (RFC 6902)
+
+Le patch vengono applicate a una copia del documento JSON del record
+(dict/list/valori semplici) e non lo modificano mai sul posto: il risultato
+viene poi validato con il modello Pydantic prima di essere salvato.
+"""
+
+import copy
+from typing import Any, List, Union
+
+MERGE_PATCH = "application/merge-patch+json"
+JSON_PATCH = "application/json-patch+json"
+
+class ErrorePatch(ValueError):
+    """
+    Patch non applicabile
+    stato: 400 patch malformata, 409 operazione 'test' fallita,
+    422 percorso inesistente o non valido per il documento
+    """
+
+    def __init__(self, messaggio: str, stato: int = 422):
+        super().__init__(messaggio)
+        self.stato = stato
+
+# ================================
+# RFC 7396 - JSON MERGE PATCH
+# ================================
+
+def applica_merge_patch(documento: Any, patch: Any) -> Any:
+    """Applica una merge patch: null rimuove, gli oggetti si fondono, il resto sostituisce"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    risultato = dict(documento) if isinstance(documento, dict) else {}
+    for chiave, valore in patch.items():
+        if valore is None:
+            risultato.pop(chiave, None)
+        else:
+            risultato[chiave] = applica_merge_patch(risultato.get(chiave), valore)
+    return risultato
+
+# ================================
+# RFC 6902 - JSON PATCH
+# ================================
+
+def _segmenti(puntatore: Any) -> List[str]:
+    """Segmenti di un JSON Pointer (RFC 6901)"""
+    if not isinstance(puntatore, str):
+        raise ErrorePatch(f"JSON Pointer non valido: {puntatore!r} non è una stringa", 400)
+    if puntatore == "":
+        return []
+    if not puntatore.startswith("/"):
+        raise ErrorePatch(f"JSON Pointer non valido: '{puntatore}'", 400)
+    return [s.replace("~1", "/").replace("~0", "~") for s in puntatore[1:].split("/")]
+
+def _indice_lista(lista: list, segmento: str, inserimento: bool = False) -> int:
+    if inserimento and segmento == "-":
+        return len(lista)
+    if not segmento.isdigit() or (segmento != "0" and segmento.startswith("0")):
+        raise ErrorePatch(f"Indice di array non valido: '{segmento}'")
+    indice = int(segmento)
+    if indice > len(lista) or (indice == len(lista) and not inserimento):
+        raise ErrorePatch(f"Indice di array fuori intervallo: {indice}")
+    return indice
+
+def _contenitore(documento: Any, segmenti: List[str]) -> Any:
+    """Oggetto o array che contiene l'ultimo segmento del percorso"""
+    corrente = documento
+    for segmento in segmenti[:-1]:
+        if isinstance(corrente, dict) and segmento in corrente:
+            corrente = corrente[segmento]
+        elif isinstance(corrente, list):
+            corrente = corrente[_indice_lista(corrente, segmento)]
+        else:
+            raise ErrorePatch(f"Percorso inesistente: '/{'/'.join(segmenti)}'")
+    return corrente
+
+def _leggi(documento: Any, puntatore: str) -> Any:
+    segmenti = _segmenti(puntatore)
+    if not segmenti:
+        return documento
+    contenitore = _contenitore(documento, segmenti)
+    ultimo = segmenti[-1]
+    if isinstance(contenitore, dict):
+        if ultimo not in contenitore:
+            raise ErrorePatch(f"Percorso inesistente: '{puntatore}'")
+        return contenitore[ultimo]
+    if isinstance(contenitore, list):
+        return contenitore[_indice_lista(contenitore, ultimo)]
+    raise ErrorePatch(f"Percorso inesistente: '{puntatore}'")
+
+def _aggiungi(documento: Any, puntatore: str, valore: Any) -> Any:
+    segmenti = _segmenti(puntatore)
+    if not segmenti:
+        return valore
+    contenitore = _contenitore(documento, segmenti)
+    ultimo = segmenti[-1]
+    if isinstance(contenitore, dict):
+        contenitore[ultimo] = valore
+    elif isinstance(contenitore, list):
+        contenitore.insert(_indice_lista(contenitore, ultimo, inserimento=True), valore)
+    else:
+        raise ErrorePatch(f"Percorso inesistente: '{puntatore}'")
+    return documento
+
+def _rimuovi(documento: Any, puntatore: str) -> Any:
+    segmenti = _segmenti(puntatore)
+    if not segmenti:
+        raise ErrorePatch("Non si può rimuovere l'intero documento")
+    contenitore = _contenitore(documento, segmenti)
+    ultimo = segmenti[-1]
+    if isinstance(contenitore, dict):
+        if ultimo not in contenitore:
+            raise ErrorePatch(f"Percorso inesistente: '{puntatore}'")
+        del contenitore[ultimo]
+    elif isinstance(contenitore, list):
+        del contenitore[_indice_lista(contenitore, ultimo)]
+    else:
+        raise ErrorePatch(f"Percorso inesistente: '{puntatore}'")
+    return documento
+
+def uguali_json(a: Any, b: Any) -> bool:
+    """
+    Uguaglianza JSON per l'operazione test (RFC 6902 §4.6): i tipi devono
+    coincidere, quindi true non è uguale a 1 (in Python True == 1 == 1.0),
+    mentre 1 e 1.0 sono lo stesso numero JSON
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(uguali_json(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(uguali_json(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+def applica_json_patch(documento: Any, operazioni: Union[list, Any]) -> Any:
+    """Applica una sequenza di operazioni add/remove/replace/move/copy/test (tutte o nessuna)"""
+    if not isinstance(operazioni, list):
+        raise ErrorePatch("Una JSON Patch deve essere un array di operazioni", 400)
+
+    documento = copy.deepcopy(documento)
+    for numero, operazione in enumerate(operazioni):
+        if not isinstance(operazione, dict) or "op" not in operazione or "path" not in operazione:
+            raise ErrorePatch(f"Operazione {numero}: servono 'op' e 'path'", 400)
+        op, percorso = operazione["op"], operazione["path"]
+        if op in ("add", "replace", "test") and "value" not in operazione:
+            raise ErrorePatch(f"Operazione {numero} ({op}): manca 'value'", 400)
+        if op in ("move", "copy") and "from" not in operazione:
+            raise ErrorePatch(f"Operazione {numero} ({op}): manca 'from'", 400)
+        for campo in ("path", "from"):
+            if campo in operazione and not isinstance(operazione[campo], str):
+                raise ErrorePatch(f"Operazione {numero} ({op}): '{campo}' deve essere una stringa", 400)
+
+        if op == "add":
+            documento = _aggiungi(documento, percorso, copy.deepcopy(operazione["value"]))
+        elif op == "remove":
+            documento = _rimuovi(documento, percorso)
+        elif op == "replace":
+            _leggi(documento, percorso)
+            documento = _aggiungi(_rimuovi(documento, percorso) if percorso else documento,
+                                  percorso, copy.deepcopy(operazione["value"]))
+        elif op == "move":
+            origine = operazione["from"]
+            if percorso.startswith(origine + "/"):
+                raise ErrorePatch(f"Operazione {numero}: non si può spostare un valore dentro se stesso")
+            valore = _leggi(documento, origine)
+            documento = _aggiungi(_rimuovi(documento, origine), percorso, valore)
+        elif op == "copy":
+            documento = _aggiungi(documento, percorso, copy.deepcopy(_leggi(documento, operazione["from"])))
+        elif op == "test":
+            if not uguali_json(_leggi(documento, percorso), operazione["value"]):
+                raise ErrorePatch(f"Operazione {numero}: test fallito su '{percorso}'", 409)
+        else:
+            raise ErrorePatch(f"Operazione {numero}: op '{op}' non supportata", 400)
+    return documento
@@ -0,0 +1,289 @@
+"""
+POSTMAN - Collezione Postman precaricata e validata
+
+La collezione può essere generata dalle rotte registrate nell'app (default)
+oppure letta da file. In entrambi i casi viene preparata una sola volta
+all'avvio del server (quella da file viene riletta solo se il file cambia):
+le richieste ricevono i bytes già pronti, con ETag e variante gzip precalcolata.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Type, Union, get_args, get_origin
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+import models
+
+logger = logging.getLogger(__name__)
+
+class ContenutoCollezione:
+    """Collezione già codificata, pronta per essere inviata"""
+
+    def __init__(self, contenuto: bytes):
+        self.contenuto = contenuto
+        self.gzip = gzip.compress(contenuto, compresslevel=9, mtime=0)
+        impronta = hashlib.blake2b(contenuto, digest_size=8).hexdigest()
+        self.etag = f'"postman-{impronta}"'
+        self.etag_gzip = f'"postman-{impronta}-gzip"'
+
+class CollezionePostman:
+    """Collezione Postman letta da file, validata e tenuta in memoria"""
+
+    def __init__(self, filename: str = "postman_collection.json", intervallo_controllo: float = 1.0):
+        self.filename = filename
+        self.intervallo_controllo = intervallo_controllo
+        self._mtime: Optional[int] = None
+        self._ultimo_controllo = 0.0
+        self._contenuto: Optional[ContenutoCollezione] = None
+        self._errore: Optional[HTTPException] = None
+
+    def _mtime_file(self) -> Optional[int]:
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def carica(self) -> bool:
+        """
+        Legge e valida il file. In caso di errore lo memorizza
+        (verrà restituito alle richieste senza rileggere il file)
+        """
+        self._mtime = self._mtime_file()
+        self._ultimo_controllo = time.monotonic()
+        self._contenuto = None
+        self._errore = None
+
+        if self._mtime is None:
+            self._errore = HTTPException(
+                status_code=404,
+                detail=f"File collezione Postman '{self.filename}' non trovato"
+            )
+            return False
+
+        try:
+            with open(self.filename, "rb") as file:
+                contenuto = file.read()
+            collezione = json.loads(contenuto)
+        except json.JSONDecodeError as e:
+            self._errore = HTTPException(
+                status_code=500,
+                detail=f"Il file '{self.filename}' contiene JSON non valido: {str(e)}"
+            )
+            return False
+        except Exception as e:
+            self._errore = HTTPException(
+                status_code=500,
+                detail=f"Errore durante la lettura del file: {str(e)}"
+            )
+            return False
+
+        if not isinstance(collezione, dict) or "info" not in collezione or "item" not in collezione:
+            self._errore = HTTPException(
+                status_code=500,
+                detail=f"Il file '{self.filename}' non è una collezione Postman (mancano 'info' o 'item')"
+            )
+            return False
+
+        self._contenuto = ContenutoCollezione(contenuto)
+        return True
+
+    def verifica_avvio(self):
+        """Carica la collezione all'avvio e segnala subito eventuali problemi"""
+        if self.carica():
+            logger.info(f"Collezione Postman '{self.filename}' caricata ({len(self._contenuto.contenuto)} bytes)")
+        else:
+            logger.warning(f"Collezione Postman non disponibile: {self._errore.detail}")
+
+    def corrente(self) -> ContenutoCollezione:
+        """Collezione corrente (ricaricata solo se il file è cambiato)"""
+        adesso = time.monotonic()
+        if self._contenuto is None and self._errore is None:
+            self.carica()
+        elif adesso - self._ultimo_controllo >= self.intervallo_controllo:
+            self._ultimo_controllo = adesso
+            if self._mtime_file() != self._mtime:
+                self.carica()
+
+        if self._errore is not None:
+            raise self._errore
+        return self._contenuto
+
+SCHEMA_COLLEZIONE = "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+
+# Valori di esempio per i path parameter che non hanno un minimo sensato
+ESEMPI_PARAMETRI = {
+    "nome_sensore": "SENSOR_01",
+    "status_code": "404",
+    "secondi": "2",
+}
+
+def _valore_esempio(nome: str, annotazione: Any) -> Any:
+    """Valore di esempio per un campo, in base al suo tipo"""
+    origine = get_origin(annotazione)
+    if origine is Union:
+        argomenti = [a for a in get_args(annotazione) if a is not type(None)]
+        return _valore_esempio(nome, argomenti[0]) if argomenti else None
+    if origine in (list, List):
+        argomenti = get_args(annotazione)
+        return [_valore_esempio(nome, argomenti[0] if argomenti else str)]
+    if isinstance(annotazione, type) and issubclass(annotazione, BaseModel):
+        return esempio_da_modello(annotazione)
+    if annotazione is bool:
+        return True
+    if annotazione is int:
+        return 1
+    if annotazione is float:
+        return 9.99
+    if annotazione is str:
+        return f"esempio {nome}"
+    return None
+
+def esempio_da_modello(modello: Type[BaseModel]) -> Dict[str, Any]:
+    """Body di esempio costruito dai campi di un modello Pydantic (id facoltativi esclusi)"""
+    esempio = {}
+    for nome, campo in modello.model_fields.items():
+        if nome == "id" and not campo.is_required():
+            continue
+        if campo.default not in (None, [], ...) and not campo.is_required():
+            esempio[nome] = campo.default
+        else:
+            esempio[nome] = _valore_esempio(nome, campo.annotation)
+    return esempio
+
+def _esempio_parametro(parametro: Dict[str, Any]) -> str:
+    nome = parametro["name"]
+    if nome in ESEMPI_PARAMETRI:
+        return ESEMPI_PARAMETRI[nome]
+    schema = parametro.get("schema", {})
+    if "default" in schema and schema["default"] is not None:
+        return str(schema["default"]).lower() if isinstance(schema["default"], bool) else str(schema["default"])
+    if schema.get("type") in ("integer", "number"):
+        return str(schema.get("minimum", 1))
+    return ""
+
+def _modello_da_schema(schema: Dict[str, Any]) -> Optional[Type[BaseModel]]:
+    """Modello di models.py a cui rimanda lo schema ($ref o primo $ref di un oneOf)"""
+    riferimento = schema.get("$ref") or next(
+        (alternativa["$ref"] for alternativa in schema.get("oneOf", []) if "$ref" in alternativa), ""
+    )
+    modello = getattr(models, riferimento.rsplit("/", 1)[-1], None) if riferimento else None
+    return modello if isinstance(modello, type) and issubclass(modello, BaseModel) else None
+
+def _esempio_corpo(schema: Dict[str, Any]) -> Optional[Any]:
+    """Body di esempio: un oggetto, o una lista con un elemento per gli array (bulk)"""
+    if schema.get("type") == "array":
+        elemento = _esempio_corpo(schema.get("items", {}))
+        return [elemento] if elemento is not None else None
+    modello = _modello_da_schema(schema)
+    return esempio_da_modello(modello) if modello is not None else None
+
+def _richiesta_postman(metodo: str, path: str, operazione: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte un'operazione OpenAPI in una richiesta della collezione"""
+    parametri = operazione.get("parameters", [])
+    segmenti = [
+        f":{segmento[1:-1]}" if segmento.startswith("{") else segmento
+        for segmento in path.strip("/").split("/") if segmento
+    ]
+    query = [
+        {
+            "key": p["name"],
+            "value": _esempio_parametro(p),
+            "description": p.get("description", ""),
+            "disabled": not p.get("required", False),
+        }
+        for p in parametri if p["in"] == "query"
+    ]
+    variabili = [
+        {"key": p["name"], "value": _esempio_parametro(p), "description": p.get("description", "")}
+        for p in parametri if p["in"] == "path"
+    ]
+    raw = "{{base_url}}/" + "/".join(segmenti)
+    abilitate = [q for q in query if not q["disabled"]]
+    if abilitate:
+        raw += "?" + "&".join(f"{q['key']}={q['value']}" for q in abilitate)
+
+    richiesta = {
+        "method": metodo.upper(),
+        "header": [{"key": "Accept", "value": "application/json"}],
+        "description": operazione.get("description", ""),
+        "url": {
+            "raw": raw,
+            "host": ["{{base_url}}"],
+            "path": segmenti,
+            "query": query,
+            "variable": variabili,
+        },
+    }
+
+    corpo = operazione.get("requestBody", {}).get("content", {}).get("application/json", {})
+    esempio = _esempio_corpo(corpo.get("schema", {}))
+    if esempio is not None:
+        richiesta["header"].append({"key": "Content-Type", "value": "application/json"})
+        richiesta["body"] = {
+            "mode": "raw",
+            "raw": json.dumps(esempio, indent=2, ensure_ascii=False),
+            "options": {"raw": {"language": "json"}},
+        }
+    return richiesta
+
+def genera_collezione(app: FastAPI) -> Dict[str, Any]:
+    """Genera la collezione Postman (v2.1) dallo schema OpenAPI dell'app"""
+    schema = app.openapi()
+    cartelle: Dict[str, List[Dict[str, Any]]] = {}
+    for path, operazioni in schema.get("paths", {}).items():
+        cartella = path.strip("/").split("/")[0] or "home"
+        for metodo, operazione in operazioni.items():
+            cartelle.setdefault(cartella, []).append({
+                "name": operazione.get("summary") or f"{metodo.upper()} {path}",
+                "request": _richiesta_postman(metodo, path, operazione),
+            })
+
+    return {
+        "info": {
+            "name": schema["info"]["title"],
+            "description": f"Collezione generata automaticamente dalle rotte del server (v{schema['info']['version']})",
+            "schema": SCHEMA_COLLEZIONE,
+        },
+        "item": [{"name": nome, "item": richieste} for nome, richieste in cartelle.items()],
+        "variable": [{"key": "base_url", "value": "http://localhost:8000"}],
+    }
+
+class CollezioneGenerata:
+    """
+    Collezione generata dalle rotte dell'app, una volta per worker
+    Le rotte sono registrate tutte in create_app, prima dell'avvio:
+    le richieste ricevono sempre i bytes generati la prima volta
+    """
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self._contenuto: Optional[ContenutoCollezione] = None
+
+    def verifica_avvio(self):
+        """Genera la collezione (e lo schema OpenAPI) all'avvio del worker"""
+        contenuto = self.corrente()
+        logger.info(f"Collezione Postman generata dalle rotte ({len(contenuto.contenuto)} bytes)")
+
+    def corrente(self) -> ContenutoCollezione:
+        """Collezione generata all'avvio (alla prima chiamata se l'avvio non l'ha fatto)"""
+        if self._contenuto is None:
+            collezione = genera_collezione(self.app)
+            self._contenuto = ContenutoCollezione(
+                json.dumps(collezione, indent=2, ensure_ascii=False).encode("utf-8")
+            )
+        return self._contenuto
+
+# Collezione letta da file (usata se HTTP_EXPLORER_POSTMAN_SORGENTE=file)
+collezione_postman = CollezionePostman("postman_collection.json")
+
+def crea_sorgente_collezione(app: FastAPI, sorgente: str = "generata"):
+    """Sorgente della collezione servita su /postman-collection"""
+    if sorgente == "file":
+        return collezione_postman
+    return CollezioneGenerata(app)
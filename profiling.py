@@ -0,0 +1,176 @@
+"""
+PROFILING - Profilazione su richiesta di singole richieste HTTP
+
+Middleware ASGI registrato solo con HTTP_EXPLORER_PROFILAZIONE=1: da spento
+non è nemmeno nello stack, quindi non costa nulla. Da acceso profila solo
+le richieste con l'header X-Profile (e X-Profile-Token, se configurato):
+
+- X-Profile: 1 (o testo)  la risposta viene sostituita dal report testuale
+- X-Profile: html         report HTML interattivo (solo con pyinstrument)
+- X-Profile: salva        risposta normale, profilo salvato nella cartella
+                          configurata (nome nell'header X-Profile-File)
+
+Usa pyinstrument (profiler a campionamento, consapevole di async/await) se è
+installato, altrimenti cProfile. cProfile misura tutto ciò che gira nel
+processo mentre la richiesta è in corso, incluse le altre coroutine: va
+usato su un worker con poco traffico. Una sola richiesta alla volta viene
+profilata: le altre con X-Profile aspettano il proprio turno.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import secrets
+import time
+from typing import Optional
+
+try:
+    import pyinstrument
+except ImportError:  # dipendenza opzionale
+    pyinstrument = None
+
+INTERVALLO_CAMPIONAMENTO = 0.001
+RIGHE_REPORT = 40
+
+_NON_SICURI = re.compile(r"[^A-Za-z0-9_.-]+")
+
+class _Profilatore:
+    """Interfaccia comune a pyinstrument e cProfile"""
+
+    def __init__(self):
+        if pyinstrument is not None:
+            self._profiler = pyinstrument.Profiler(interval=INTERVALLO_CAMPIONAMENTO, async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def avvia(self):
+        if pyinstrument is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def ferma(self):
+        if pyinstrument is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def testo(self) -> str:
+        if pyinstrument is not None:
+            return self._profiler.output_text(unicode=True, color=False)
+        flusso = io.StringIO()
+        pstats.Stats(self._profiler, stream=flusso).sort_stats("cumulative").print_stats(RIGHE_REPORT)
+        return flusso.getvalue()
+
+    def html(self) -> Optional[str]:
+        return self._profiler.output_html() if pyinstrument is not None else None
+
+    @property
+    def estensione(self) -> str:
+        return "html" if pyinstrument is not None else "prof"
+
+    def salva(self, percorso: str):
+        """HTML di pyinstrument, oppure .prof di cProfile (snakeviz lo mostra come flamegraph)"""
+        if pyinstrument is not None:
+            with open(percorso, "w", encoding="utf-8") as file:
+                file.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(percorso)
+
+class ProfilazioneMiddleware:
+    """Middleware ASGI che profila le richieste con l'header X-Profile"""
+
+    def __init__(self, app, token: Optional[str] = None, cartella: str = "profili"):
+        self.app = app
+        self.token = token
+        self.cartella = cartella
+        # cProfile e pyinstrument non supportano profilazioni sovrapposte
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        modalita = token = None
+        for nome, valore in scope["headers"]:
+            if nome == b"x-profile":
+                modalita = valore.decode("latin-1").strip().lower()
+            elif nome == b"x-profile-token":
+                token = valore.decode("latin-1")
+
+        if modalita in (None, "", "0") or not self._autorizzato(token):
+            await self.app(scope, receive, send)
+            return
+
+        async with self._lock:
+            if modalita == "salva":
+                await self._profila_e_salva(scope, receive, send)
+            else:
+                await self._profila_e_riporta(scope, receive, send, modalita)
+
+    def _autorizzato(self, token: Optional[str]) -> bool:
+        if self.token is None:
+            return True
+        return token is not None and secrets.compare_digest(token, self.token)
+
+    async def _profila_e_riporta(self, scope, receive, send, modalita: str):
+        """Esegue la richiesta scartandone la risposta e invia il report"""
+        stato = None
+
+        async def scarta(message):
+            nonlocal stato
+            if message["type"] == "http.response.start":
+                stato = message["status"]
+
+        profilatore = _Profilatore()
+        inizio = time.perf_counter()
+        profilatore.avvia()
+        try:
+            await self.app(scope, receive, scarta)
+        finally:
+            profilatore.ferma()
+        durata = time.perf_counter() - inizio
+
+        html = profilatore.html() if modalita == "html" else None
+        if html is not None:
+            body, tipo = html.encode("utf-8"), b"text/html; charset=utf-8"
+        else:
+            query = scope.get("query_string", b"").decode("latin-1")
+            percorso = f"{scope['path']}?{query}" if query else scope["path"]
+            intestazione = f"{scope['method']} {percorso} → {stato} in {durata * 1000:.1f} ms\n\n"
+            body, tipo = (intestazione + profilatore.testo()).encode("utf-8"), b"text/plain; charset=utf-8"
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", tipo),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"cache-control", b"no-store"),
+                (b"x-profile-status", str(stato).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _profila_e_salva(self, scope, receive, send):
+        """Risposta inviata normalmente, profilo salvato su disco"""
+        profilatore = _Profilatore()
+        nome = _NON_SICURI.sub("_", f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}-{scope['method']}{scope['path']}")
+        nome = f"{nome[:120]}.{profilatore.estensione}"
+
+        async def con_nome_file(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-file", nome.encode("latin-1"))]}
+            await send(message)
+
+        profilatore.avvia()
+        try:
+            await self.app(scope, receive, con_nome_file)
+        finally:
+            profilatore.ferma()
+            os.makedirs(self.cartella, exist_ok=True)
+            profilatore.salva(os.path.join(self.cartella, nome))
@@ -0,0 +1,140 @@
+"""
+RESOURCES - Catalogo delle risorse del corso con cache
+
+La cartella download viene scansionata una sola volta e di nuovo solo quando
+cambia la sua firma: nome, mtime e dimensione di ogni file (file aggiunti,
+rimossi, rinominati o riscritti). Ogni scansione produce una versione
+immutabile del catalogo, da cui arrivano sia l'ETag sia il body: una
+richiesta non può ricevere l'ETag di una versione e il body di un'altra.
+
+Nel loop c'è al più uno stat della cartella al secondo: il suo mtime cambia
+quando un file viene aggiunto, rimosso o rinominato. Un file riscritto sul
+posto non lo cambia, quindi la firma completa (uno stat per file) viene
+ricalcolata anche ogni `intervallo_scansione` secondi. La scansione gira in
+un thread: con migliaia di file non blocca le altre richieste.
+Niente inotify: lo stat della cartella costa quanto il controllo di un
+watcher, senza dipendenze né task in background.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import anyio
+from pydantic import TypeAdapter
+
+from models import RisorsaCorso
+from utils import genera_html_risorse, scansiona_cartella_download
+
+_ADATTATORE_RISORSE = TypeAdapter(List[RisorsaCorso])
+
+class VersioneCatalogo:
+    """Una versione del catalogo: elenco, ETag e rappresentazioni già pronte"""
+
+    def __init__(self, risorse: List[RisorsaCorso], impronta: str):
+        self.risorse = risorse
+        self.impronta = impronta
+        self._html: Optional[bytes] = None
+        self._testa_json: Optional[bytes] = None
+
+    def etag(self, formato: str) -> str:
+        """ETag della rappresentazione richiesta ('html' o 'json')"""
+        if formato == "json":
+            # Il timestamp cambia a ogni risposta: stesso contenuto, bytes diversi
+            return f'W/"risorse-json-{self.impronta}"'
+        return f'"risorse-{formato}-{self.impronta}"'
+
+    def html(self) -> bytes:
+        """Pagina HTML delle risorse, generata una volta per versione"""
+        if self._html is None:
+            self._html = genera_html_risorse(self.risorse).encode("utf-8")
+        return self._html
+
+    def json(self) -> bytes:
+        """
+        Risposta JSON delle risorse (stesso formato di crea_risposta)
+        Messaggio ed elenco sono serializzati una volta per versione,
+        il timestamp è quello della richiesta
+        """
+        if self._testa_json is None:
+            messaggio = json.dumps(f"Trovate {len(self.risorse)} risorse del corso", ensure_ascii=False)
+            self._testa_json = (
+                b'{"success":true,"message":' + messaggio.encode("utf-8")
+                + b',"data":' + _ADATTATORE_RISORSE.dump_json(self.risorse)
+            )
+        timestamp = datetime.now().isoformat().encode("latin-1")
+        return self._testa_json + b',"timestamp":"' + timestamp + b'","endpoint":"/risorse"}'
+
+class CatalogoRisorse:
+    """Catalogo delle risorse della cartella download, ricalcolato solo se cambia"""
+
+    def __init__(self, cartella: str = "download", intervallo_controllo: float = 1.0,
+                 intervallo_scansione: float = 30.0):
+        self.cartella = cartella
+        # Tempo minimo tra due controlli dell'mtime della cartella
+        self.intervallo_controllo = intervallo_controllo
+        # Tempo massimo tra due firme complete (file riscritti sul posto)
+        self.intervallo_scansione = intervallo_scansione
+        self._mtime: Optional[int] = None
+        self._firma: Optional[Tuple] = None
+        self._ultimo_controllo = 0.0
+        self._ultima_scansione = 0.0
+        self._scansioni = 0
+        self._lock = asyncio.Lock()
+        self._corrente: Optional[VersioneCatalogo] = None
+
+    def _mtime_cartella(self) -> Optional[int]:
+        try:
+            return os.stat(self.cartella).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _firma_cartella(self) -> Optional[Tuple]:
+        """Nome, mtime e dimensione di ogni file (None se la cartella non esiste)"""
+        try:
+            with os.scandir(self.cartella) as voci:
+                file = [(voce.name, voce.stat()) for voce in voci if voce.is_file()]
+        except FileNotFoundError:
+            return None
+        return tuple(sorted((nome, stat.st_mtime_ns, stat.st_size) for nome, stat in file))
+
+    def _scansiona(self) -> Tuple[Optional[Tuple], Optional[VersioneCatalogo]]:
+        """Firma e, se è cambiata, nuova versione del catalogo (eseguita in un thread)"""
+        firma = self._firma_cartella()
+        if self._corrente is not None and firma == self._firma:
+            return firma, None
+        impronta = hashlib.blake2b(repr(firma).encode("utf-8"), digest_size=8).hexdigest()
+        return firma, VersioneCatalogo(scansiona_cartella_download(self.cartella), impronta)
+
+    async def corrente(self) -> VersioneCatalogo:
+        """Versione attuale del catalogo (riscansiona solo se la cartella è cambiata)"""
+        adesso = time.monotonic()
+        if self._corrente is not None and adesso - self._ultimo_controllo < self.intervallo_controllo:
+            return self._corrente
+        self._ultimo_controllo = adesso
+
+        mtime = self._mtime_cartella()
+        if self._corrente is not None and mtime == self._mtime \
+                and adesso - self._ultima_scansione < self.intervallo_scansione:
+            return self._corrente
+
+        scansioni = self._scansioni
+        async with self._lock:
+            # Un'altra richiesta ha appena riscansionato: si usa il suo risultato
+            if scansioni == self._scansioni:
+                firma, nuova = await anyio.to_thread.run_sync(self._scansiona)
+                if nuova is not None:
+                    self._corrente = nuova
+                self._firma = firma
+                self._mtime = mtime
+                self._ultima_scansione = adesso
+                self._scansioni += 1
+        return self._corrente
+
+    async def risorse(self) -> List[RisorsaCorso]:
+        """Elenco delle risorse (ordinato per nome)"""
+        return (await self.corrente()).risorse
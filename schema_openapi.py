@@ -0,0 +1,163 @@
+"""
+SCHEMA_OPENAPI - Schema OpenAPI precalcolato e pagine di documentazione
+
+FastAPI genera lo schema alla prima richiesta di /openapi.json (o /docs),
+bloccando quella richiesta. Qui lo schema viene costruito nel lifespan, oppure
+caricato da uno snapshot prodotto in fase di build, e servito come bytes con ETag.
+
+Creazione dello snapshot:
+    python schema_openapi.py openapi.json
+
+Lo snapshot contiene (in info.x-firma-rotte) l'impronta di rotte, parametri,
+descrizioni, modelli e versioni dell'app che l'ha generato: se all'avvio non corrisponde
+più, lo snapshot è vecchio e lo schema viene rigenerato dalle rotte registrate.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+import fastapi
+import pydantic
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse
+from fastapi.dependencies.utils import get_flat_dependant
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+CAMPO_FIRMA = "x-firma-rotte"
+
+def _codifica(schema: dict) -> bytes:
+    """Stessa serializzazione compatta di JSONResponse"""
+    return json.dumps(schema, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _descrivi_tipo(tipo) -> str:
+    """Nome del tipo, con i campi se è un modello Pydantic"""
+    if isinstance(tipo, type) and issubclass(tipo, pydantic.BaseModel):
+        return f"{tipo.__qualname__}({tipo.model_fields!r})"
+    return repr(tipo)
+
+def _descrivi_parametri(rotta: APIRoute) -> str:
+    """Parametri path, query, header e cookie (anche delle dipendenze) con tipo, default e vincoli"""
+    dipendenze = get_flat_dependant(rotta.dependant, skip_repeats=True)
+    voci = []
+    for posizione, parametri in (("path", dipendenze.path_params), ("query", dipendenze.query_params),
+                                 ("header", dipendenze.header_params), ("cookie", dipendenze.cookie_params)):
+        for parametro in parametri:
+            info = parametro.field_info
+            voci.append(
+                f"{posizione}:{parametro.alias}:{info.annotation!r}={info.default!r} "
+                f"{info.title!r} {info.description!r} {info.metadata!r} {info.examples!r} "
+                f"{info.deprecated!r} {info.json_schema_extra!r} {getattr(info, 'include_in_schema', True)!r}"
+            )
+    return ";".join(voci)
+
+def firma_rotte(app: FastAPI) -> str:
+    """
+    Impronta di versioni, rotte, parametri, testi e modelli: cambia quando
+    cambia lo schema (es. un nuovo query parameter su una rotta esistente)
+    """
+    voci = [app.title, app.version, app.description, fastapi.__version__, pydantic.VERSION]
+    for rotta in app.routes:
+        if not isinstance(rotta, APIRoute) or not rotta.include_in_schema:
+            continue
+        corpo = getattr(rotta.body_field, "type_", None)
+        voci.append(
+            f"{','.join(sorted(rotta.methods))} {rotta.path} {rotta.name} "
+            f"{_descrivi_tipo(rotta.response_model)} {_descrivi_tipo(corpo)} "
+            f"{_descrivi_parametri(rotta)} {rotta.summary!r} {rotta.description!r} "
+            f"{rotta.response_description!r} {rotta.tags!r} {rotta.status_code!r} {rotta.deprecated!r} "
+            f"{rotta.operation_id!r} {rotta.responses!r} {rotta.openapi_extra!r}"
+        )
+    return hashlib.blake2b("\n".join(voci).encode("utf-8"), digest_size=16).hexdigest()
+
+class SchemaOpenAPI:
+    """Schema OpenAPI dell'app, tenuto in memoria come bytes già codificati"""
+
+    def __init__(self, app: FastAPI, snapshot: Optional[str] = None):
+        self.app = app
+        self.snapshot = snapshot
+        self.contenuto: Optional[bytes] = None
+        self.etag: Optional[str] = None
+
+    def prepara(self) -> bytes:
+        """Carica lo snapshot (se presente) oppure genera lo schema"""
+        if self.contenuto is not None:
+            return self.contenuto
+
+        schema = self._leggi_snapshot() if self.snapshot else None
+        if schema is not None:
+            # Condiviso con app.openapi(), così nessuno lo rigenera
+            self.app.openapi_schema = schema
+            origine = f"snapshot '{self.snapshot}'"
+        else:
+            self.contenuto = _codifica(self.app.openapi())
+            origine = "rotte registrate"
+
+        self.etag = f'"openapi-{hashlib.blake2b(self.contenuto, digest_size=8).hexdigest()}"'
+        logger.info(f"Schema OpenAPI pronto da {origine} ({len(self.contenuto)} bytes)")
+        return self.contenuto
+
+    def _leggi_snapshot(self) -> Optional[dict]:
+        """Schema dello snapshot, None se manca o non corrisponde più alle rotte"""
+        if not os.path.exists(self.snapshot):
+            return None
+        with open(self.snapshot, "rb") as file:
+            contenuto = file.read()
+        schema = json.loads(contenuto)
+        if schema.get("info", {}).get(CAMPO_FIRMA) != firma_rotte(self.app):
+            logger.warning(
+                f"Snapshot OpenAPI '{self.snapshot}' non aggiornato (rotte o versioni cambiate): "
+                f"schema rigenerato, ricrealo con python schema_openapi.py {self.snapshot}"
+            )
+            return None
+        self.contenuto = contenuto
+        return schema
+
+def registra_documentazione(app: FastAPI, schema: SchemaOpenAPI):
+    """Registra /openapi.json, /docs e /redoc serviti dallo schema precalcolato"""
+    from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+    from utils import etag_corrisponde
+
+    @app.get("/openapi.json", include_in_schema=False)
+    async def openapi_json(request: Request):
+        contenuto = schema.prepara()
+        headers = {"ETag": schema.etag, "Cache-Control": "no-cache"}
+        if etag_corrisponde(request.headers.get("if-none-match"), schema.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=contenuto, media_type="application/json", headers=headers)
+
+    @app.get("/docs", include_in_schema=False)
+    async def swagger_ui() -> HTMLResponse:
+        return get_swagger_ui_html(
+            openapi_url="/openapi.json",
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url="/docs/oauth2-redirect",
+        )
+
+    @app.get("/docs/oauth2-redirect", include_in_schema=False)
+    async def swagger_ui_redirect() -> HTMLResponse:
+        return get_swagger_ui_oauth2_redirect_html()
+
+    @app.get("/redoc", include_in_schema=False)
+    async def redoc() -> HTMLResponse:
+        return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+def salva_snapshot(percorso: str):
+    """Genera lo schema dall'app e lo salva su file (fase di build)"""
+    from app import create_app
+
+    app = create_app()
+    schema = app.openapi()
+    schema["info"][CAMPO_FIRMA] = firma_rotte(app)
+    contenuto = _codifica(schema)
+    with open(percorso, "wb") as file:
+        file.write(contenuto)
+    print(f"Snapshot OpenAPI salvato in {percorso} ({len(contenuto)} bytes)")
+
+if __name__ == "__main__":
+    salva_snapshot(sys.argv[1] if len(sys.argv) > 1 else "openapi.json")
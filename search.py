@@ -0,0 +1,149 @@
+"""
+SEARCH - Ricerca testuale sui prodotti (indice invertito + BM25)
+
+Il testo di nome, descrizione e tags viene ridotto a termini:
+- minuscole (casefold) e senza accenti ("qualità" → "qualita")
+- parole vuote italiane scartate ("di", "per", "con", ...)
+- stemming leggero per l'italiano: via i suffissi più comuni e la vocale
+  finale, così "cuffia"/"cuffie" e "potente"/"potenti" coincidono
+
+L'indice (termine → {id prodotto: frequenza}) è un indice della collezione
+(vedi indexes.py) e si aggiorna a ogni inserimento, modifica ed eliminazione.
+I risultati sono ordinati con BM25; i campi hanno pesi diversi (un termine
+nel nome conta più di uno nella descrizione).
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from indexes import Indice
+
+PAROLE_VUOTE = frozenset("""
+a ad al alla alle allo agli ai all anche che chi ci col come con da dal dalla dalle dallo
+dagli dai de degli dei del della delle dello di e ed gli i il in la le lo ma ne negli nei
+nel nella nelle nello non o per piu po se senza si sia su sul sulla sulle sullo sugli sui
+tra fra un una uno
+""".split())
+
+# Suffissi derivazionali rimossi prima della vocale finale (dal più lungo)
+SUFFISSI = ("amente", "mente", "azioni", "azione", "zioni", "zione", "issimi", "issime", "issimo", "issima")
+VOCALI_FINALI = "aeio"
+LUNGHEZZA_MINIMA_RADICE = 3
+
+_PAROLA = re.compile(r"\w+")
+
+def _senza_accenti(testo: str) -> str:
+    scomposto = unicodedata.normalize("NFKD", testo)
+    return "".join(c for c in scomposto if not unicodedata.combining(c))
+
+def radice(parola: str) -> str:
+    """Stemming leggero: suffissi comuni e vocale finale"""
+    for suffisso in SUFFISSI:
+        if parola.endswith(suffisso) and len(parola) - len(suffisso) >= LUNGHEZZA_MINIMA_RADICE:
+            parola = parola[:-len(suffisso)]
+            break
+    if len(parola) > LUNGHEZZA_MINIMA_RADICE and parola[-1] in VOCALI_FINALI:
+        parola = parola[:-1]
+    return parola
+
+def tokenizza(testo: Optional[str]) -> List[str]:
+    """Termini indicizzabili di un testo (in ordine, con ripetizioni)"""
+    if not testo:
+        return []
+    parole = _PAROLA.findall(_senza_accenti(testo.casefold()))
+    return [radice(p) for p in parole if p not in PAROLE_VUOTE]
+
+class IndiceTestuale(Indice):
+    """Indice invertito con punteggio BM25 e pesi per campo"""
+
+    def __init__(self, pesi: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        # Campo → peso dei suoi termini
+        self.pesi = pesi
+        self.campi = frozenset(pesi)
+        self.k1 = k1
+        self.b = b
+        # termine → {id: frequenza pesata}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # id → termini del documento (per rimuoverlo) e lunghezza pesata
+        self._termini: Dict[int, Dict[str, float]] = {}
+        self._lunghezze: Dict[int, float] = {}
+        self._lunghezza_totale = 0.0
+
+    def __len__(self) -> int:
+        return len(self._termini)
+
+    def svuota(self):
+        self._postings.clear()
+        self._termini.clear()
+        self._lunghezze.clear()
+        self._lunghezza_totale = 0.0
+
+    def _frequenze(self, record) -> Dict[str, float]:
+        frequenze: Dict[str, float] = {}
+        for campo, peso in self.pesi.items():
+            valore = getattr(record, campo)
+            if isinstance(valore, (list, tuple)):
+                valore = " ".join(valore)
+            for termine in tokenizza(valore):
+                frequenze[termine] = frequenze.get(termine, 0.0) + peso
+        return frequenze
+
+    def aggiungi(self, record):
+        frequenze = self._frequenze(record)
+        for termine, frequenza in frequenze.items():
+            self._postings.setdefault(termine, {})[record.id] = frequenza
+        lunghezza = sum(frequenze.values())
+        self._termini[record.id] = frequenze
+        self._lunghezze[record.id] = lunghezza
+        self._lunghezza_totale += lunghezza
+
+    def rimuovi(self, record):
+        frequenze = self._termini.pop(record.id, None)
+        if frequenze is None:
+            return
+        for termine in frequenze:
+            documenti = self._postings[termine]
+            del documenti[record.id]
+            if not documenti:
+                del self._postings[termine]
+        self._lunghezza_totale -= self._lunghezze.pop(record.id)
+
+    def sostituisci(self, vecchio, nuovo):
+        if all(getattr(vecchio, campo) == getattr(nuovo, campo) for campo in self.campi):
+            return
+        self.rimuovi(vecchio)
+        self.aggiungi(nuovo)
+
+    def cerca(self, testo: str, limite: int = 10, scarta: int = 0) -> Tuple[int, List[Tuple[int, float]]]:
+        """
+        Cerca i documenti che contengono almeno un termine della query
+        Restituisce (totale risultati, [(id, punteggio), ...]) ordinati per punteggio
+        """
+        termini = set(tokenizza(testo))
+        documenti_totali = len(self._termini)
+        if not termini or not self._lunghezza_totale:
+            return 0, []
+
+        # Termini della formula BM25 che non dipendono dal documento
+        k1 = self.k1
+        base = k1 * (1 - self.b)
+        per_lunghezza = k1 * self.b * documenti_totali / self._lunghezza_totale
+        lunghezze = self._lunghezze
+
+        punteggi: Dict[int, float] = {}
+        for termine in termini:
+            documenti = self._postings.get(termine)
+            if not documenti:
+                continue
+            idf = math.log(1 + (documenti_totali - len(documenti) + 0.5) / (len(documenti) + 0.5))
+            peso = idf * (k1 + 1)
+            parziale = punteggi.get
+            for id, frequenza in documenti.items():
+                punteggi[id] = parziale(id, 0.0) + peso * frequenza / (frequenza + base + per_lunghezza * lunghezze[id])
+
+        # Solo i primi scarta+limite: niente ordinamento di tutti i risultati
+        migliori = heapq.nlargest(scarta + limite, punteggi, key=punteggi.__getitem__)
+        return len(punteggi), [(id, punteggi[id]) for id in migliori[scarta:]]
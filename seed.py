@@ -0,0 +1,139 @@
+"""
+SEED - Dati sintetici per provare le collezioni su scala reale
+
+Genera prodotti, utenti e letture di temperatura deterministici (stesso
+seme → stessi dati) e li inserisce nelle collezioni a blocchi con
+inserisci_molti: i dati sono prodotti da generatori, un blocco alla volta,
+senza costruire liste intermedie della dimensione totale. Tra un blocco e
+l'altro il lock viene rilasciato e l'event loop serve le altre richieste.
+
+Si attiva all'avvio con la variabile d'ambiente HTTP_EXPLORER_SEED
+(es. "prodotti=100000,temperature=5000000") oppure con POST /admin/seed.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterator
+
+from models import RecordProdotto, RecordTemperatura, RecordUtente, prodotti_db, temperature_db, utenti_db
+from store import Collezione
+
+logger = logging.getLogger(__name__)
+
+# Record inseriti per ogni acquisizione del lock
+BLOCCO = 20_000
+
+AGGETTIVI = ["Pro", "Max", "Lite", "Ultra", "Mini", "Plus", "Smart", "Eco", "Wireless", "Gaming"]
+OGGETTI = {
+    "elettronica": ["Smartphone", "Tablet", "Smartwatch", "Fotocamera", "Drone"],
+    "computer": ["Laptop", "Monitor", "Tastiera", "Mouse", "Router", "SSD"],
+    "audio": ["Cuffie", "Altoparlante", "Soundbar", "Microfono", "Auricolari"],
+    "casa": ["Lampada", "Termostato", "Aspirapolvere", "Purificatore"],
+    "sport": ["Bicicletta", "Tapis Roulant", "Cardiofrequenzimetro", "Borraccia"],
+}
+DESCRIZIONI = [
+    "Ottimo rapporto qualità prezzo", "Design compatto e leggero", "Batteria di lunga durata",
+    "Prestazioni elevate per uso professionale", "Ideale per lo studio e il lavoro",
+]
+TAGS = ["wireless", "gaming", "5g", "bluetooth", "portatile", "offerta", "nuovo", "performance", "audio", "mobile"]
+NOMI = ["Mario", "Giulia", "Luca", "Sara", "Marco", "Anna", "Paolo", "Elena", "Andrea", "Chiara"]
+COGNOMI = ["Rossi", "Bianchi", "Verdi", "Russo", "Ferrari", "Esposito", "Romano", "Colombo"]
+POSIZIONI = ["Aula A", "Aula B", "Aula C", "Laboratorio", "Biblioteca", "Palestra", "Corridoio", "Segreteria"]
+
+INIZIO_LETTURE = datetime(2024, 1, 1)
+
+# ================================
+# GENERATORI (un costruttore per record, come vuole inserisci_molti)
+# ================================
+
+def genera_prodotti(n: int, seme: int = 42) -> Iterator[Callable[[int], RecordProdotto]]:
+    rnd = random.Random(seme)
+    categorie = list(OGGETTI)
+    for _ in range(n):
+        categoria = rnd.choice(categorie)
+        nome = f"{rnd.choice(OGGETTI[categoria])} {rnd.choice(AGGETTIVI)} {rnd.randint(1, 999)}"
+        descrizione = rnd.choice(DESCRIZIONI)
+        prezzo = round(rnd.uniform(5, 2500), 2)
+        disponibile = rnd.random() < 0.8
+        tags = tuple(rnd.sample(TAGS, rnd.randint(0, 3)))
+        yield lambda id, nome=nome, descrizione=descrizione, prezzo=prezzo, categoria=categoria, \
+            disponibile=disponibile, tags=tags: RecordProdotto(id, nome, descrizione, prezzo, categoria, disponibile, tags)
+
+def genera_utenti(n: int, seme: int = 42) -> Iterator[Callable[[int], RecordUtente]]:
+    rnd = random.Random(seme)
+    for _ in range(n):
+        nome, cognome = rnd.choice(NOMI), rnd.choice(COGNOMI)
+        eta = rnd.randint(18, 90)
+        yield lambda id, nome=nome, cognome=cognome, eta=eta: RecordUtente(
+            id, f"{nome} {cognome}", f"{nome.lower()}.{cognome.lower()}{id}@email.com", eta
+        )
+
+def genera_temperature(n: int, seme: int = 42, sensori: int = 500) -> Iterator[Callable[[int], RecordTemperatura]]:
+    """Letture di `sensori` sensori, una ogni 10 secondi, attorno a una media per sensore"""
+    rnd = random.Random(seme)
+    medie = [rnd.uniform(17, 26) for _ in range(sensori)]
+    nomi = [f"SENSOR_{s:04d}" for s in range(sensori)]
+    for i in range(n):
+        s = i % sensori
+        valore = round(rnd.gauss(medie[s], 1.5), 2)
+        timestamp = (INIZIO_LETTURE + timedelta(seconds=10 * i)).isoformat()
+        yield lambda id, s=s, valore=valore, timestamp=timestamp: RecordTemperatura.crea(
+            id, valore, nomi[s], timestamp, "C", POSIZIONI[s % len(POSIZIONI)]
+        )
+
+GENERATORI: Dict[str, Callable[[int, int], Iterator[Callable]]] = {
+    "prodotti": genera_prodotti,
+    "utenti": genera_utenti,
+    "temperature": genera_temperature,
+}
+
+COLLEZIONI: Dict[str, Collezione] = {
+    "prodotti": prodotti_db,
+    "utenti": utenti_db,
+    "temperature": temperature_db,
+}
+
+# ================================
+# INSERIMENTO
+# ================================
+
+async def popola(collezione: Collezione, costruttori: Iterator[Callable], blocco: int = BLOCCO) -> int:
+    """Inserisce i record a blocchi, cedendo l'event loop tra un blocco e l'altro"""
+    inseriti = 0
+    while True:
+        nuovi = await collezione.inserisci_molti(islice(costruttori, blocco))
+        if not nuovi:
+            return inseriti
+        inseriti += len(nuovi)
+        del nuovi
+        await asyncio.sleep(0)
+
+async def semina(quantita: Dict[str, int], seme: int = 42) -> Dict[str, Dict[str, float]]:
+    """Aggiunge i record sintetici richiesti: {collezione: numero}"""
+    risultati = {}
+    for nome, n in quantita.items():
+        if nome not in GENERATORI:
+            raise ValueError(f"Collezione sconosciuta: '{nome}' (disponibili: {', '.join(GENERATORI)})")
+        if n <= 0:
+            continue
+        inizio = time.perf_counter()
+        inseriti = await popola(COLLEZIONI[nome], GENERATORI[nome](n, seme))
+        durata = time.perf_counter() - inizio
+        risultati[nome] = {"inseriti": inseriti, "totale": len(COLLEZIONI[nome]), "secondi": round(durata, 3)}
+        logger.info(f"SEED: {inseriti} {nome} in {durata:.2f}s")
+    return risultati
+
+def leggi_quantita(testo: str) -> Dict[str, int]:
+    """Quantità da "prodotti=100000,temperature=1000000" (anche 1_000_000)"""
+    quantita = {}
+    for voce in filter(None, (v.strip() for v in testo.split(","))):
+        nome, _, numero = voce.partition("=")
+        nome = nome.strip()
+        if nome not in GENERATORI or not numero.strip():
+            raise ValueError(f"Voce di seed non valida: '{voce}' (formato: collezione=numero)")
+        quantita[nome] = int(numero.strip())
+    return quantita
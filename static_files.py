@@ -0,0 +1,304 @@
+"""
+STATIC_FILES - Download dei file del corso (cartella download/)
+
+App ASGI che sostituisce StaticFiles per i materiali del corso:
+- ETag forti calcolati da inode, mtime e dimensione
+- richieste condizionali (If-None-Match / If-Modified-Since -> 304)
+- Range singoli e multipli (206, multipart/byteranges) per download riprendibili
+- varianti precompresse .br / .gz servite senza ricomprimere
+- invio zero-copy quando il server ASGI supporta le estensioni
+  http.response.zerocopy (sendfile) o http.response.pathsend
+"""
+
+import mimetypes
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from stat import S_ISREG
+from typing import List, Optional, Tuple
+
+import anyio
+
+from compression import negozia_codifica
+from utils import etag_corrisponde
+
+# Varianti precompresse cercate accanto al file originale
+VARIANTI_PRECOMPRESSE = {"br": ".br", "gzip": ".gz"}
+
+# Oltre questo numero di intervalli la richiesta Range viene ignorata
+MAX_INTERVALLI = 16
+
+DIMENSIONE_CHUNK = 256 * 1024
+
+def _route_path(scope) -> str:
+    """Percorso relativo al punto di mount (come starlette)"""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path) and path != root_path and path[len(root_path)] == "/":
+        return path[len(root_path):]
+    return path
+
+def etag_file(stat: os.stat_result, suffisso: str = "") -> str:
+    """ETag forte basato su inode, mtime e dimensione"""
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}{suffisso}"'
+
+def analizza_range(header: str, dimensione: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Interpreta l'header Range (solo unità bytes)
+    Restituisce la lista di intervalli [inizio, fine] inclusivi,
+    [] se nessun intervallo è soddisfacibile, None se l'header non è valido
+    """
+    unita, _, specifiche = header.partition("=")
+    if unita.strip().lower() != "bytes" or not specifiche:
+        return None
+
+    intervalli = []
+    for specifica in specifiche.split(","):
+        specifica = specifica.strip()
+        if not specifica:
+            continue
+        inizio, separatore, fine = specifica.partition("-")
+        if not separatore:
+            return None
+        try:
+            if inizio == "":
+                # Suffisso: ultimi N byte
+                lunghezza = int(fine)
+                if lunghezza <= 0 or dimensione == 0:
+                    continue
+                intervalli.append((max(dimensione - lunghezza, 0), dimensione - 1))
+                continue
+            inizio_int = int(inizio)
+            fine_int = int(fine) if fine else None
+        except ValueError:
+            return None
+        if fine_int is not None and inizio_int > fine_int:
+            return None
+        if inizio_int >= dimensione:
+            continue
+        intervalli.append((inizio_int, dimensione - 1 if fine_int is None else min(fine_int, dimensione - 1)))
+
+    if len(intervalli) > MAX_INTERVALLI:
+        return None
+    return intervalli
+
+class FileDownload:
+    """App ASGI per servire i file di una cartella"""
+
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._risposta_semplice(send, 405, b"Metodo non consentito", [(b"allow", b"GET, HEAD")])
+            return
+
+        percorso = self._risolvi(_route_path(scope))
+        stat = self._stat(percorso) if percorso else None
+        if stat is None:
+            await self._risposta_semplice(send, 404, b"File non trovato")
+            return
+
+        headers_richiesta = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        media_type = mimetypes.guess_type(percorso)[0] or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+
+        # Variante precompressa (.br / .gz) se il client la accetta ed è aggiornata
+        headers = [(b"accept-ranges", b"bytes")]
+        codifica, variante = self._variante(percorso, stat, headers_richiesta.get("accept-encoding"))
+        if variante is not None:
+            headers.append((b"vary", b"Accept-Encoding"))
+            if codifica is not None:
+                percorso, stat = variante
+                headers.append((b"content-encoding", codifica.encode("latin-1")))
+
+        etag = etag_file(stat, f"-{codifica}" if codifica else "")
+        headers += [
+            (b"content-type", media_type.encode("latin-1")),
+            (b"etag", etag.encode("latin-1")),
+            (b"last-modified", formatdate(stat.st_mtime, usegmt=True).encode("latin-1")),
+        ]
+
+        if self._non_modificato(headers_richiesta, etag, stat):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        dimensione = stat.st_size
+        intervalli = None
+        if "range" in headers_richiesta and self._if_range_valido(headers_richiesta.get("if-range"), etag, stat):
+            intervalli = analizza_range(headers_richiesta["range"], dimensione)
+            if intervalli == []:
+                headers.append((b"content-range", f"bytes */{dimensione}".encode("latin-1")))
+                await self._risposta_semplice(send, 416, b"Range non soddisfacibile", headers)
+                return
+
+        corpo = scope["method"] == "GET"
+        estensioni = scope.get("extensions") or {}
+
+        if not intervalli:
+            headers.append((b"content-length", str(dimensione).encode("latin-1")))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            if not corpo or dimensione == 0:
+                await send({"type": "http.response.body", "body": b""})
+            elif "http.response.pathsend" in estensioni:
+                await send({"type": "http.response.pathsend", "path": percorso})
+            else:
+                await self._invia_file(send, estensioni, percorso, [(0, dimensione - 1)], [], b"")
+            return
+
+        if len(intervalli) == 1:
+            inizio, fine = intervalli[0]
+            headers += [
+                (b"content-range", f"bytes {inizio}-{fine}/{dimensione}".encode("latin-1")),
+                (b"content-length", str(fine - inizio + 1).encode("latin-1")),
+            ]
+            await send({"type": "http.response.start", "status": 206, "headers": headers})
+            if corpo:
+                await self._invia_file(send, estensioni, percorso, intervalli, [], b"")
+            else:
+                await send({"type": "http.response.body", "body": b""})
+            return
+
+        # Più intervalli: multipart/byteranges (RFC 9110 §14.6)
+        boundary = secrets.token_hex(16)
+        intestazioni_parti = [
+            (
+                f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                f"Content-Range: bytes {inizio}-{fine}/{dimensione}\r\n\r\n"
+            ).encode("latin-1")
+            for inizio, fine in intervalli
+        ]
+        chiusura = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        lunghezza = (
+            sum(fine - inizio + 1 for inizio, fine in intervalli)
+            + sum(len(h) for h in intestazioni_parti)
+            + 2 * (len(intervalli) - 1)
+            + len(chiusura)
+        )
+        headers = [
+            (k, v) for k, v in headers if k != b"content-type"
+        ] + [
+            (b"content-type", f"multipart/byteranges; boundary={boundary}".encode("latin-1")),
+            (b"content-length", str(lunghezza).encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": 206, "headers": headers})
+        if corpo:
+            await self._invia_file(send, estensioni, percorso, intervalli, intestazioni_parti, chiusura)
+        else:
+            await send({"type": "http.response.body", "body": b""})
+
+    def _risolvi(self, percorso_relativo: str) -> Optional[str]:
+        """Percorso assoluto del file, solo se interno alla cartella servita"""
+        percorso = os.path.realpath(os.path.join(self.directory, percorso_relativo.lstrip("/")))
+        if not percorso.startswith(self.directory + os.sep):
+            return None
+        return percorso
+
+    @staticmethod
+    def _stat(percorso: str) -> Optional[os.stat_result]:
+        try:
+            stat = os.stat(percorso)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return stat if S_ISREG(stat.st_mode) else None
+
+    def _variante(self, percorso: str, stat: os.stat_result, accept_encoding: Optional[str]):
+        """
+        Cerca le varianti precompresse del file
+        Restituisce (codifica scelta, (percorso, stat)) oppure (None, variante qualsiasi | None)
+        """
+        presenti = {}
+        for codifica, estensione in VARIANTI_PRECOMPRESSE.items():
+            stat_variante = self._stat(percorso + estensione)
+            if stat_variante is not None and stat_variante.st_mtime_ns >= stat.st_mtime_ns:
+                presenti[codifica] = (percorso + estensione, stat_variante)
+        if not presenti:
+            return None, None
+
+        codifica = negozia_codifica(accept_encoding, tuple(presenti))
+        if codifica is None:
+            return None, next(iter(presenti.values()))
+        return codifica, presenti[codifica]
+
+    @staticmethod
+    def _non_modificato(headers_richiesta, etag: str, stat: os.stat_result) -> bool:
+        """Richiesta condizionale: If-None-Match ha la precedenza su If-Modified-Since"""
+        if_none_match = headers_richiesta.get("if-none-match")
+        if if_none_match is not None:
+            return etag_corrisponde(if_none_match, etag)
+        if_modified_since = headers_richiesta.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _if_range_valido(if_range: Optional[str], etag: str, stat: os.stat_result) -> bool:
+        """If-Range: il Range vale solo se la rappresentazione non è cambiata (confronto forte)"""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            return if_range == etag
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    async def _invia_file(self, send, estensioni, percorso: str, intervalli, intestazioni_parti, chiusura: bytes):
+        """Invia gli intervalli richiesti (zero-copy se il server lo supporta)"""
+        zerocopy = "http.response.zerocopy" in estensioni
+        # open() tocca il disco: fuori dall'event loop come le letture
+        file = await anyio.to_thread.run_sync(open, percorso, "rb")
+        try:
+            for indice, (inizio, fine) in enumerate(intervalli):
+                ultimo = indice == len(intervalli) - 1
+                if intestazioni_parti:
+                    separatore = b"\r\n" if indice else b""
+                    await send({"type": "http.response.body", "body": separatore + intestazioni_parti[indice], "more_body": True})
+
+                if zerocopy:
+                    # Il server usa os.sendfile direttamente sul socket
+                    await send({
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "offset": inizio,
+                        "count": fine - inizio + 1,
+                        "more_body": not ultimo or bool(chiusura),
+                    })
+                else:
+                    await anyio.to_thread.run_sync(file.seek, inizio)
+                    rimanenti = fine - inizio + 1
+                    while rimanenti > 0:
+                        chunk = await anyio.to_thread.run_sync(file.read, min(DIMENSIONE_CHUNK, rimanenti))
+                        if not chunk:
+                            # File accorciato durante l'invio: la risposta va comunque chiusa
+                            await send({"type": "http.response.body", "body": b"", "more_body": False})
+                            return
+                        rimanenti -= len(chunk)
+                        await send({
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": rimanenti > 0 or not ultimo or bool(chiusura),
+                        })
+
+            if chiusura:
+                await send({"type": "http.response.body", "body": chiusura, "more_body": False})
+        finally:
+            file.close()
+
+    @staticmethod
+    async def _risposta_semplice(send, status: int, messaggio: bytes, headers=None):
+        headers = [(k, v) for k, v in (headers or []) if k not in (b"content-type", b"content-length")]
+        headers += [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(messaggio)).encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": messaggio})
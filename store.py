@@ -0,0 +1,270 @@
+"""
+STORE - Collezioni in memoria con scritture atomiche
+
+Ogni collezione (prodotti, utenti, temperature) ha il suo asyncio.Lock:
+le scritture read-modify-write (nuovo ID, aggiornamenti parziali, ...) sono
+serializzate, mentre le letture non prendono mai il lock.
+
+I record salvati non vengono mai modificati sul posto: ogni aggiornamento
+crea un nuovo oggetto e lo sostituisce (copy-on-write), così un lettore che
+ha già in mano un record non lo vede cambiare a metà richiesta.
+
+Per le liste ogni collezione offre uno snapshot immutabile (tupla) legato
+alla versione corrente: i lettori lo riusano senza copiare nulla, e viene
+ricostruito una sola volta dopo ogni modifica.
+
+Gli indici secondari (vedi indexes.py) si registrano con registra_indice
+e vengono aggiornati dentro il lock, insieme ai dati.
+
+Le operazioni in blocco (*_molti) applicano tutte le modifiche in un'unica
+sezione critica, con un solo incremento di versione e un solo aggiornamento
+degli indici per blocco.
+
+Quando un record viene sostituito si calcolano i campi cambiati: se non
+cambia nulla non si scrive niente, altrimenti si aggiornano solo gli indici
+che dichiarano (attributo campi) uno dei campi modificati, e la revisione
+del record (usata per gli ETag) avanza di uno.
+
+Ogni scrittura prepara prima tutti i nuovi record, poi aggiorna gli indici e
+solo alla fine i dati: se un indice solleva un'eccezione i dati sono ancora
+quelli di prima e gli indici vengono ricostruiti da essi, quindi non resta
+mai un blocco applicato a metà.
+"""
+
+import asyncio
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Generic, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+def campi_modificati(vecchio, nuovo) -> Optional[FrozenSet[str]]:
+    """Campi diversi tra due versioni di un record (None se non si può sapere)"""
+    campi = getattr(vecchio, "_fields", None)
+    if campi is None or getattr(nuovo, "_fields", None) != campi:
+        return None if vecchio != nuovo else frozenset()
+    return frozenset(campo for campo, a, b in zip(campi, vecchio, nuovo) if a != b)
+
+class Collezione(Mapping[int, T], Generic[T]):
+    """Collezione di record indicizzati per ID (letture senza lock, scritture serializzate)"""
+
+    def __init__(self, nome: str, iniziali: Optional[Dict[int, T]] = None):
+        self.nome = nome
+        self._dati: Dict[int, T] = dict(iniziali or {})
+        # Gli ID non vengono riutilizzati dopo un'eliminazione
+        self._prossimo_id = max(self._dati, default=0) + 1
+        self._lock = asyncio.Lock()
+        # Incrementata a ogni modifica (utile anche per ETag e cache)
+        self.versione = 0
+        # (versione, tupla dei record): sostituito in un'unica assegnazione
+        self._snapshot: Tuple[int, Tuple[T, ...]] = (-1, ())
+        self._indici: List = []
+        # Revisione dei soli record modificati dopo l'inserimento (gli altri sono alla 1)
+        self._revisioni: Dict[int, int] = {}
+
+    def registra_indice(self, indice):
+        """Registra un indice secondario e lo popola con i record attuali"""
+        indice.ricostruisci(self._dati.values())
+        self._indici.append(indice)
+        return indice
+
+    # ================================
+    # LETTURE (senza lock)
+    # ================================
+
+    def __getitem__(self, id: int) -> T:
+        return self._dati[id]
+
+    def __contains__(self, id) -> bool:
+        return id in self._dati
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._dati)
+
+    def __len__(self) -> int:
+        return len(self._dati)
+
+    def keys(self):
+        return self._dati.keys()
+
+    def values(self):
+        return self._dati.values()
+
+    def items(self):
+        return self._dati.items()
+
+    def revisione(self, id: int) -> int:
+        """Revisione di un record: parte da 1 e cresce a ogni modifica effettiva"""
+        return self._revisioni.get(id, 1)
+
+    def snapshot(self) -> Tuple[T, ...]:
+        """
+        Record correnti in ordine di inserimento, come tupla immutabile
+        La stessa tupla viene condivisa da tutti i lettori finché non c'è una modifica
+        """
+        versione, record = self._snapshot
+        if versione != self.versione:
+            versione = self.versione
+            record = tuple(self._dati.values())
+            self._snapshot = (versione, record)
+        return record
+
+    # ================================
+    # SCRITTURE (atomiche)
+    # ================================
+
+    @staticmethod
+    def _interessa(indice, cambiati: Optional[FrozenSet[str]]) -> bool:
+        """L'indice dipende da uno dei campi cambiati? (None = campi sconosciuti)"""
+        campi = getattr(indice, "campi", None)
+        return cambiati is None or campi is None or bool(campi & cambiati)
+
+    def _aggiorna_indici(self, operazioni: Iterable[Callable[[], None]]):
+        """
+        Esegue gli aggiornamenti degli indici prima di toccare i dati
+        Se uno fallisce, tutti gli indici vengono ricostruiti dai dati (ancora invariati)
+        """
+        try:
+            for operazione in operazioni:
+                operazione()
+        except BaseException:
+            for indice in self._indici:
+                indice.svuota()
+                indice.ricostruisci(self._dati.values())
+            raise
+
+    def _sostituisci(self, id: int, vecchio: T, nuovo: T) -> bool:
+        """Aggiorna gli indici e scrive il nuovo record (False se non cambia nulla)"""
+        cambiati = campi_modificati(vecchio, nuovo)
+        if cambiati is not None and not cambiati:
+            return False
+        self._aggiorna_indici(
+            partial(indice.sostituisci, vecchio, nuovo)
+            for indice in self._indici if self._interessa(indice, cambiati)
+        )
+        self._dati[id] = nuovo
+        self._revisioni[id] = self._revisioni.get(id, 1) + 1
+        return True
+
+    async def inserisci(self, costruttore: Callable[[int], T]) -> T:
+        """Assegna un nuovo ID e salva il record creato da costruttore(id)"""
+        async with self._lock:
+            nuovo_id = self._prossimo_id
+            record = costruttore(nuovo_id)
+            self._aggiorna_indici(partial(indice.aggiungi, record) for indice in self._indici)
+            self._dati[nuovo_id] = record
+            self._prossimo_id = nuovo_id + 1
+            self.versione += 1
+            return record
+
+    async def sostituisci(self, id: int, record: T) -> T:
+        """Sostituisce un record esistente (KeyError se non esiste)"""
+        async with self._lock:
+            if self._sostituisci(id, self._dati[id], record):
+                self.versione += 1
+            return self._dati[id]
+
+    async def aggiorna(self, id: int, modifica: Callable[[T], T]) -> T:
+        """
+        Read-modify-write atomico: modifica(vecchio) deve restituire
+        un nuovo record, senza alterare quello ricevuto.
+        Se modifica solleva un'eccezione la collezione resta invariata.
+        """
+        async with self._lock:
+            vecchio = self._dati[id]
+            if self._sostituisci(id, vecchio, modifica(vecchio)):
+                self.versione += 1
+            return self._dati[id]
+
+    async def elimina(self, id: int) -> T:
+        """Rimuove e restituisce un record (KeyError se non esiste)"""
+        async with self._lock:
+            record = self._dati[id]
+            self._aggiorna_indici(partial(indice.rimuovi, record) for indice in self._indici)
+            del self._dati[id]
+            self._revisioni.pop(id, None)
+            self.versione += 1
+            return record
+
+    # ================================
+    # SCRITTURE IN BLOCCO (atomiche)
+    # ================================
+
+    async def inserisci_molti(self, costruttori: Iterable[Callable[[int], T]]) -> List[T]:
+        """Inserisce più record con ID consecutivi (un solo incremento di versione)"""
+        async with self._lock:
+            nuovi = [costruttore(id) for id, costruttore in enumerate(costruttori, self._prossimo_id)]
+            if nuovi:
+                self._aggiorna_indici(partial(indice.aggiungi_molti, nuovi) for indice in self._indici)
+                self._dati.update((self._prossimo_id + i, record) for i, record in enumerate(nuovi))
+                self._prossimo_id += len(nuovi)
+                self.versione += 1
+            return nuovi
+
+    async def aggiorna_molti(
+        self, modifiche: Iterable[Tuple[int, Callable[[T], T]]]
+    ) -> List[Union[T, None, ValueError]]:
+        """
+        Applica più read-modify-write insieme
+        Restituisce il record risultante per ogni modifica: None se l'ID non esiste,
+        l'eccezione se modifica solleva ValueError (es. ValidationError: quella
+        modifica viene scartata, le altre vengono applicate)
+        """
+        async with self._lock:
+            risultati: List[Union[T, None, ValueError]] = []
+            # Nuova versione di ogni ID modificato (anche se modificato più volte)
+            nuovi: Dict[int, T] = {}
+            for id, modifica in modifiche:
+                vecchio = nuovi.get(id) or self._dati.get(id)
+                if vecchio is None:
+                    risultati.append(None)
+                    continue
+                try:
+                    nuovi[id] = modifica(vecchio)
+                except ValueError as e:
+                    risultati.append(e)
+                    continue
+                risultati.append(nuovi[id])
+
+            # Ogni indice riceve solo le coppie che toccano i suoi campi
+            coppie_per_indice: List[List[Tuple[T, T]]] = [[] for _ in self._indici]
+            cambiati_ids: List[int] = []
+            for id, nuovo in nuovi.items():
+                vecchio = self._dati[id]
+                cambiati = campi_modificati(vecchio, nuovo)
+                if cambiati is not None and not cambiati:
+                    continue
+                cambiati_ids.append(id)
+                for coppie, indice in zip(coppie_per_indice, self._indici):
+                    if self._interessa(indice, cambiati):
+                        coppie.append((vecchio, nuovo))
+            if cambiati_ids:
+                self._aggiorna_indici(
+                    partial(indice.sostituisci_molti, coppie)
+                    for indice, coppie in zip(self._indici, coppie_per_indice) if coppie
+                )
+                for id in cambiati_ids:
+                    self._dati[id] = nuovi[id]
+                    self._revisioni[id] = self._revisioni.get(id, 1) + 1
+                self.versione += 1
+            return risultati
+
+    async def elimina_molti(self, ids: Iterable[int]) -> List[Optional[T]]:
+        """Rimuove più record (None per gli ID che non esistono)"""
+        async with self._lock:
+            ids = list(ids)
+            # Un ID ripetuto viene eliminato una volta sola (le ripetizioni danno None)
+            eliminati = []
+            presenti: Dict[int, T] = {}
+            for id in ids:
+                record = None if id in presenti else self._dati.get(id)
+                if record is not None:
+                    presenti[id] = record
+                eliminati.append(record)
+            if presenti:
+                record_presenti = list(presenti.values())
+                self._aggiorna_indici(partial(indice.rimuovi_molti, record_presenti) for indice in self._indici)
+                for id in presenti:
+                    del self._dati[id]
+                    self._revisioni.pop(id, None)
+                self.versione += 1
+            return eliminati
@@ -0,0 +1,86 @@
+"""
+SYMBOLS - Tabelle di simboli per stringhe ripetute (sensori, posizioni)
+
+Ogni nome distinto viene salvato una sola volta e riceve un piccolo ID intero,
+insieme alla sua chiave normalizzata (casefold). I record memorizzano solo
+l'ID: i filtri diventano un accesso a dizionario per risolvere la query
+e un confronto tra interi per ogni riga, senza .lower() per riga.
+
+Per la ricerca per sottostringa (filtro posizione) ogni chiave è indicizzata
+per trigrammi: la query interseca le liste dei suoi trigrammi e verifica
+solo i candidati rimasti.
+"""
+
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set
+
+NESSUNO: FrozenSet[int] = frozenset()
+
+def normalizza(nome: str) -> str:
+    """Chiave di confronto case-insensitive"""
+    return nome.casefold()
+
+def trigrammi(testo: str) -> Iterator[str]:
+    """Sottostringhe di 3 caratteri (anche ripetute)"""
+    return (testo[i:i + 3] for i in range(len(testo) - 2))
+
+class TabellaSimboli:
+    """Nomi distinti ↔ ID interi, con ricerca per chiave normalizzata"""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._ids: Dict[str, int] = {}
+        self._nomi: List[str] = []
+        self._chiavi: List[str] = []
+        # Chiave normalizzata → ID di tutte le varianti (es. "SENSOR_01" e "sensor_01")
+        self._per_chiave: Dict[str, FrozenSet[int]] = {}
+        # Trigramma → ID delle chiavi che lo contengono
+        self._trigrammi: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nomi)
+
+    def interna(self, nome: Optional[str]) -> Optional[int]:
+        """ID del nome, registrandolo se è nuovo (None resta None)"""
+        if nome is None:
+            return None
+        id = self._ids.get(nome)
+        if id is None:
+            id = len(self._nomi)
+            self._ids[nome] = id
+            self._nomi.append(nome)
+            chiave = normalizza(nome)
+            self._chiavi.append(chiave)
+            self._per_chiave[chiave] = self._per_chiave.get(chiave, NESSUNO) | {id}
+            for trigramma in trigrammi(chiave):
+                self._trigrammi.setdefault(trigramma, set()).add(id)
+        return id
+
+    def nome_di(self, id: Optional[int]) -> Optional[str]:
+        """Nome originale di un ID"""
+        return None if id is None else self._nomi[id]
+
+    def chiave_di(self, id: int) -> str:
+        """Chiave normalizzata di un ID"""
+        return self._chiavi[id]
+
+    def cerca(self, nome: str) -> FrozenSet[int]:
+        """ID dei nomi uguali a quello dato, ignorando maiuscole/minuscole"""
+        return self._per_chiave.get(normalizza(nome), NESSUNO)
+
+    def contenenti(self, testo: str) -> FrozenSet[int]:
+        """ID dei nomi che contengono il testo, ignorando maiuscole/minuscole"""
+        testo = normalizza(testo)
+        if len(testo) < 3:
+            # Query troppo corta per i trigrammi: scansione dei soli nomi distinti
+            return frozenset(id for id, chiave in enumerate(self._chiavi) if testo in chiave)
+
+        liste = []
+        for trigramma in set(trigrammi(testo)):
+            ids = self._trigrammi.get(trigramma)
+            if not ids:
+                return NESSUNO
+            liste.append(ids)
+        liste.sort(key=len)
+        candidati = set(liste[0]).intersection(*liste[1:])
+        # I trigrammi non garantiscono l'ordine: verifica finale sui candidati
+        return frozenset(id for id in candidati if testo in self._chiavi[id])
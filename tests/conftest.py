@@ -0,0 +1,76 @@
+"""
+CONFTEST - Fixture comuni dei test
+
+Le collezioni sono globali (models.py): ogni test parte dai dati iniziali,
+che vengono ripristinati (con gli indici) alla fine di ogni test.
+"""
+
+import copy
+import logging
+import os
+import sys
+
+import pytest
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+# L'app monta la cartella download con un percorso relativo
+os.chdir(RADICE)
+os.environ.setdefault("HTTP_EXPLORER_MONITOR_LOOP", "0")
+logging.disable(logging.INFO)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import create_app  # noqa: E402
+from indexes import IndiceRecenti  # noqa: E402
+from models import prodotti_db, temperature_db, utenti_db  # noqa: E402
+
+COLLEZIONI = (prodotti_db, utenti_db, temperature_db)
+
+@pytest.fixture(autouse=True)
+def collezioni_iniziali():
+    salvate = [(c, dict(c._dati), c._prossimo_id, dict(c._revisioni)) for c in COLLEZIONI]
+    yield
+    for collezione, dati, prossimo_id, revisioni in salvate:
+        collezione._dati = dati
+        collezione._prossimo_id = prossimo_id
+        collezione._revisioni = revisioni
+        collezione.versione += 1
+        for indice in collezione._indici:
+            indice.svuota()
+            indice.ricostruisci(dati.values())
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app()
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+def _stato(indice) -> dict:
+    """Contenuto confrontabile di un indice (liste ordinate, float arrotondati)"""
+    stato = {}
+    for nome, valore in vars(indice).items():
+        if isinstance(valore, list):
+            valore = sorted(valore)
+        elif isinstance(valore, float):
+            valore = round(valore, 6)
+        stato[nome] = valore
+    return stato
+
+@pytest.fixture
+def verifica_indici():
+    """Controlla che ogni indice coincida con uno ricostruito da zero sui dati attuali"""
+    def verifica(collezione):
+        for indice in collezione._indici:
+            if isinstance(indice, IndiceRecenti):
+                # Eventuale ricalcolo rimandato alla prima lettura
+                indice.ultimi(indice.quanti)
+            # La collezione (vista da IndiceRecenti) resta condivisa, non copiata
+            ricostruito = copy.deepcopy(indice, {id(collezione): collezione})
+            ricostruito.svuota()
+            ricostruito.ricostruisci(collezione.values())
+            assert _stato(ricostruito) == _stato(indice), type(indice).__name__
+    return verifica
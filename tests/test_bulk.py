@@ -0,0 +1,62 @@
+"""Operazioni in blocco su /prodotti/bulk: validazione per elemento e coerenza degli indici"""
+
+import json
+
+from models import prodotti_db
+
+def _risultati(risposta):
+    return [(r["stato"], r.get("id")) for r in risposta.json()["data"]["risultati"]]
+
+def test_crea_bulk_array_e_ndjson(client, verifica_indici):
+    risposta = client.post("/prodotti/bulk", json=[
+        {"nome": "Mouse", "prezzo": 20, "categoria": "computer", "tags": ["usb"]},
+        {"nome": "", "prezzo": 20, "categoria": "computer"},
+    ])
+    assert risposta.status_code == 200
+    assert [stato for stato, _ in _risultati(risposta)] == [201, 422]
+
+    ndjson = "\n".join([json.dumps({"nome": "Tastiera", "prezzo": 35, "categoria": "computer"}), "{non json"])
+    risposta = client.post("/prodotti/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert [stato for stato, _ in _risultati(risposta)] == [201, 400]
+    assert len(prodotti_db) == 5
+    verifica_indici(prodotti_db)
+
+def test_crea_bulk_content_type_non_supportato(client):
+    risposta = client.post("/prodotti/bulk", content="x", headers={"Content-Type": "text/plain"})
+    assert risposta.status_code == 415
+
+def test_aggiorna_bulk_null_rifiutato_senza_toccare_lo_store(client, verifica_indici):
+    versione = prodotti_db.versione
+    risposta = client.patch("/prodotti/bulk", json=[
+        {"id": 1, "nome": None},
+        {"id": 2, "prezzo": None},
+        {"id": 3, "categoria": None},
+        {"id": 3, "disponibile": None},
+    ])
+    assert risposta.status_code == 200
+    assert [stato for stato, _ in _risultati(risposta)] == [422, 422, 422, 422]
+    assert prodotti_db[1].nome == "Smartphone Pro"
+    assert prodotti_db.versione == versione
+    assert client.get("/prodotti/cerca", params={"q": "smartphone"}).json()["data"]["paginazione"]["totale_risultati"] == 1
+    verifica_indici(prodotti_db)
+
+def test_aggiorna_bulk_parziale_e_id_ripetuti(client, verifica_indici):
+    risposta = client.patch("/prodotti/bulk", json=[
+        {"id": 1, "prezzo": 10},
+        {"id": 3, "nome": "Cuffie Studio"},
+        {"id": 3, "prezzo": 5},
+        {"id": 99, "nome": "Nessuno"},
+        {"id": 2, "nome": None},
+    ])
+    assert _risultati(risposta) == [(200, 1), (200, 3), (200, 3), (404, 99), (422, 2)]
+    assert prodotti_db[3].nome == "Cuffie Studio" and prodotti_db[3].prezzo == 5
+    assert prodotti_db.revisione(3) == 2
+    nomi = [p["nome"] for p in client.get("/prodotti", params={"ordina": "prezzo"}).json()["data"]["prodotti"]]
+    assert nomi == ["Cuffie Studio", "Smartphone Pro", "Laptop Gaming"]
+    verifica_indici(prodotti_db)
+
+def test_elimina_bulk(client, verifica_indici):
+    risposta = client.request("DELETE", "/prodotti/bulk", json=[1, {"id": 2}, 1, 42, "x"])
+    assert _risultati(risposta) == [(200, 1), (200, 2), (404, 1), (404, 42), (422, None)]
+    assert list(prodotti_db) == [3]
+    verifica_indici(prodotti_db)
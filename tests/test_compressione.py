@@ -0,0 +1,74 @@
+"""Compressione negoziata: Vary, cache per body identici, HEAD coerente con GET"""
+
+import asyncio
+import gzip
+
+import pytest
+
+from compression import CompressioneMiddleware
+
+def _app_json(corpi, etag=b'"fisso"', lunghezza=True):
+    """App ASGI che risponde con il prossimo body della lista, sempre con lo stesso ETag"""
+    async def app(scope, receive, send):
+        corpo = corpi.pop(0)
+        headers = [(b"content-type", b"application/json"), (b"etag", etag)]
+        if lunghezza:
+            headers.append((b"content-length", str(len(corpo)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else corpo})
+    return app
+
+def _chiama(app, metodo="GET", accept_encoding="gzip"):
+    messaggi = []
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    scope = {"type": "http", "method": metodo, "path": "/x", "headers": headers}
+
+    async def ricevi():
+        return {"type": "http.request", "body": b""}
+
+    async def invia(message):
+        messaggi.append(message)
+
+    asyncio.run(app(scope, ricevi, invia))
+    start = messaggi[0]
+    return dict(start["headers"]), b"".join(m.get("body", b"") for m in messaggi[1:])
+
+def test_cache_non_serve_body_diversi_con_stesso_etag():
+    corpi = [b'{"timestamp": "%d", "x": "%s"}' % (i, b"a" * 2000) for i in range(2)]
+    app = CompressioneMiddleware(_app_json(list(corpi)), soglia=100)
+    for corpo in corpi:
+        headers, body = _chiama(app)
+        assert headers[b"content-encoding"] == b"gzip"
+        assert headers[b"etag"] == b'"fisso-gzip"'
+        assert gzip.decompress(body) == corpo
+
+def test_cache_body_identici():
+    corpo = b'{"x": "%s"}' % (b"a" * 2000)
+    app = CompressioneMiddleware(_app_json([corpo, corpo]), soglia=100)
+    primo = _chiama(app)
+    assert _chiama(app) == primo
+    assert len(app._cache) == 1
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", None])
+def test_vary_sempre_presente(accept_encoding):
+    app = CompressioneMiddleware(_app_json([b"{}"]), soglia=100)
+    headers, _ = _chiama(app, accept_encoding=accept_encoding)
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert b"content-encoding" not in headers
+
+@pytest.mark.parametrize("soglia_thread", [1, 10**9])
+def test_head_come_get(soglia_thread):
+    corpo = b'{"x": "%s"}' % (b"a" * 5000)
+    app = CompressioneMiddleware(_app_json([corpo, corpo]), soglia=100, soglia_thread=soglia_thread)
+    get, body = _chiama(app, "GET")
+    head, _ = _chiama(app, "HEAD")
+    assert gzip.decompress(body) == corpo
+    for nome in (b"etag", b"vary", b"content-encoding"):
+        assert head[nome] == get[nome]
+
+def test_file_statico_head_come_get(client):
+    get = client.get("/download/postman-examples.json", headers={"Accept-Encoding": "gzip"})
+    head = client.head("/download/postman-examples.json", headers={"Accept-Encoding": "gzip"})
+    assert get.headers["content-encoding"] == "gzip"
+    for nome in ("etag", "vary", "content-encoding"):
+        assert head.headers[nome] == get.headers[nome]
@@ -0,0 +1,34 @@
+"""Export delle temperature: guidato dagli indici, a blocchi di righe esaminate"""
+
+import asyncio
+
+import pytest
+
+from models import temperature_db
+from seed import genera_temperature, popola
+from utils import blocchi_temperature, filtra_temperature
+
+@pytest.fixture
+def storico():
+    """Qualche migliaio di letture su 500 sensori e 8 posizioni"""
+    asyncio.run(popola(temperature_db, genera_temperature(5000, sensori=500)))
+
+@pytest.mark.parametrize("sensore, posizione", [
+    (None, None), ("SENSOR_0007", None), (None, "Aula"), ("SENSOR_000", "Palestra"), ("NESSUNO", None),
+])
+def test_come_scansione_completa(storico, sensore, posizione):
+    attese = [t.id for t in filtra_temperature(temperature_db.snapshot(), sensore, posizione)]
+    blocchi = list(blocchi_temperature(sensore, posizione, per_blocco=100))
+    assert [t.id for blocco in blocchi for t in blocco] == attese
+
+def test_blocchi_di_righe_esaminate(storico):
+    # Senza filtri ogni blocco esamina 1000 letture dello snapshot
+    assert len(list(blocchi_temperature(per_blocco=1000))) == -(-len(temperature_db) // 1000)
+    # Con un sensore si esaminano solo le sue letture (una ogni 500)
+    assert len(list(blocchi_temperature("SENSOR_0007", per_blocco=4))) == 3
+
+def test_export_csv_filtrato(client, storico):
+    risposta = client.get("/temperature/export", params={"formato": "csv", "sensore": "SENSOR_0007"})
+    righe = risposta.text.strip().splitlines()
+    assert righe[0].startswith("id,")
+    assert len(righe) == 1 + sum(1 for t in temperature_db.values() if t.sensore == "SENSOR_0007")
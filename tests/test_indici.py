@@ -0,0 +1,56 @@
+"""Indici secondari: stesso contenuto di un indice ricostruito dopo ogni scrittura"""
+
+import asyncio
+
+import pytest
+
+from indexes import Indice, IndiceValori
+from models import RecordTemperatura, temperature_db
+from utils import cerca_temperature, filtra_temperature
+
+def _lettura(id, sensore="SENSOR_01", posizione="Aula A"):
+    return RecordTemperatura.crea(id, 20.0, sensore, "2024-01-15T10:00:00", "C", posizione)
+
+def test_indice_valori_ordine_e_rimozioni():
+    indice = IndiceValori("sensore_id")
+    letture = [_lettura(id, f"S{id % 3}") for id in (5, 1, 9, 3, 7, 2)]
+    indice.ricostruisci(letture)
+    sensore = letture[0].sensore_id
+    assert indice.ids([sensore]) == [2, 5]
+    indice.rimuovi(letture[0])
+    indice.rimuovi(letture[0])
+    assert indice.ids([sensore]) == [2]
+    assert indice.conta({l.sensore_id for l in letture}) == 5
+    # Rimozione in blocco (un passaggio per valore)
+    indice.rimuovi_molti(letture[1:] * 10)
+    assert len(indice) == 0
+
+def test_indici_dopo_scritture_in_blocco(verifica_indici):
+    async def scrivi():
+        nuove = await temperature_db.inserisci_molti(
+            (lambda id, i=i: _lettura(id, f"SENSOR_{i % 4:02d}", f"Aula {i % 3}")) for i in range(100)
+        )
+        await temperature_db.aggiorna_molti(
+            (r.id, lambda vecchio: _lettura(vecchio.id, "SENSOR_99", "Palestra")) for r in nuove[::3]
+        )
+        await temperature_db.elimina_molti([r.id for r in nuove[::2]])
+
+    asyncio.run(scrivi())
+    verifica_indici(temperature_db)
+
+def test_indice_incompleto_non_istanziabile():
+    class SenzaSvuota(Indice):
+        def aggiungi(self, record):
+            pass
+
+        def rimuovi(self, record):
+            pass
+
+    with pytest.raises(TypeError):
+        SenzaSvuota()
+
+def test_cerca_temperature_senza_filtri():
+    assert cerca_temperature() == list(temperature_db.snapshot())
+    # Con i filtri l'ordine segue l'indice: si confrontano gli ID
+    trovate = sorted(t.id for t in cerca_temperature(posizione="Aula"))
+    assert trovate == [t.id for t in filtra_temperature(temperature_db.snapshot(), None, "Aula")]
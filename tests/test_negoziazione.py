@@ -0,0 +1,39 @@
+"""Content negotiation sull'header Accept (RFC 9110 §12.5.1)"""
+
+import pytest
+
+from negotiation import negozia_formato
+
+BROWSER = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+
+@pytest.mark.parametrize("accept, atteso", [
+    (None, "json"),
+    ("", "json"),
+    ("*/*", "json"),
+    (BROWSER, "html"),
+    ("application/json, text/html", "json"),
+    ("text/html;q=0.5, application/json;q=0.4", "html"),
+    # Stessa q: vince il media-range più specifico
+    ("text/*;q=0.8, application/json;q=0.8", "json"),
+    # I parametri del media-range non impediscono la corrispondenza
+    ("text/html;level=1", "html"),
+    ("application/json; version=2; q=0.9, text/html;q=0.1", "json"),
+    ("text/html; charset=utf-8", "html"),
+    # Header tutto malformato: come se mancasse
+    ("garbage", "json"),
+])
+def test_negozia_formato(accept, atteso):
+    assert negozia_formato(accept, ("json", "html")) == atteso
+
+@pytest.mark.parametrize("accept", ["application/xml", "text/html;q=0, application/json;q=0", "*/*;q=0"])
+def test_nessun_formato_accettabile(accept):
+    assert negozia_formato(accept, ("json", "html")) is None
+
+def test_endpoint_negoziati(client):
+    assert client.get("/prodotti/1", headers={"Accept": "application/json"}).headers["content-type"] == "application/json"
+    assert client.get("/prodotti/1", headers={"Accept": BROWSER}).headers["content-type"].startswith("text/html")
+    risposta = client.get("/prodotti/1", headers={"Accept": "application/xml"})
+    assert risposta.status_code == 406
+    export = client.get("/prodotti/export", headers={"Accept": "application/x-ndjson;q=1, text/csv;q=0.5"})
+    assert export.headers["content-type"].startswith("application/x-ndjson")
+    assert client.get("/prodotti/export", headers={"Accept": "application/json"}).status_code == 406
@@ -0,0 +1,78 @@
+"""PATCH di un prodotto: JSON, merge patch, JSON Patch e precondizioni If-Match"""
+
+import pytest
+
+from models import prodotti_db
+from patch import ErrorePatch, applica_json_patch, uguali_json
+
+MERGE = {"Content-Type": "application/merge-patch+json"}
+JSON_PATCH = {"Content-Type": "application/json-patch+json"}
+
+def test_patch_json_parziale(client, verifica_indici):
+    risposta = client.patch("/prodotti/1", json={"prezzo": 10})
+    assert risposta.status_code == 200
+    assert prodotti_db[1].prezzo == 10
+    assert risposta.headers["ETag"] == '"prodotto-1-r2"'
+    verifica_indici(prodotti_db)
+
+def test_merge_patch_null_rimuove(client):
+    risposta = client.patch("/prodotti/1", content='{"descrizione": null, "tags": ["nuovo"]}', headers=MERGE)
+    assert risposta.status_code == 200
+    assert prodotti_db[1].descrizione is None and prodotti_db[1].tags == ("nuovo",)
+
+def test_merge_patch_che_rende_invalido_il_prodotto(client):
+    risposta = client.patch("/prodotti/1", content='{"nome": null}', headers=MERGE)
+    assert risposta.status_code == 422
+    assert prodotti_db[1].nome == "Smartphone Pro"
+
+def test_json_patch_operazioni(client, verifica_indici):
+    operazioni = [
+        {"op": "test", "path": "/nome", "value": "Smartphone Pro"},
+        {"op": "add", "path": "/tags/-", "value": "offerta"},
+        {"op": "replace", "path": "/prezzo", "value": 799},
+        {"op": "copy", "from": "/nome", "path": "/descrizione"},
+    ]
+    risposta = client.patch("/prodotti/1", json=operazioni, headers=JSON_PATCH)
+    assert risposta.status_code == 200
+    assert prodotti_db[1].tags == ("mobile", "5g", "offerta")
+    assert prodotti_db[1].descrizione == "Smartphone Pro"
+    verifica_indici(prodotti_db)
+
+@pytest.mark.parametrize("operazioni, stato", [
+    ({"op": "add"}, 400),                                          # non è un array
+    ([{"op": "remove", "path": 5}], 400),                          # path non stringa
+    ([{"op": "move", "from": ["x"], "path": "/nome"}], 400),       # from non stringa
+    ([{"op": "add", "path": "nome", "value": 1}], 400),            # pointer senza /
+    ([{"op": "add", "path": "/nome"}], 400),                       # manca value
+    ([{"op": "incrementa", "path": "/prezzo"}], 400),              # op sconosciuta
+    ([{"op": "remove", "path": "/inesistente/x"}], 422),           # percorso inesistente
+    ([{"op": "replace", "path": "/tags/9", "value": "x"}], 422),   # indice fuori intervallo
+    ([{"op": "test", "path": "/disponibile", "value": 1}], 409),   # true non è 1
+    ([{"op": "remove", "path": "/nome"}], 422),                    # prodotto non valido
+])
+def test_json_patch_errori(client, operazioni, stato):
+    risposta = client.patch("/prodotti/1", json=operazioni, headers=JSON_PATCH)
+    assert risposta.status_code == stato
+    assert prodotti_db.revisione(1) == 1
+
+def test_json_patch_e_atomica():
+    documento = {"a": 1}
+    with pytest.raises(ErrorePatch):
+        applica_json_patch(documento, [{"op": "add", "path": "/b", "value": 2}, {"op": "remove", "path": "/c"}])
+    assert documento == {"a": 1}
+
+@pytest.mark.parametrize("a, b, uguali", [
+    (True, 1, False),
+    (1, 1.0, True),
+    (0, False, False),
+    (None, None, True),
+    ({"x": [1, True]}, {"x": [1, True]}, True),
+    ({"x": [1, True]}, {"x": [1, 1]}, False),
+    ("1", 1, False),
+])
+def test_uguaglianza_json(a, b, uguali):
+    assert uguali_json(a, b) is uguali
+
+def test_content_type_non_supportato(client):
+    risposta = client.patch("/prodotti/1", content="{}", headers={"Content-Type": "text/plain"})
+    assert risposta.status_code == 415
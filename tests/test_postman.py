@@ -0,0 +1,33 @@
+"""Collezione Postman generata: body di esempio degli endpoint bulk, generazione unica"""
+
+import json
+
+from postman import CollezioneGenerata
+
+def _richieste(collezione: dict) -> dict:
+    return {
+        (voce["request"]["method"], "/" + "/".join(voce["request"]["url"]["path"])): voce["request"]
+        for cartella in collezione["item"] for voce in cartella["item"]
+    }
+
+def test_body_bulk_sono_array(client):
+    richieste = _richieste(client.get("/postman-collection").json())
+    for metodo in ("POST", "PATCH", "DELETE"):
+        corpo = json.loads(richieste[(metodo, "/prodotti/bulk")]["body"]["raw"])
+        assert isinstance(corpo, list) and len(corpo) == 1
+        assert isinstance(corpo[0], dict)
+    assert "id" in json.loads(richieste[("PATCH", "/prodotti/bulk")]["body"]["raw"])[0]
+    assert "id" not in json.loads(richieste[("POST", "/prodotti")]["body"]["raw"])
+
+def test_esempi_bulk_accettati(client):
+    richieste = _richieste(client.get("/postman-collection").json())
+    for metodo in ("POST", "PATCH"):
+        corpo = json.loads(richieste[(metodo, "/prodotti/bulk")]["body"]["raw"])
+        risposta = client.request(metodo, "/prodotti/bulk", json=corpo)
+        assert risposta.status_code < 400, risposta.text
+
+def test_generata_una_volta(app, monkeypatch):
+    sorgente = CollezioneGenerata(app)
+    prima = sorgente.corrente()
+    monkeypatch.setattr("postman.genera_collezione", lambda app: (_ for _ in ()).throw(AssertionError))
+    assert sorgente.corrente() is prima
@@ -0,0 +1,53 @@
+"""ETag dei prodotti: richieste condizionali If-None-Match (GET) e If-Match (PATCH)"""
+
+from utils import etag_corrisponde, etag_corrisponde_forte
+
+def test_if_none_match_304(client):
+    risposta = client.get("/prodotti/1")
+    etag = risposta.headers["ETag"]
+    assert client.get("/prodotti/1", headers={"If-None-Match": etag}).status_code == 304
+    # Confronto debole: anche la versione W/ corrisponde
+    assert client.get("/prodotti/1", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/prodotti/1", headers={"If-None-Match": '"altro"'}).status_code == 200
+
+def test_etag_cambia_dopo_modifica(client):
+    etag = client.get("/prodotti/1").headers["ETag"]
+    client.patch("/prodotti/1", json={"prezzo": 5})
+    assert client.get("/prodotti/1", headers={"If-None-Match": etag}).status_code == 200
+
+def test_if_match(client):
+    etag = client.get("/prodotti/1").headers["ETag"]
+    assert client.patch("/prodotti/1", json={"prezzo": 5}, headers={"If-Match": etag}).status_code == 200
+    # Stesso ETag dopo la modifica: 412
+    assert client.patch("/prodotti/1", json={"prezzo": 6}, headers={"If-Match": etag}).status_code == 412
+    assert client.patch("/prodotti/1", json={"prezzo": 6}, headers={"If-Match": "*"}).status_code == 200
+
+def test_if_match_rifiuta_etag_deboli(client):
+    etag = client.get("/prodotti/1").headers["ETag"]
+    risposta = client.patch("/prodotti/1", json={"prezzo": 5}, headers={"If-Match": f"W/{etag}"})
+    assert risposta.status_code == 412
+
+def test_confronti():
+    assert etag_corrisponde('W/"a", "b"', '"a"')
+    assert etag_corrisponde("*", '"a"')
+    assert not etag_corrisponde(None, '"a"')
+    assert etag_corrisponde_forte('"x", "a"', '"a"')
+    assert not etag_corrisponde_forte('W/"a"', '"a"')
+    assert not etag_corrisponde_forte('"a"', 'W/"a"')
+
+def test_if_match_con_etag_della_variante_gzip(client):
+    # Prodotto con JSON oltre la soglia di compressione
+    client.patch("/prodotti/1", json={"descrizione": "x" * 450, "tags": [f"tag{i}" for i in range(80)]})
+    risposta = client.get("/prodotti/1", headers={"Accept-Encoding": "gzip"})
+    assert risposta.headers["Content-Encoding"] == "gzip"
+    etag = risposta.headers["ETag"]
+    assert not etag.startswith("W/") and etag.endswith('-gzip"')
+    assert client.get("/prodotti/1", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status_code == 304
+    assert client.patch("/prodotti/1", json={"prezzo": 5}, headers={"If-Match": etag}).status_code == 200
+    assert client.patch("/prodotti/1", json={"prezzo": 6}, headers={"If-Match": etag}).status_code == 412
+
+def test_confronti_varianti_compresse():
+    assert etag_corrisponde('"a-gzip"', '"a"')
+    assert etag_corrisponde_forte('"a-br"', '"a"')
+    assert not etag_corrisponde_forte('W/"a-gzip"', '"a"')
+    assert not etag_corrisponde_forte('"b-gzip"', '"a"')
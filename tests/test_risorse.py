@@ -0,0 +1,56 @@
+"""Catalogo delle risorse: ETag e body dalla stessa versione, timestamp sempre attuale"""
+
+import asyncio
+import json
+import os
+
+from resources import CatalogoRisorse
+from utils import crea_risposta, scansiona_cartella_download
+
+def test_json_come_crea_risposta():
+    catalogo = asyncio.run(CatalogoRisorse("download").corrente())
+    atteso = crea_risposta(True, f"Trovate {len(catalogo.risorse)} risorse del corso",
+                           scansiona_cartella_download("download"), "/risorse").model_dump(mode="json")
+    risposta = json.loads(catalogo.json())
+    assert risposta.keys() == atteso.keys()
+    assert {**risposta, "timestamp": None} == {**atteso, "timestamp": None}
+
+def test_timestamp_non_congelato(client):
+    prima = client.get("/risorse", headers={"Accept": "application/json"})
+    dopo = client.get("/risorse", headers={"Accept": "application/json"})
+    assert prima.headers["ETag"] == dopo.headers["ETag"]
+    assert prima.json()["timestamp"] != dopo.json()["timestamp"]
+    revalidata = client.get("/risorse", headers={"Accept": "application/json", "If-None-Match": prima.headers["ETag"]})
+    assert revalidata.status_code == 304
+
+def test_file_riscritto_cambia_versione(tmp_path):
+    percorso = tmp_path / "lezione.md"
+    percorso.write_bytes(b"uno")
+    catalogo = CatalogoRisorse(str(tmp_path), intervallo_controllo=0, intervallo_scansione=0)
+    prima = asyncio.run(catalogo.corrente())
+    assert asyncio.run(catalogo.corrente()) is prima
+
+    # Stessa cartella (nessun file aggiunto o rimosso), contenuto e mtime diversi
+    percorso.write_bytes(b"uno due tre")
+    os.utime(percorso, ns=(1, 1))
+    dopo = asyncio.run(catalogo.corrente())
+    assert dopo is not prima
+    assert dopo.etag("html") != prima.etag("html")
+    assert dopo.risorse[0].dimensione != prima.risorse[0].dimensione
+
+def test_firma_completa_solo_se_cambia_la_cartella(tmp_path, monkeypatch):
+    (tmp_path / "lezione.md").write_bytes(b"uno")
+    catalogo = CatalogoRisorse(str(tmp_path), intervallo_controllo=0)
+    prima = asyncio.run(catalogo.corrente())
+
+    # mtime della cartella invariato: nessuno stat dei singoli file
+    firma = catalogo._firma_cartella
+    monkeypatch.setattr(catalogo, "_firma_cartella", lambda: (_ for _ in ()).throw(AssertionError))
+    assert asyncio.run(catalogo.corrente()) is prima
+
+    # File aggiunto: cambia l'mtime della cartella e si riscansiona
+    monkeypatch.setattr(catalogo, "_firma_cartella", firma)
+    (tmp_path / "esercizi.pdf").write_bytes(b"due")
+    os.utime(tmp_path, ns=(1, 1))
+    dopo = asyncio.run(catalogo.corrente())
+    assert len(dopo.risorse) == 2 and dopo.etag("html") != prima.etag("html")
@@ -0,0 +1,62 @@
+"""Snapshot OpenAPI: usato solo se corrisponde ancora alle rotte registrate"""
+
+import json
+
+from fastapi import FastAPI, Query
+
+from app import create_app
+from schema_openapi import CAMPO_FIRMA, SchemaOpenAPI, firma_rotte, salva_snapshot
+
+def test_snapshot_aggiornato(tmp_path):
+    percorso = tmp_path / "openapi.json"
+    salva_snapshot(str(percorso))
+    app = create_app()
+    schema = SchemaOpenAPI(app, str(percorso))
+    assert schema.prepara() == percorso.read_bytes()
+    assert app.openapi_schema["info"][CAMPO_FIRMA] == firma_rotte(app)
+
+def test_snapshot_vecchio_rigenerato(tmp_path):
+    percorso = tmp_path / "openapi.json"
+    salva_snapshot(str(percorso))
+    app = create_app()
+
+    @app.get("/nuova-rotta")
+    async def nuova_rotta():
+        return {}
+
+    contenuto = SchemaOpenAPI(app, str(percorso)).prepara()
+    assert contenuto != percorso.read_bytes()
+    assert "/nuova-rotta" in json.loads(contenuto)["paths"]
+
+def _app_con_elenco(parametro: bool, descrizione: str):
+    """App minima: stessa rotta e stessi modelli, cambiano solo parametri e docstring"""
+    async def con_ordina(ordina: str = Query("id", description="Campo di ordinamento")):
+        return {}
+
+    async def senza_parametri():
+        return {}
+
+    elenco = con_ordina if parametro else senza_parametri
+    elenco.__doc__ = descrizione
+    app = FastAPI()
+    app.get("/elenco")(elenco)
+    return app
+
+def test_firma_cambia_con_parametri_e_testi():
+    base = firma_rotte(_app_con_elenco(False, "Elenco"))
+    assert firma_rotte(_app_con_elenco(False, "Elenco")) == base
+    assert firma_rotte(_app_con_elenco(True, "Elenco")) != base
+    assert firma_rotte(_app_con_elenco(False, "Elenco completo")) != base
+
+def test_nuovo_query_parameter_rende_vecchio_lo_snapshot(tmp_path):
+    percorso = tmp_path / "openapi.json"
+    vecchia = _app_con_elenco(False, "Elenco")
+    SchemaOpenAPI(vecchia).prepara()
+    schema = vecchia.openapi()
+    schema["info"][CAMPO_FIRMA] = firma_rotte(vecchia)
+    percorso.write_text(json.dumps(schema))
+
+    nuova = _app_con_elenco(True, "Elenco")
+    contenuto = SchemaOpenAPI(nuova, str(percorso)).prepara()
+    parametri = json.loads(contenuto)["paths"]["/elenco"]["get"]["parameters"]
+    assert [p["name"] for p in parametri] == ["ordina"]
@@ -0,0 +1,90 @@
+"""Download dei file: Range singoli e multipli, If-Range, HEAD, file accorciati"""
+
+import asyncio
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from static_files import FileDownload, analizza_range
+
+CONTENUTO = bytes(range(256)) * 4
+
+@pytest.fixture
+def download(tmp_path):
+    (tmp_path / "dati.bin").write_bytes(CONTENUTO)
+    app = Starlette(routes=[Mount("/f", app=FileDownload(str(tmp_path)))])
+    with TestClient(app) as client:
+        yield client
+
+def test_file_completo_e_head(download):
+    risposta = download.get("/f/dati.bin")
+    assert risposta.status_code == 200
+    assert risposta.content == CONTENUTO
+    assert risposta.headers["accept-ranges"] == "bytes"
+    head = download.head("/f/dati.bin")
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(CONTENUTO))
+    assert head.headers["etag"] == risposta.headers["etag"]
+
+def test_range_singolo(download):
+    risposta = download.get("/f/dati.bin", headers={"Range": "bytes=10-19"})
+    assert risposta.status_code == 206
+    assert risposta.content == CONTENUTO[10:20]
+    assert risposta.headers["content-range"] == f"bytes 10-19/{len(CONTENUTO)}"
+    # Suffisso: ultimi 5 byte
+    assert download.get("/f/dati.bin", headers={"Range": "bytes=-5"}).content == CONTENUTO[-5:]
+
+def test_range_multipli(download):
+    risposta = download.get("/f/dati.bin", headers={"Range": "bytes=0-3, 100-104"})
+    assert risposta.status_code == 206
+    boundary = re.search(r"boundary=(\w+)", risposta.headers["content-type"]).group(1)
+    assert int(risposta.headers["content-length"]) == len(risposta.content)
+    parti = risposta.content.split(f"--{boundary}".encode())
+    assert parti[0] == b"" and parti[-1] == b"--\r\n"
+    corpi = [parte.split(b"\r\n\r\n", 1)[1].removesuffix(b"\r\n") for parte in parti[1:-1]]
+    assert corpi == [CONTENUTO[0:4], CONTENUTO[100:105]]
+    assert b"Content-Range: bytes 100-104/1024" in parti[2]
+
+def test_range_non_soddisfacibile(download):
+    risposta = download.get("/f/dati.bin", headers={"Range": "bytes=5000-"})
+    assert risposta.status_code == 416
+    assert risposta.headers["content-range"] == f"bytes */{len(CONTENUTO)}"
+
+def test_if_range(download):
+    etag = download.get("/f/dati.bin").headers["etag"]
+    assert download.get("/f/dati.bin", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    # Validatore vecchio: il Range viene ignorato e arriva il file intero
+    risposta = download.get("/f/dati.bin", headers={"Range": "bytes=0-9", "If-Range": '"vecchio"'})
+    assert risposta.status_code == 200
+    assert risposta.content == CONTENUTO
+
+def test_analizza_range():
+    assert analizza_range("bytes=0-0,-1", 10) == [(0, 0), (9, 9)]
+    assert analizza_range("bytes=5-2", 10) is None
+    assert analizza_range("righe=0-1", 10) is None
+    assert analizza_range("bytes=20-30", 10) == []
+    assert analizza_range("bytes=20-", 10) == []
+    assert analizza_range("bytes=4-", 10) == [(4, 9)]
+
+def test_file_accorciato_chiude_la_risposta(tmp_path):
+    percorso = tmp_path / "corto.bin"
+    percorso.write_bytes(b"x" * 10)
+    messaggi = []
+
+    async def invia(message):
+        messaggi.append(message)
+
+    # Lo stat diceva 100 byte, sul disco ne restano 10
+    asyncio.run(FileDownload(str(tmp_path))._invia_file(invia, {}, str(percorso), [(0, 99)], [], b""))
+    assert b"".join(m["body"] for m in messaggi) == b"x" * 10
+    assert messaggi[-1]["more_body"] is False
+
+def test_compressione_toglie_accept_ranges(client):
+    compressa = client.get("/download/postman-examples.json", headers={"Accept-Encoding": "gzip"})
+    assert compressa.headers["content-encoding"] == "gzip"
+    assert "accept-ranges" not in compressa.headers
+    identita = client.get("/download/postman-examples.json", headers={"Accept-Encoding": "identity"})
+    assert identita.headers["accept-ranges"] == "bytes"
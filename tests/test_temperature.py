@@ -0,0 +1,49 @@
+"""Letture per sensore: stessa risposta nel loop e nel pool dell'esecutore"""
+
+import asyncio
+
+import pytest
+
+from models import indice_letture_recenti, temperature_db
+
+def _letture(client, nome):
+    risposta = client.get(f"/temperature/sensore/{nome}")
+    assert risposta.status_code == 200
+    return risposta.json()["data"]
+
+@pytest.mark.parametrize("soglia", [1000, 1])
+def test_letture_sensore(app, client, monkeypatch, soglia):
+    monkeypatch.setattr(app.state.esecutore, "soglia", soglia)
+    data = _letture(client, "SENSOR_01")
+    assert [t["timestamp"] for t in data["letture"]] == ["2024-01-15T10:32:00", "2024-01-15T10:30:00"]
+    assert {t["posizione"] for t in data["letture"]} == {"Aula A"}
+    assert data["statistiche"]["numero_letture"] == 2
+    assert data["statistiche"]["temperatura_media"] == 23.3
+    assert data["statistiche"]["ultima_lettura"] == "2024-01-15T10:32:00"
+
+def test_sensore_sconosciuto(client):
+    assert client.get("/temperature/sensore/NESSUNO").status_code == 404
+
+def _attese(limite=10):
+    """Ultime letture e media calcolate scorrendo tutta la collezione"""
+    letture = sorted(temperature_db.values(), key=lambda t: (t.timestamp or "", t.id), reverse=True)
+    valori = [t.valore for t in temperature_db.values()]
+    return [t.id for t in letture[:limite]], round(sum(valori) / len(valori), 2)
+
+def test_lista_da_indici(client, verifica_indici):
+    for valore in (30.0, 10.5, 25.25):
+        assert client.post("/temperature", json={"valore": valore, "sensore": "SENSOR_09"}).status_code == 201
+
+    async def modifica():
+        recenti = indice_letture_recenti.ultimi(2)
+        await temperature_db.elimina(recenti[0])
+        await temperature_db.aggiorna(recenti[1], lambda t: t._replace(valore=-5.0, timestamp="2020-01-01T00:00:00"))
+
+    asyncio.run(modifica())
+    verifica_indici(temperature_db)
+    for limite in (1, 3, 10):
+        data = client.get("/temperature", params={"limite": limite}).json()["data"]
+        ids, media = _attese(limite)
+        assert [t["id"] for t in data["temperature"]] == ids
+        assert data["statistiche"]["temperatura_media"] == media
+        assert data["statistiche"]["totale_letture"] == len(temperature_db)
@@ -2,12 +2,18 @@
 UTILS - Funzioni di utilità e helper
 """
 
+import heapq
 import os
-import json
 from datetime import datetime
-from typing import List
-from fastapi import HTTPException
-from models import RispostaHTTP, Prodotto, RisorsaCorso
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
+from models import (
+    RispostaHTTP, Temperatura, RecordProdotto, RecordTemperatura, RisorsaCorso,
+    sensori, posizioni, indice_sensori, indice_posizioni,
+    indice_categorie, indice_tag, indice_disponibili, indice_prezzi, indice_nomi,
+    prodotti_db, temperature_db
+)
+from negotiation import scegli_formato
 
 # Contatori per statistiche
 contatori = {
@@ -28,43 +34,232 @@ def crea_risposta(success: bool, message: str, data: any = None, endpoint: str =
 def preferisce_html(accept_header: str = None) -> bool:
     """
     Determina se il client preferisce HTML basandosi sull'header Accept
-    Content Negotiation secondo RFC 7231
+    Content Negotiation secondo RFC 9110 (vedi negotiation.negozia_formato):
+    406 se il client non accetta né JSON né HTML
     """
-    if not accept_header:
-        return False
-    
-    accept_lower = accept_header.lower()
-    
-    # Se richiede esplicitamente HTML
-    if 'text/html' in accept_lower:
-        # Controlla se HTML ha priorità più alta di JSON
-        html_priority = 1.0
-        json_priority = 0.0
-        
-        # Parsing semplificato delle priorità q-values
-        if 'text/html' in accept_lower:
-            # Estrae q-value per HTML se presente
-            html_part = accept_lower.split('text/html')[1].split(',')[0]
-            if 'q=' in html_part:
-                try:
-                    html_priority = float(html_part.split('q=')[1].split(';')[0].split(',')[0])
-                except:
-                    html_priority = 1.0
-        
-        if 'application/json' in accept_lower:
-            # Estrae q-value per JSON se presente  
-            json_part = accept_lower.split('application/json')[1].split(',')[0]
-            if 'q=' in json_part:
-                try:
-                    json_priority = float(json_part.split('q=')[1].split(';')[0].split(',')[0])
-                except:
-                    json_priority = 1.0
-        
-        return html_priority >= json_priority
-    
-    return False
+    return scegli_formato(accept_header, ("json", "html")) == "html"
+
+def filtra_prodotti(
+    prodotti: Iterable[RecordProdotto],
+    categoria: Optional[str] = None,
+    disponibile: Optional[bool] = None,
+    prezzo_min: Optional[float] = None,
+    prezzo_max: Optional[float] = None,
+    tags: Optional[Sequence[str]] = None,
+    tutti_i_tag: bool = False
+) -> Iterator[RecordProdotto]:
+    """Applica i filtri di /prodotti in modo lazy (generatore)"""
+    categoria = categoria.casefold() if categoria else None
+    tags = {t.casefold() for t in tags} if tags else None
+    for p in prodotti:
+        if categoria and p.categoria.casefold() != categoria:
+            continue
+        if disponibile is not None and p.disponibile != disponibile:
+            continue
+        if prezzo_min is not None and p.prezzo < prezzo_min:
+            continue
+        if prezzo_max is not None and p.prezzo > prezzo_max:
+            continue
+        if tags:
+            tag_prodotto = {t.casefold() for t in p.tags or ()}
+            if not (tags <= tag_prodotto if tutti_i_tag else tags & tag_prodotto):
+                continue
+        yield p
+
+def ids_prodotti(
+    categoria: Optional[str] = None,
+    disponibile: Optional[bool] = None,
+    tags: Optional[Sequence[str]] = None,
+    tutti_i_tag: bool = False,
+    prezzo_min: Optional[float] = None,
+    prezzo_max: Optional[float] = None
+) -> Optional[Set[int]]:
+    """
+    ID dei prodotti che soddisfano i filtri (intersezione dei posting set
+    e dell'intervallo di prezzo, trovato con bisect sull'indice ordinato)
+    None se non c'è nessun filtro, cioè tutto il catalogo
+    """
+    insiemi = []
+    if categoria:
+        insiemi.append(indice_categorie.ids(categoria))
+    if disponibile is not None:
+        insiemi.append(indice_disponibili.ids(disponibile))
+    if tags:
+        insiemi.append(indice_tag.ids_tutti(tags) if tutti_i_tag else indice_tag.ids_qualsiasi(tags))
+    if prezzo_min is not None or prezzo_max is not None:
+        insiemi.append(indice_prezzi.ids_intervallo(prezzo_min, prezzo_max))
+    if not insiemi:
+        return None
+    insiemi.sort(key=len)
+    return set(insiemi[0]).intersection(*insiemi[1:])
+
+# Campo di ordinamento → (indice ordinato, chiave equivalente per le righe)
+ORDINAMENTI_PRODOTTI = {
+    "prezzo": (indice_prezzi, lambda p: (p.prezzo, p.id)),
+    "nome": (indice_nomi, lambda p: (p.nome.casefold(), p.id)),
+}
+
+def pagina_prodotti(ids: Optional[Set[int]], ordina: str, inizio: int, limite: int) -> List[RecordProdotto]:
+    """
+    Una pagina di prodotti ordinati ('prezzo', '-prezzo', 'nome', '-nome', 'id', '-id')
+    Senza filtri legge direttamente dall'indice ordinato; con i filtri seleziona
+    solo i primi inizio+limite risultati (top-k) invece di ordinarli tutti
+    """
+    decrescente = ordina.startswith("-")
+    campo = ordina.lstrip("-")
+    fine = inizio + limite
+
+    if ids is None:
+        if campo == "id":
+            righe = prodotti_db.snapshot()
+            if decrescente:
+                return list(reversed(righe[max(len(righe) - fine, 0):max(len(righe) - inizio, 0)]))
+            return list(righe[inizio:fine])
+        indice, _ = ORDINAMENTI_PRODOTTI[campo]
+        return [prodotti_db[id] for id in indice.pagina(inizio, limite, decrescente)]
+
+    seleziona = heapq.nlargest if decrescente else heapq.nsmallest
+    if campo == "id":
+        # Gli ID crescono con l'inserimento: l'ordine per ID è quello del catalogo
+        return [prodotti_db[id] for id in seleziona(fine, ids)[inizio:]]
+    _, chiave = ORDINAMENTI_PRODOTTI[campo]
+    return seleziona(fine, (prodotti_db[id] for id in ids), key=chiave)[inizio:]
+
+def facette_prodotti(ids: Optional[Set[int]] = None) -> Dict[str, Dict]:
+    """Conteggi per categoria, tag e disponibilità dei prodotti indicati (None = tutti)"""
+    disponibili = indice_disponibili.conteggi(ids)
+    return {
+        "categoria": indice_categorie.conteggi(ids),
+        "tag": indice_tag.conteggi(ids),
+        "disponibile": {"true": disponibili.get(True, 0), "false": disponibili.get(False, 0)},
+    }
+
+def filtra_temperature(
+    temperature: Iterable[RecordTemperatura],
+    sensore: Optional[str] = None,
+    posizione: Optional[str] = None
+) -> Iterator[RecordTemperatura]:
+    """
+    Applica i filtri di /temperature in modo lazy (generatore)
+    I nomi vengono risolti una volta in ID di simboli: per riga c'è solo un test su interi
+    """
+    ids_sensore = sensori.cerca(sensore) if sensore else None
+    ids_posizione = posizioni.contenenti(posizione) if posizione else None
+    return filtra_temperature_per_id(temperature, ids_sensore, ids_posizione)
 
-def genera_html_prodotti(prodotti: List[Prodotto], titolo: str = "Lista Prodotti") -> str:
+def filtra_temperature_per_id(
+    temperature: Iterable[RecordTemperatura],
+    ids_sensore: Optional[Set[int]],
+    ids_posizione: Optional[Set[int]]
+) -> Iterator[RecordTemperatura]:
+    """Come filtra_temperature, con i nomi già risolti in ID di simboli (None = nessun filtro)"""
+    if ids_sensore is not None and not ids_sensore or ids_posizione is not None and not ids_posizione:
+        return
+    for t in temperature:
+        if ids_sensore is not None and t.sensore_id not in ids_sensore:
+            continue
+        if ids_posizione is not None and t.posizione_id not in ids_posizione:
+            continue
+        yield t
+
+def cerca_temperature(sensore: Optional[str] = None, posizione: Optional[str] = None) -> List[RecordTemperatura]:
+    """
+    Letture filtrate tramite gli indici per sensore e posizione
+    (stessi criteri di filtra_temperature, senza scorrere tutte le letture).
+    Senza filtri: tutte le letture, in ordine di ID
+    """
+    ids_sensore = sensori.cerca(sensore) if sensore else None
+    ids_posizione = posizioni.contenenti(posizione) if posizione else None
+
+    if ids_sensore is None and ids_posizione is None:
+        return list(temperature_db.snapshot())
+    if ids_posizione is None:
+        return [temperature_db[id] for id in indice_sensori.ids(ids_sensore)]
+    if ids_sensore is None:
+        return [temperature_db[id] for id in indice_posizioni.ids(ids_posizione)]
+
+    # Entrambi i filtri: si parte dall'indice con meno righe e si verifica l'altro campo
+    if indice_sensori.conta(ids_sensore) <= indice_posizioni.conta(ids_posizione):
+        righe = (temperature_db[id] for id in indice_sensori.ids(ids_sensore))
+        return [t for t in righe if t.posizione_id in ids_posizione]
+    righe = (temperature_db[id] for id in indice_posizioni.ids(ids_posizione))
+    return [t for t in righe if t.sensore_id in ids_sensore]
+
+def blocchi_temperature(
+    sensore: Optional[str] = None,
+    posizione: Optional[str] = None,
+    per_blocco: int = 1000
+) -> Iterator[List[RecordTemperatura]]:
+    """
+    Letture filtrate in ordine di ID, a blocchi: ogni blocco viene da al più
+    `per_blocco` letture esaminate (anche vuoto), così chi lo consuma può
+    cedere l'event loop tra un blocco e l'altro anche con filtri molto selettivi.
+    ID e snapshot vengono presi subito: le scritture successive non entrano nell'export
+    """
+    ids_sensore = sensori.cerca(sensore) if sensore else None
+    ids_posizione = posizioni.contenenti(posizione) if posizione else None
+    if ids_sensore is None and ids_posizione is None:
+        letture = iter(temperature_db.snapshot())
+    else:
+        if ids_posizione is None or ids_sensore is not None \
+                and indice_sensori.conta(ids_sensore) <= indice_posizioni.conta(ids_posizione):
+            ids = indice_sensori.ids_ordinati(ids_sensore)
+        else:
+            ids = indice_posizioni.ids_ordinati(ids_posizione)
+        # Le letture eliminate durante l'export vengono saltate
+        letture = (t for t in map(temperature_db.get, ids) if t is not None)
+    return _blocchi_filtrati(letture, ids_sensore, ids_posizione, per_blocco)
+
+def _blocchi_filtrati(
+    letture: Iterator[RecordTemperatura],
+    ids_sensore: Optional[Set[int]],
+    ids_posizione: Optional[Set[int]],
+    per_blocco: int
+) -> Iterator[List[RecordTemperatura]]:
+    while True:
+        blocco = list(islice(letture, per_blocco))
+        if not blocco:
+            return
+        yield list(filtra_temperature_per_id(blocco, ids_sensore, ids_posizione))
+
+def json_letture_sensore(
+    nome_sensore: str,
+    nome_registrato: str,
+    letture: List[RecordTemperatura],
+    nomi_posizioni: Dict[Optional[int], Optional[str]]
+) -> bytes:
+    """
+    Risposta JSON completa di /temperature/sensore/{nome} (tutte le letture)
+    Non usa le tabelle di simboli: i nomi arrivano già risolti, così la
+    funzione può girare anche in un processo del pool (vedi executor.py)
+    """
+    letture = sorted(letture, key=lambda t: t.timestamp or "", reverse=True)
+    valori = [t.valore for t in letture]
+    risposta = crea_risposta(
+        success=True,
+        message=f"Letture del sensore {nome_sensore}",
+        data={
+            "sensore": nome_sensore,
+            "letture": [
+                Temperatura.model_construct(
+                    id=t.id, valore=t.valore, sensore=nome_registrato, timestamp=t.timestamp,
+                    unita=t.unita, posizione=nomi_posizioni[t.posizione_id]
+                )
+                for t in letture
+            ],
+            "statistiche": {
+                "numero_letture": len(letture),
+                "temperatura_minima": min(valori),
+                "temperatura_massima": max(valori),
+                "temperatura_media": round(sum(valori) / len(valori), 2),
+                "ultima_lettura": letture[0].timestamp
+            }
+        },
+        endpoint=f"/temperature/sensore/{nome_sensore}"
+    )
+    return risposta.__pydantic_serializer__.to_json(risposta)
+
+def genera_html_prodotti(prodotti: Sequence[RecordProdotto], titolo: str = "Lista Prodotti") -> str:
     """Genera HTML per visualizzare lista prodotti"""
     html = f"""
     <!DOCTYPE html>
@@ -138,7 +333,7 @@ def genera_html_prodotti(prodotti: List[Prodotto], titolo: str = "Lista Prodotti
     """
     return html
 
-def genera_html_singolo_prodotto(prodotto: Prodotto) -> str:
+def genera_html_singolo_prodotto(prodotto: RecordProdotto) -> str:
     """Genera HTML per singolo prodotto"""
     disponibilita = "Disponibile" if prodotto.disponibile else "Non disponibile"
     disponibilita_class = "available" if prodotto.disponibile else "unavailable"
@@ -315,61 +510,154 @@ def genera_html_homepage() -> str:
     </html>
     """
 
-def leggi_collezione_postman() -> str:
-    """Legge la collezione Postman da file"""
-    filename = "postman_collection.json"
-    
-    try:
-        if not os.path.exists(filename):
-            raise HTTPException(
-                status_code=404, 
-                detail=f"File collezione Postman '{filename}' non trovato"
-            )
-        
-        with open(filename, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Verifica che sia JSON valido
-        try:
-            json.loads(content)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Il file '{filename}' contiene JSON non valido: {str(e)}"
-            )
-        
-        return content
-        
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=404,
-            detail=f"File '{filename}' non trovato"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Errore durante la lettura del file: {str(e)}"
-        )
-
-def scansiona_cartella_download() -> List[RisorsaCorso]:
+def genera_html_risorse(risorse: List[RisorsaCorso]) -> str:
+    """Genera HTML per la pagina delle risorse del corso"""
+    html_content = f"""
+    <!DOCTYPE html>
+    <html lang="it">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Risorse del Corso - HTTP Explorer</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
+            .container {{ background: white; padding: 30px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); max-width: 900px; margin: 0 auto; }}
+            h1 {{ color: #2c3e50; text-align: center; border-bottom: 3px solid #3498db; padding-bottom: 15px; }}
+            .intro {{ background: #e8f4fd; border-left: 4px solid #3498db; padding: 20px; margin: 20px 0; border-radius: 5px; }}
+            .resources-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; margin-top: 30px; }}
+            .resource-card {{ background: #f8f9fa; border: 1px solid #dee2e6; border-radius: 8px; padding: 20px; transition: transform 0.2s; }}
+            .resource-card:hover {{ transform: translateY(-2px); box-shadow: 0 4px 8px rgba(0,0,0,0.1); }}
+            .resource-type {{ display: inline-block; background: #6c757d; color: white; padding: 4px 8px; border-radius: 4px; font-size: 0.8em; margin-bottom: 10px; }}
+            .resource-type.pdf {{ background: #dc3545; }}
+            .resource-type.txt {{ background: #28a745; }}
+            .resource-type.zip {{ background: #ffc107; color: #212529; }}
+            .resource-type.json {{ background: #17a2b8; }}
+            .download-btn {{ display: inline-block; background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; margin-top: 10px; }}
+            .download-btn:hover {{ background: #0056b3; }}
+            .no-resources {{ text-align: center; color: #6c757d; font-style: italic; padding: 40px; }}
+            .back-link {{ text-align: center; margin-top: 30px; }}
+            .btn {{ display: inline-block; padding: 10px 20px; margin: 5px; background: #6c757d; color: white; text-decoration: none; border-radius: 5px; }}
+            .btn:hover {{ background: #545b62; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>Risorse del Corso</h1>
+
+            <div class="intro">
+                <h3>Materiali Didattici</h3>
+                <p>In questa sezione trovi tutti i materiali del corso "Didattica per il laboratorio di telecomunicazioni" che puoi scaricare e utilizzare per le tue lezioni.</p>
+                <p><strong>Suggerimento:</strong> Fai clic destro sui link di download e seleziona "Salva link con nome" per scaricare i file.</p>
+            </div>
+    """
+
+    if not risorse:
+        html_content += """
+            <div class="no-resources">
+                <h3>Nessuna risorsa disponibile</h3>
+                <p>Al momento non ci sono risorse nella cartella download.</p>
+                <p>Il docente può aggiungere file nella cartella 'download' del progetto.</p>
+            </div>
+        """
+    else:
+        schede = []
+        for risorsa in risorse:
+            schede.append(f"""
+            <div class="resource-card">
+                <span class="resource-type {risorsa.tipo}">{risorsa.tipo.upper()}</span>
+                <h3>{risorsa.nome}</h3>
+                <p>{risorsa.descrizione}</p>
+                <p><strong>Dimensione:</strong> {risorsa.dimensione}</p>
+                <a href="{risorsa.url_download}" class="download-btn" download>Scarica</a>
+            </div>
+            """)
+        html_content += '<div class="resources-grid">' + "".join(schede) + '</div>'
+
+    html_content += """
+            <div class="back-link">
+                <a href="/" class="btn">Torna alla Homepage</a>
+                <a href="/docs" class="btn">Documentazione API</a>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return html_content
+
+# Codifiche che il middleware di compressione aggiunge come suffisso agli ETag
+CODIFICHE_ETAG = ("gzip", "br", "zstd")
+
+def etag_con_codifica(etag: str, codifica: str) -> str:
+    """ETag della variante compressa: "x" -> "x-gzip" (resta forte, ma distinto)"""
+    return f'{etag[:-1]}-{codifica}"' if etag.endswith('"') else etag
+
+def etag_senza_codifica(etag: str) -> str:
+    """ETag della rappresentazione originale: "x-gzip" -> "x" """
+    for codifica in CODIFICHE_ETAG:
+        suffisso = f'-{codifica}"'
+        if etag.endswith(suffisso):
+            return etag[:-len(suffisso)] + '"'
+    return etag
+
+def etag_corrisponde(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Confronta l'header If-None-Match con l'ETag corrente
+    Usa il confronto debole (RFC 9110 §13.1.2): W/"x" e "x" sono equivalenti,
+    come "x-gzip" e "x" (stesso contenuto, codifica diversa)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    corrente = etag_senza_codifica(etag[2:] if etag.startswith("W/") else etag)
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if etag_senza_codifica(candidato) == corrente:
+            return True
+    return False
+
+def etag_corrisponde_forte(if_match: Optional[str], etag: str) -> bool:
+    """
+    Confronta l'header If-Match con l'ETag corrente
+    Usa il confronto forte (RFC 9110 §13.1.1): un ETag debole (W/) non corrisponde mai.
+    L'ETag di una variante compressa ("x-gzip") vale come quello originale:
+    la modifica riguarda la risorsa, non la codifica con cui è stata letta
+    """
+    if not if_match:
+        return False
+    if if_match.strip() == "*":
+        return True
+    if etag.startswith("W/"):
+        return False
+    return any(etag_senza_codifica(candidato.strip()) == etag for candidato in if_match.split(","))
+
+def formatta_dimensione(dimensione_bytes: int) -> str:
+    """Dimensione del file in formato leggibile"""
+    if dimensione_bytes < 1024:
+        return f"{dimensione_bytes} bytes"
+    elif dimensione_bytes < 1024 * 1024:
+        return f"{dimensione_bytes / 1024:.1f} KB"
+    return f"{dimensione_bytes / (1024 * 1024):.1f} MB"
+
+def scansiona_cartella_download(cartella_download: str = "download") -> List[RisorsaCorso]:
     """Scansiona la cartella download e restituisce l'elenco delle risorse"""
-    cartella_download = "download"
     risorse = []
     
     if not os.path.exists(cartella_download):
         return risorse
     
-    for filename in os.listdir(cartella_download):
-        filepath = os.path.join(cartella_download, filename)
-        if os.path.isfile(filepath):
+    # os.scandir evita una stat separata per isfile() su ogni voce
+    with os.scandir(cartella_download) as voci:
+        for voce in voci:
+            if not voce.is_file():
+                continue
+            filename = voce.name
+            
             # Calcola dimensione file
-            dimensione_bytes = os.path.getsize(filepath)
-            if dimensione_bytes < 1024:
-                dimensione = f"{dimensione_bytes} bytes"
-            elif dimensione_bytes < 1024 * 1024:
-                dimensione = f"{dimensione_bytes / 1024:.1f} KB"
-            else:
-                dimensione = f"{dimensione_bytes / (1024 * 1024):.1f} MB"
+            dimensione = formatta_dimensione(voce.stat().st_size)
             
             # Determina tipo file
             estensione = filename.split('.')[-1].lower() if '.' in filename else 'file'
@@ -388,4 +676,4 @@ def scansiona_cartella_download() -> List[RisorsaCorso]:
             )
             risorse.append(risorsa)
     
-    return sorted(risorse, key=lambda x: x.nome)
\ No newline at end of file
+    return sorted(risorse, key=lambda x: x.nome)